@@ -0,0 +1,56 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.orm import Session, defer
+from typing import List
+
+from app.core.auth import require_admin
+from app.core.database import get_db
+from app.models.profile import RequestProfile
+from app.schemas.admin import RequestProfileSummary
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+@router.get("/profiles", response_model=List[RequestProfileSummary])
+async def list_profiles(limit: int = Query(20, ge=1, le=100), db: Session = Depends(get_db)):
+    """
+    Recorded request profiles, newest first
+
+    Profile a request by sending it with "X-Profile-Token: <ADMIN_TOKEN>";
+    its id comes back in the X-Profile-Id header.
+    """
+    profiles = (
+        db.query(RequestProfile)
+        .options(defer(RequestProfile.speedscope))
+        .order_by(RequestProfile.created_at.desc())
+        .limit(limit)
+        .all()
+    )
+    return [RequestProfileSummary.model_validate(profile) for profile in profiles]
+
+
+@router.get("/profiles/{profile_id}", response_model=RequestProfileSummary)
+async def get_profile(profile_id: str, db: Session = Depends(get_db)):
+    """
+    Phase timings of one profile
+    """
+    profile = db.query(RequestProfile).options(defer(RequestProfile.speedscope)).filter(
+        RequestProfile.id == profile_id
+    ).first()
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return RequestProfileSummary.model_validate(profile)
+
+
+@router.get("/profiles/{profile_id}/speedscope")
+async def download_profile(profile_id: str, db: Session = Depends(get_db)):
+    """
+    Download the samples as a speedscope file (open it at https://www.speedscope.app)
+    """
+    speedscope = db.query(RequestProfile.speedscope).filter(RequestProfile.id == profile_id).scalar()
+    if speedscope is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return Response(
+        content=speedscope,
+        media_type="application/json",
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.speedscope.json"'},
+    )
@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.core.auth import current_user_id
+from app.core.config import settings
+from app.core.database import get_db
+from app.core.query_budget import query_budget
+from app.schemas.sync import SyncDeleted, SyncExecutionEvent, SyncMicroGoal, SyncResponse, SyncTask
+from app.services.sync import changes_since
+from app.services.timer_store import timer_store
+
+router = APIRouter()
+
+
+@router.get("/", response_model=SyncResponse)
+@query_budget(5)  # Rows grow with the page size, not with the data
+async def get_changes(
+    since: int = Query(0, ge=0, description="next_since from the previous call (0 for a full sync)"),
+    snapshot: bool = Query(False, description="Continuing a full sync (snapshot from the previous call)"),
+    limit: int = Query(None, ge=1, le=5000, description="Changed entities per call (default SYNC_PAGE_SIZE)"),
+    user_id: int = Depends(current_user_id),
+    db: Session = Depends(get_db)
+):
+    """
+    Tasks, micro-goals and execution events changed after `since`
+
+    Only rows written since the cursor are returned, plus the ids of deleted
+    ones, oldest change first. A client keeps `next_since` and polls with it
+    instead of re-fetching the task list.
+    """
+    timer_store.flush_owner(user_id)  # Running timers' state, so it's in the change log
+    changes = changes_since(db, user_id, since, limit or settings.SYNC_PAGE_SIZE, snapshot=snapshot)
+    rows = changes["rows"]
+    return SyncResponse(
+        next_since=changes["next_since"],
+        has_more=changes["has_more"],
+        reset=changes["reset"],
+        snapshot=changes["snapshot"],
+        tasks=[SyncTask.model_validate(task) for task in rows["task"]],
+        micro_goals=[SyncMicroGoal.model_validate(goal) for goal in rows["micro_goal"]],
+        execution_events=[SyncExecutionEvent.model_validate(event) for event in rows["execution_event"]],
+        deleted=SyncDeleted(
+            tasks=changes["deleted"]["task"],
+            micro_goals=changes["deleted"]["micro_goal"],
+            execution_events=changes["deleted"]["execution_event"],
+        ),
+    )
@@ -1,213 +1,561 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session, selectinload, subqueryload
+from pydantic import TypeAdapter
+from typing import List, Optional
+import time
 from datetime import datetime, timedelta
 
-from app.core.database import get_db
-from app.models.task import Task, MicroGoal, ExecutionEvent
+from app.core.auth import current_user_id
+from app.core.cache import CachedResponse, cache, mark_tasks_changed, progress_key, task_key, task_list_key
+from app.core.config import settings
+from app.core.database import get_db, session_scope
+from app.core.disconnect import ClientDisconnected, cancel_on_disconnect
+from app.core.profiling import phase
+from app.core.query_budget import query_budget
+from app.models.calendar import BusyBlock
+from app.models.task import Task, MicroGoal, ExecutionEvent, ExecutionEventSummary
+from app.models.template import TaskTemplate
 from app.schemas.task import (
     TaskInput,
     TaskBreakdownResponse,
+    DraftBreakdownInput,
+    DraftBreakdownResponse,
+    BatchTaskInput,
+    BatchBreakdownResult,
+    BatchBreakdownResponse,
+    JobResponse,
     TaskResponse,
     TaskConfirm,
     MicroGoalSchema,
     ExecutionEventSchema,
     ExecutionSummary,
-    ProgressDataResponse
+    ProgressDataResponse,
+    TemplateCreate,
+    TemplateResponse,
+    TemplateInstantiate,
+    SearchResult,
+    SearchResponse,
+    BusyBlockCreate,
+    BusyBlockResponse
 )
+from app.services.breakdown import (
+    breakdown_response,
+    load_priors,
+    match_templates,
+    plan_micro_goals,
+    save_breakdown,
+    schedule_micro_goals
+)
+from app.services.drafts import DraftSuperseded, draft_registry
+from app.services.job_queue import job_queue
+from app.services.heuristic_breakdown import heuristic_breakdown, heuristic_tips
 from app.services.llm_service import llm_service
+from app.services.resilience import LLMUnavailableError
+from app.services.scheduler import build_schedule
+from app.services.search import search
+from app.services.templates import create_template, use_template
+from app.services.timer_store import LiveTimer, timer_store
 
 router = APIRouter()
 
+# Serialize straight to JSON bytes for the response cache
+TASK_ADAPTER = TypeAdapter(TaskResponse)
+TASK_LIST_ADAPTER = TypeAdapter(List[TaskResponse])
+PROGRESS_ADAPTER = TypeAdapter(ProgressDataResponse)
+
+# TaskResponse walks micro_goals and their execution_events; load them in
+# one query per level instead of one per task/goal. selectinload batches
+# parent ids 500 at a time, so the unbounded list re-runs its own query as
+# a subquery instead and stays at one statement per level at any size.
+TASK_TREE = selectinload(Task.micro_goals).selectinload(MicroGoal.execution_events)
+TASK_LIST_TREE = subqueryload(Task.micro_goals).subqueryload(MicroGoal.execution_events)
+
+
+def _get_micro_goal(db: Session, goal_id: int, owner_id: int) -> MicroGoal:
+    micro_goal = db.query(MicroGoal).filter(MicroGoal.id == goal_id, MicroGoal.owner_id == owner_id).first()
+    if not micro_goal:
+        raise HTTPException(status_code=404, detail="Micro-goal not found")
+    return micro_goal
+
+
+def _live_timer(db: Session, goal_id: int, owner_id: int) -> LiveTimer:
+    """The goal's live timer state, loaded into the timer store on first use"""
+    timer = timer_store.get(goal_id, owner_id)
+    if timer is None:
+        timer = timer_store.track(_get_micro_goal(db, goal_id, owner_id))
+    return timer
+
+
+def _log_event(db: Session, timer: LiveTimer, action: str, now: datetime) -> int:
+    """Commit a timer transition's ExecutionEvent (the log the timer store recovers from) and return its id"""
+    event = ExecutionEvent(
+        micro_goal_id=timer.goal.id,
+        owner_id=timer.owner_id,
+        action=action,
+        timestamp=now,
+        time_spent_at_event=timer.goal.time_spent_seconds or 0
+    )
+    db.add(event)
+    db.flush()
+    event_schema = ExecutionEventSchema.model_validate(event)
+    db.commit()
+    timer.goal.execution_events = [*(timer.goal.execution_events or []), event_schema]
+    return event_schema.id
+
+
+def _delete_micro_goals(db: Session, *criteria):
+    """Bulk delete the matching micro-goals with their events and summaries, without loading them"""
+    goal_ids = select(MicroGoal.id).where(*criteria)
+    db.query(ExecutionEvent).filter(ExecutionEvent.micro_goal_id.in_(goal_ids)).delete(synchronize_session=False)
+    db.query(ExecutionEventSummary).filter(
+        ExecutionEventSummary.micro_goal_id.in_(goal_ids)
+    ).delete(synchronize_session=False)
+    db.query(MicroGoal).filter(*criteria).delete(synchronize_session=False)
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
+def _cached_json(cached: CachedResponse) -> Response:
+    # Let browsers keep the body but always revalidate it with If-None-Match
+    return Response(
+        content=cached.body,
+        media_type="application/json",
+        headers={"ETag": cached.etag, "Cache-Control": "no-cache"}
+    )
+
 
 @router.post("/breakdown", response_model=TaskBreakdownResponse)
-async def breakdown_tasks(
-    task_input: TaskInput,
-    db: Session = Depends(get_db)
-):
+@query_budget(4, rows=2)
+async def breakdown_tasks(task_input: TaskInput, request: Request, user_id: int = Depends(current_user_id)):
     """
     Take user's raw task input and break it down into micro-goals using LLM
+
+    Runs in three phases so no database connection is checked out while
+    waiting on the LLM: the LLM call (no session), scheduling (pure
+    computation, plus one short read of busy time with schedule_mode
+    "calendar"), then one short write transaction with bulk inserts.
+    When the input nearly matches a saved template, its plan is reused and
+    the LLM is skipped (source "template"; send use_templates=false to opt out).
+    A plan from a recent draft of the same text is reused the same way.
+
+    If the client disconnects first, the LLM call is cancelled and nothing
+    is saved (the write transaction has no await, so it runs whole or not at all).
     """
-    try:
-        # Call LLM to break down tasks
-        micro_goals_data = await llm_service.breakdown_tasks(task_input.tasks_text)
-
-        # Create task record (not confirmed yet)
-        task = Task(
-            user_input=task_input.tasks_text,
-            confirmed=False,
-            starting_time=task_input.starting_time
+    async def run_breakdown():
+        # Phase 1: draft plan or matching template, else call LLM to break down tasks
+        # (heuristic fallback while it's degraded)
+        micro_goals_data, source, template_id = await plan_micro_goals(
+            task_input.tasks_text, user_id, task_input.use_templates
         )
-        db.add(task)
-        db.flush()  # Get the task ID
-
-        # Calculate times for each micro-goal if starting_time is provided
-        current_time = task_input.starting_time
-        user_end_time = task_input.end_time
-
-        # Create micro-goal records with Pomodoro breaks
-        micro_goals = []
-        micro_goal_schemas = []
-        accumulated_work_minutes = 0  # Track time since last break
-        total_pomodoros_completed = 0  # Track total pomodoros for long break scheduling
-
-        for idx, goal_data in enumerate(micro_goals_data):
-            start_time = None
-            end_time = None
-            exceeds_end_time = False
-            estimated_minutes = goal_data.get("estimated_minutes", 30)
-
-            if current_time:
-                # Convert time to datetime for calculation
-                today = datetime.today()
-                current_datetime = datetime.combine(today, current_time)
-                start_time = current_time
-
-                # Calculate end time
-                end_datetime = current_datetime + timedelta(minutes=estimated_minutes)
-                end_time = end_datetime.time()
-
-                # Check if this micro-goal exceeds the user's desired end time
-                if user_end_time and end_time > user_end_time:
-                    exceeds_end_time = True
-
-                # Update current_time for next item (task or break)
-                current_time = end_time
-
-            # Add the actual task
-            micro_goal = MicroGoal(
-                task_id=task.id,
-                title=goal_data.get("title", ""),
-                description=goal_data.get("description", ""),
-                estimated_minutes=estimated_minutes,
-                order=len(micro_goals),  # Use actual position in list
-                completed=False,
-                starting_time=start_time,
-                end_time=end_time
-            )
-            db.add(micro_goal)
-            micro_goals.append(micro_goal)
-
-            # Create schema with exceeds_end_time flag
-            schema = MicroGoalSchema.model_validate(micro_goal)
-            schema.exceeds_end_time = exceeds_end_time
-            schema.is_break = False
-            micro_goal_schemas.append(schema)
-
-            # Accumulate work time
-            accumulated_work_minutes += estimated_minutes
-
-            # Debug logging
-            print(f"DEBUG: Task {idx + 1}: {estimated_minutes} min, Accumulated: {accumulated_work_minutes} min")
-
-            # Check if we should add a break (at least 25 minutes of work, and not the last task)
-            if accumulated_work_minutes >= 25 and idx < len(micro_goals_data) - 1 and current_time:
-                print(f"DEBUG: Adding break after {accumulated_work_minutes} minutes of work")
-                # Increment pomodoro count
-                total_pomodoros_completed += 1
-
-                # Determine break type: long break after every 3 pomodoros, short break otherwise
-                is_long_break = (total_pomodoros_completed % 3 == 0)
-                break_minutes = 15 if is_long_break else 5
-                break_type = "long" if is_long_break else "short"
-
-                # Calculate break times
-                today = datetime.today()
-                break_start = current_time
-                break_start_datetime = datetime.combine(today, break_start)
-                break_end_datetime = break_start_datetime + timedelta(minutes=break_minutes)
-                break_end = break_end_datetime.time()
-
-                # Check if break exceeds end time
-                break_exceeds = False
-                if user_end_time and break_end > user_end_time:
-                    break_exceeds = True
-
-                # Create break as a micro-goal
-                break_goal = MicroGoal(
-                    task_id=task.id,
-                    title=f"{'Long' if is_long_break else 'Short'} Break",
-                    description=f"Take a {'15' if is_long_break else '5'} minute break - relax, stretch, hydrate! 🧘",
-                    estimated_minutes=break_minutes,
-                    order=len(micro_goals),
-                    completed=False,
-                    starting_time=break_start,
-                    end_time=break_end
-                )
-                db.add(break_goal)
-                micro_goals.append(break_goal)
-
-                # Create schema for break
-                break_schema = MicroGoalSchema.model_validate(break_goal)
-                break_schema.exceeds_end_time = break_exceeds
-                break_schema.is_break = True
-                break_schema.break_type = break_type
-                micro_goal_schemas.append(break_schema)
-
-                # Update current time to after the break
-                current_time = break_end
-
-                # Reset accumulated work time
-                accumulated_work_minutes = 0
 
-        db.commit()
-        db.refresh(task)
+        # Phase 2: lay out the plan with Pomodoro breaks
+        schedule = schedule_micro_goals(
+            micro_goals_data, user_id, task_input.starting_time, task_input.end_time,
+            task_input.schedule_mode, task_input.starting_date
+        )
 
-        # Calculate total time
-        total_minutes = sum(mg.estimated_minutes for mg in micro_goals)
+        # Phase 3: save it
+        with session_scope() as db:
+            task_id = save_breakdown(db, user_id, task_input.tasks_text, task_input.starting_time, schedule).id
 
-        return TaskBreakdownResponse(
-            task_id=task.id,
-            micro_goals=micro_goal_schemas,
-            total_estimated_minutes=total_minutes
-        )
+        return breakdown_response(task_id, schedule, source, template_id)
+
+    try:
+        return await cancel_on_disconnect(request, run_breakdown())
 
+    except ClientDisconnected:
+        raise
+    except LLMUnavailableError as e:
+        headers = {"Retry-After": str(int(e.retry_after) + 1)} if e.retry_after is not None else None
+        raise HTTPException(status_code=503, detail=f"Task breakdown is temporarily unavailable: {str(e)}", headers=headers)
     except Exception as e:
-        db.rollback()
         print(f"ERROR in breakdown_tasks: {type(e).__name__}: {str(e)}")
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Error processing tasks: {str(e)}")
 
 
+# Only template matching touches the database (keywords, match, copy); no writes
+@router.post("/breakdown/drafts", response_model=DraftBreakdownResponse)
+@query_budget(3)
+async def breakdown_draft(draft_input: DraftBreakdownInput, request: Request, user_id: int = Depends(current_user_id)):
+    """
+    Speculatively break down text the user is still typing, without saving it
+
+    Debounced per session_id: a newer draft cancels the one in flight, which
+    gets 409. The plan is kept for a few minutes, so submitting the same text
+    to /breakdown reuses it instead of calling the LLM again.
+    """
+    async def compute():
+        return await plan_micro_goals(draft_input.tasks_text, user_id, draft_input.use_templates)
+
+    try:
+        micro_goals_data, source, template_id = await cancel_on_disconnect(request, draft_registry.submit(
+            user_id, draft_input.session_id, draft_input.tasks_text, draft_input.use_templates, compute
+        ))
+    except DraftSuperseded:
+        raise HTTPException(status_code=409, detail="Superseded by a newer draft")
+    except LLMUnavailableError as e:
+        headers = {"Retry-After": str(int(e.retry_after) + 1)} if e.retry_after is not None else None
+        raise HTTPException(status_code=503, detail=f"Task breakdown is temporarily unavailable: {str(e)}", headers=headers)
+
+    schedule = build_schedule(micro_goals_data, draft_input.starting_time, draft_input.end_time)
+    return DraftBreakdownResponse(
+        session_id=draft_input.session_id,
+        micro_goals=[MicroGoalSchema(**row) for row in schedule],
+        total_estimated_minutes=sum(row["estimated_minutes"] for row in schedule),
+        source=source,
+        template_id=template_id
+    )
+
+
+@router.post("/breakdown/jobs", response_model=JobResponse, status_code=202)
+@query_budget(2, rows=1)
+async def enqueue_breakdown(task_input: TaskInput, user_id: int = Depends(current_user_id)):
+    """
+    Queue a breakdown and return its job id immediately
+
+    The LLM call and the inserts run in a background worker; poll
+    GET /jobs/{job_id} (optionally with ?wait=N to long-poll) for the result.
+    No database session is held by this request while the LLM works.
+    """
+    job_id = job_queue.enqueue("breakdown", task_input.model_dump(mode="json"), owner_id=user_id)
+    return JobResponse.model_validate(job_queue.get(job_id, user_id))
+
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+@query_budget(1, rows=1)
+async def get_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=30, description="Seconds to wait for the job to finish"),
+    user_id: int = Depends(current_user_id)
+):
+    """
+    Get the status (and result, once finished) of a background job
+    """
+    job = await job_queue.wait(job_id, wait, user_id) if wait else job_queue.get(job_id, user_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return JobResponse.model_validate(job)
+
+
+# Task INSERTs are one per input (SQLite can't return the ids of a multi-row
+# insert in order); the budget is for the benchmark's batch of 5
+@router.post("/breakdown/batch", response_model=BatchBreakdownResponse)
+@query_budget(7, rows=5)
+async def breakdown_tasks_batch(
+    batch_input: BatchTaskInput, request: Request, user_id: int = Depends(current_user_id)
+):
+    """
+    Break down many task inputs at once (e.g. for several users or days)
+
+    Inputs that match a saved template reuse it; the rest are packed into
+    as few LLM calls as the token limits allow and the results are split
+    back into one unconfirmed task per input. Like /breakdown, no database
+    session is open while the LLM calls run.
+    """
+    items = batch_input.items
+    if len(items) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.BATCH_MAX_ITEMS} inputs per batch")
+    if len({item.id for item in items}) != len(items):
+        raise HTTPException(status_code=400, detail="Batch input ids must be unique")
+
+    template_plans = match_templates({item.id: item.tasks_text for item in items}, user_id)
+    llm_inputs = [{"id": item.id, "tasks_text": item.tasks_text} for item in items if item.id not in template_plans]
+    # Cancelled (with nothing saved) if the client disconnects while the LLM works
+    llm_results = await cancel_on_disconnect(request, llm_service.breakdown_tasks_batch(llm_inputs)) if llm_inputs else {}
+
+    try:
+        results = []
+        priors = None
+        saved = []
+        for item in items:
+            source = "llm"
+            micro_goals_data, provider = llm_results.get(item.id, (None, None))
+            template_id, micro_goals_data = template_plans.get(item.id, (None, micro_goals_data))
+            if template_id is not None:
+                source = "template"
+            elif not micro_goals_data or provider == "fake":
+                # The offline backend's answer is redone with the user's duration priors
+                if not settings.HEURISTIC_FALLBACK_ENABLED:
+                    results.append(BatchBreakdownResult(id=item.id, error="No breakdown returned for this input"))
+                    continue
+                if priors is None:
+                    priors = load_priors(user_id)
+                micro_goals_data = heuristic_breakdown(item.tasks_text, priors)
+                source = "heuristic"
+
+            schedule = build_schedule(micro_goals_data, item.starting_time, item.end_time)
+            saved.append((item, schedule, source, template_id))
+
+        # One short transaction for the whole batch; tasks are flushed together
+        # so the micro-goal inserts below are a single executemany
+        with session_scope() as db:
+            tasks = [
+                Task(owner_id=user_id, user_input=item.tasks_text, confirmed=False, starting_time=item.starting_time)
+                for item, _, _, _ in saved
+            ]
+            db.add_all(tasks)
+            db.flush()
+            task_ids = [task.id for task in tasks]
+
+            goal_rows = [
+                dict(row, task_id=task_id, owner_id=user_id)
+                for task_id, (_, schedule, _, _) in zip(task_ids, saved)
+                for row in schedule
+            ]
+            if goal_rows:
+                db.execute(insert(MicroGoal.__table__), goal_rows)
+            mark_tasks_changed(db, user_id)
+
+        results += [
+            BatchBreakdownResult(id=item.id, **breakdown_response(task_id, schedule, source, template_id).model_dump())
+            for task_id, (item, schedule, source, template_id) in zip(task_ids, saved)
+        ]
+        order = {item.id: index for index, item in enumerate(items)}
+        results.sort(key=lambda r: order[r.id])
+
+        return BatchBreakdownResponse(results=results, llm_calls=len(llm_service.pack_batches(llm_inputs)))
+
+    except Exception as e:
+        print(f"ERROR in breakdown_tasks_batch: {type(e).__name__}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error processing batch: {str(e)}")
+
+
+@router.get("/search", response_model=SearchResponse)
+@query_budget(1, rows=21)
+async def search_tasks(
+    q: str = Query(..., min_length=1, max_length=200, description="Words to find in task inputs and micro-goals"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    user_id: int = Depends(current_user_id),
+    db: Session = Depends(get_db)
+):
+    """
+    Full-text search over the user's task inputs and micro-goal titles and descriptions
+
+    Results are ranked best first with highlighted snippets; the last word
+    also matches as a prefix.
+    """
+    rows = search(db, user_id, q, limit=limit, offset=offset)
+    return SearchResponse(
+        query=q,
+        results=[SearchResult(**row) for row in rows[:limit]],
+        limit=limit,
+        offset=offset,
+        has_more=len(rows) > limit
+    )
+
+
+# Busy blocks for calendar scheduling (registered before /{task_id} as well)
+
+@router.post("/busy-blocks", response_model=BusyBlockResponse, status_code=201)
+@query_budget(2, rows=1)
+async def create_busy_block(
+    busy_block: BusyBlockCreate,
+    user_id: int = Depends(current_user_id),
+    db: Session = Depends(get_db)
+):
+    """
+    Add a fixed commitment that schedule_mode "calendar" keeps micro-goals out of
+    """
+    block = BusyBlock(owner_id=user_id, **busy_block.model_dump())
+    db.add(block)
+    db.commit()
+
+    return BusyBlockResponse.model_validate(block)
+
+
+@router.get("/busy-blocks", response_model=List[BusyBlockResponse])
+@query_budget(1)
+async def get_busy_blocks(
+    start: Optional[datetime] = Query(None, description="Window start (default: today)"),
+    end: Optional[datetime] = Query(None, description="Window end (default: SCHEDULE_MAX_DAYS after start)"),
+    user_id: int = Depends(current_user_id),
+    db: Session = Depends(get_db)
+):
+    """
+    Get the user's busy blocks overlapping a time window, earliest first
+    """
+    start = start or datetime.combine(datetime.now().date(), datetime.min.time())
+    end = end or start + timedelta(days=settings.SCHEDULE_MAX_DAYS)
+    blocks = db.query(BusyBlock).filter(
+        BusyBlock.owner_id == user_id, BusyBlock.start_at < end, BusyBlock.end_at > start
+    ).order_by(BusyBlock.start_at).all()
+    return [BusyBlockResponse.model_validate(block) for block in blocks]
+
+
+@router.delete("/busy-blocks/{block_id}")
+@query_budget(1, rows=0)
+async def delete_busy_block(block_id: int, user_id: int = Depends(current_user_id), db: Session = Depends(get_db)):
+    """
+    Delete a busy block (already scheduled micro-goals are not moved)
+    """
+    deleted = db.query(BusyBlock).filter(
+        BusyBlock.id == block_id, BusyBlock.owner_id == user_id
+    ).delete(synchronize_session=False)
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Busy block not found")
+
+    db.commit()
+    return {"message": "Busy block deleted successfully"}
+
+
+# Recurring templates (registered before /{task_id} so "templates" isn't read as an id)
+
+@router.post("/templates", response_model=TemplateResponse, status_code=201)
+@query_budget(4, rows=12)
+async def save_template(
+    template_create: TemplateCreate,
+    user_id: int = Depends(current_user_id),
+    db: Session = Depends(get_db)
+):
+    """
+    Save a confirmed task's micro-goals as a recurring template
+    """
+    task = db.query(Task).filter(Task.id == template_create.task_id, Task.owner_id == user_id).first()
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if not task.confirmed:
+        raise HTTPException(status_code=400, detail="Only confirmed tasks can be saved as templates")
+
+    template = create_template(db, task, template_create.name)
+    db.commit()
+    db.refresh(template)
+
+    return TemplateResponse.model_validate(template)
+
+
+@router.get("/templates", response_model=List[TemplateResponse])
+@query_budget(1, rows=1)
+async def get_templates(user_id: int = Depends(current_user_id), db: Session = Depends(get_db)):
+    """
+    Get the user's templates, most used first
+    """
+    templates = db.query(TaskTemplate).filter(TaskTemplate.owner_id == user_id).order_by(
+        TaskTemplate.use_count.desc(), TaskTemplate.created_at.desc()
+    ).all()
+    return [TemplateResponse.model_validate(template) for template in templates]
+
+
+@router.delete("/templates/{template_id}")
+@query_budget(1, rows=0)
+async def delete_template(template_id: int, user_id: int = Depends(current_user_id), db: Session = Depends(get_db)):
+    """
+    Delete a template (tasks created from it are kept)
+    """
+    deleted = db.query(TaskTemplate).filter(
+        TaskTemplate.id == template_id, TaskTemplate.owner_id == user_id
+    ).delete(synchronize_session=False)
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Template not found")
+
+    db.commit()
+    return {"message": "Template deleted successfully"}
+
+
+@router.post("/templates/{template_id}/instantiate", response_model=TaskBreakdownResponse)
+@query_budget(5, rows=3)
+async def instantiate_template(
+    template_id: int,
+    template_instantiate: TemplateInstantiate,
+    user_id: int = Depends(current_user_id),
+    db: Session = Depends(get_db)
+):
+    """
+    Create a new unconfirmed task from a template, scheduled from a new start time
+
+    No LLM call: the template's goals are bulk copied and the scheduler
+    re-applies times and Pomodoro breaks.
+    """
+    micro_goals_data = use_template(db, template_id, user_id)
+    if micro_goals_data is None:
+        raise HTTPException(status_code=404, detail="Template not found")
+
+    template = db.query(TaskTemplate.source_text).filter(TaskTemplate.id == template_id).one()
+    schedule = build_schedule(micro_goals_data, template_instantiate.starting_time, template_instantiate.end_time)
+    task_id = save_breakdown(db, user_id, template.source_text, template_instantiate.starting_time, schedule).id
+    db.commit()
+
+    return breakdown_response(task_id, schedule, "template", template_id)
+
+
 @router.post("/confirm", response_model=TaskResponse)
+@query_budget(11, rows=17)
 async def confirm_tasks(
     task_confirm: TaskConfirm,
+    user_id: int = Depends(current_user_id),
     db: Session = Depends(get_db)
 ):
     """
     User confirms (possibly edited) micro-goals and saves them permanently
+
+    With schedule_mode "calendar" the work goals keep their order but are
+    re-placed around the user's busy blocks and other scheduled goals,
+    spilling over to later days, with Pomodoro breaks re-added.
     """
-    task = db.query(Task).filter(Task.id == task_confirm.task_id).first()
+    task = db.query(Task).filter(Task.id == task_confirm.task_id, Task.owner_id == user_id).first()
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
     try:
-        # Delete existing micro-goals
-        db.query(MicroGoal).filter(MicroGoal.task_id == task.id).delete()
-
-        # Create new micro-goals from user's confirmation
-        for goal_data in task_confirm.micro_goals:
-            micro_goal = MicroGoal(
-                task_id=task.id,
-                title=goal_data.title,
-                description=goal_data.description,
-                estimated_minutes=goal_data.estimated_minutes,
-                order=goal_data.order,
-                completed=goal_data.completed,
-                starting_time=goal_data.starting_time,
-                end_time=goal_data.end_time,
-                exceeds_end_time=goal_data.exceeds_end_time or False,
-                is_break=goal_data.is_break or False,
-                break_type=goal_data.break_type
+        # Delete existing micro-goals (and their events), and any running timer on them
+        _delete_micro_goals(db, MicroGoal.task_id == task.id)
+        timer_store.forget_task(task.id)
+
+        # Create new micro-goals from user's confirmation, in one executemany
+        if task_confirm.schedule_mode == "calendar":
+            schedule = schedule_micro_goals(
+                [goal_data.model_dump() for goal_data in task_confirm.micro_goals if not goal_data.is_break],
+                user_id,
+                task_confirm.starting_time or task.starting_time,
+                task_confirm.end_time,
+                "calendar",
+                task_confirm.starting_date,
+                db=db,
+                exclude_task_id=task.id
             )
-            db.add(micro_goal)
+            goal_rows = [dict(row, task_id=task.id, owner_id=user_id) for row in schedule]
+        else:
+            goal_rows = [
+                {
+                    "task_id": task.id,
+                    "owner_id": user_id,
+                    "title": goal_data.title,
+                    "description": goal_data.description,
+                    "estimated_minutes": goal_data.estimated_minutes,
+                    "order": goal_data.order,
+                    "completed": goal_data.completed,
+                    "starting_time": goal_data.starting_time,
+                    "end_time": goal_data.end_time,
+                    "scheduled_date": goal_data.scheduled_date,
+                    "exceeds_end_time": goal_data.exceeds_end_time or False,
+                    "is_break": goal_data.is_break or False,
+                    "break_type": goal_data.break_type
+                }
+                for goal_data in task_confirm.micro_goals
+            ]
+        if goal_rows:
+            db.execute(insert(MicroGoal.__table__), goal_rows)
 
         # Mark task as confirmed
         task.confirmed = True
+        task.version = (task.version or 1) + 1
+        mark_tasks_changed(db, user_id, [task.id])
         db.commit()
-        db.refresh(task)
 
+        task = db.query(Task).options(TASK_TREE).filter(Task.id == task_confirm.task_id).one()
         return TaskResponse.model_validate(task)
 
     except Exception as e:
@@ -216,209 +564,284 @@ async def confirm_tasks(
 
 
 @router.get("/", response_model=List[TaskResponse])
+@query_budget(4, rows=1551)  # One default-sized page of 50 tasks
 async def get_tasks(
     confirmed_only: bool = False,
+    limit: int = Query(None, ge=1, le=200, description="Tasks per page (default TASK_LIST_PAGE_SIZE)"),
+    before: Optional[int] = Query(None, ge=1, description="Id of the last task on the previous page"),
+    if_none_match: Optional[str] = Header(None),
+    user_id: int = Depends(current_user_id),
     db: Session = Depends(get_db)
 ):
     """
-    Get all tasks, optionally filter by confirmed status
+    Get the user's tasks, newest first, optionally filter by confirmed status
+
+    Returns one page: pass the id of the last task as `before` for the next
+    one, until a page comes back shorter than `limit`. Ids follow creation
+    order, so new tasks never shift the pages behind the first.
+
+    The first page is served from the response cache until one of the user's
+    tasks changes. On a miss, conditional GET still works: the ETag is
+    derived from one aggregate query over the page (count, max and sum of
+    the ids, sum of versions), so an unchanged page costs no relationship
+    loading or serialization.
     """
-    query = db.query(Task)
-    if confirmed_only:
-        query = query.filter(Task.confirmed == True)
+    timer_store.flush_owner(user_id)  # Running timers' state, before it's read from the rows
+    limit = limit or settings.TASK_LIST_PAGE_SIZE
+    # Only the default first page (what clients poll) is cached, so invalidation stays one key per list
+    key = task_list_key(user_id, confirmed_only) if before is None and limit == settings.TASK_LIST_PAGE_SIZE else None
+    cached = cache.get(key) if key else None
+    if cached is None:
+        query = db.query(Task).filter(Task.owner_id == user_id)
+        if confirmed_only:
+            query = query.filter(Task.confirmed == True)
+        if before is not None:
+            query = query.filter(Task.id < before)
+        query = query.order_by(Task.id.desc()).limit(limit)
+
+        page = query.with_entities(Task.id, Task.version).subquery()
+        count, max_id, id_sum, version_sum = db.query(
+            func.count(page.c.id), func.max(page.c.id), func.sum(page.c.id), func.sum(page.c.version)
+        ).one()
+        etag = (
+            f'W/"tasks-u{user_id}-{int(confirmed_only)}-{before or 0}-{limit}'
+            f'-{count}-{max_id or 0}-{id_sum or 0}-{version_sum or 0}"'
+        )
+        if _etag_matches(if_none_match, etag):
+            return _not_modified(etag)
+
+        tasks = query.options(TASK_LIST_TREE).all()
+        with phase("serialization"):
+            body = TASK_LIST_ADAPTER.dump_json([TaskResponse.model_validate(task) for task in tasks])
+        cached = CachedResponse(user_id, etag, body)
+        if key:
+            cache.set(key, cached)
+    elif _etag_matches(if_none_match, cached.etag):
+        return _not_modified(cached.etag)
 
-    tasks = query.order_by(Task.created_at.desc()).all()
-    return [TaskResponse.model_validate(task) for task in tasks]
+    return _cached_json(cached)
 
 
 @router.get("/{task_id}", response_model=TaskResponse)
-async def get_task(task_id: int, db: Session = Depends(get_db)):
+@query_budget(4, rows=32)
+async def get_task(
+    task_id: int,
+    if_none_match: Optional[str] = Header(None),
+    user_id: int = Depends(current_user_id),
+    db: Session = Depends(get_db)
+):
     """
     Get a specific task by ID
+
+    Served from the response cache until the task changes. On a miss, a
+    matching If-None-Match is answered with 304 after a single primary-key
+    lookup of the task version.
     """
-    task = db.query(Task).filter(Task.id == task_id).first()
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
+    timer_store.flush_owner(user_id)  # Running timers' state, before it's read from the rows
+    cached = cache.get(task_key(task_id))
+    if cached is None or cached.owner_id != user_id:
+        version = db.query(Task.version).filter(Task.id == task_id, Task.owner_id == user_id).scalar()
+        if version is None:
+            raise HTTPException(status_code=404, detail="Task not found")
+
+        if _etag_matches(if_none_match, f'W/"task-{task_id}-v{version}"'):
+            return _not_modified(f'W/"task-{task_id}-v{version}"')
 
-    return TaskResponse.model_validate(task)
+        task = db.query(Task).options(TASK_TREE).filter(Task.id == task_id, Task.owner_id == user_id).first()
+        if not task:
+            raise HTTPException(status_code=404, detail="Task not found")
+
+        etag = f'W/"task-{task_id}-v{task.version}"'
+        with phase("serialization"):
+            cached = CachedResponse(user_id, etag, TASK_ADAPTER.dump_json(TaskResponse.model_validate(task)))
+        cache.set(task_key(task_id), cached)
+    elif _etag_matches(if_none_match, cached.etag):
+        return _not_modified(cached.etag)
+
+    return _cached_json(cached)
 
 
 @router.delete("/{task_id}")
-async def delete_task(task_id: int, db: Session = Depends(get_db)):
+@query_budget(5, rows=1)
+async def delete_task(task_id: int, user_id: int = Depends(current_user_id), db: Session = Depends(get_db)):
     """
     Delete a task and all its micro-goals
+
+    Bulk deletes level by level; an ORM cascade would load every goal's
+    events and summary one query at a time.
     """
-    task = db.query(Task).filter(Task.id == task_id).first()
-    if not task:
+    if not db.query(Task.id).filter(Task.id == task_id, Task.owner_id == user_id).scalar():
         raise HTTPException(status_code=404, detail="Task not found")
 
-    db.delete(task)
+    _delete_micro_goals(db, MicroGoal.task_id == task_id)
+    db.query(Task).filter(Task.id == task_id).delete(synchronize_session=False)
+    timer_store.forget_task(task_id)
+    mark_tasks_changed(db, user_id, [task_id])
     db.commit()
 
     return {"message": "Task deleted successfully"}
 
 
 # Pomodoro Timer Control Endpoints
+#
+# Live timer state is served from the timer store and written behind in
+# batches; only the transitions' ExecutionEvents are committed right away.
+# Budgets cover loading a goal that isn't live yet (the goal and its events).
 
 @router.post("/micro-goals/{goal_id}/start", response_model=MicroGoalSchema)
-async def start_micro_goal(goal_id: int, db: Session = Depends(get_db)):
+@query_budget(3, rows=8)
+async def start_micro_goal(goal_id: int, user_id: int = Depends(current_user_id), db: Session = Depends(get_db)):
     """
     Start a micro-goal timer
     """
-    # Stop any currently active micro-goals
-    db.query(MicroGoal).filter(MicroGoal.is_active == True).update({"is_active": False})
-
-    micro_goal = db.query(MicroGoal).filter(MicroGoal.id == goal_id).first()
-    if not micro_goal:
-        raise HTTPException(status_code=404, detail="Micro-goal not found")
+    timer = _live_timer(db, goal_id, user_id)
 
-    if micro_goal.completed:
+    if timer.goal.completed:
         raise HTTPException(status_code=400, detail="Cannot start a completed task")
 
     now = datetime.utcnow()
-    micro_goal.is_active = True
-    micro_goal.is_paused = False
-    if not micro_goal.actual_start_time:
-        micro_goal.actual_start_time = now
+    event_id = _log_event(db, timer, "start", now)
 
-    # Log execution event
-    event = ExecutionEvent(
-        micro_goal_id=goal_id,
-        action="start",
-        timestamp=now,
-        time_spent_at_event=micro_goal.time_spent_seconds or 0
-    )
-    db.add(event)
+    # Stop the user's currently active micro-goals
+    stopped = [other for other in timer_store.active(user_id) if other is not timer]
+    for other in stopped:
+        other.goal.is_active = False
 
-    db.commit()
-    db.refresh(micro_goal)
+    timer.goal.is_active = True
+    timer.goal.is_paused = False
+    if not timer.goal.actual_start_time:
+        timer.goal.actual_start_time = now
+    timer_store.record_event(event_id)
+    timer_store.mark_dirty(timer, *stopped)
 
-    return MicroGoalSchema.model_validate(micro_goal)
+    return timer.goal
 
 
 @router.post("/micro-goals/{goal_id}/pause", response_model=MicroGoalSchema)
-async def pause_micro_goal(goal_id: int, db: Session = Depends(get_db)):
+@query_budget(3, rows=8)
+async def pause_micro_goal(goal_id: int, user_id: int = Depends(current_user_id), db: Session = Depends(get_db)):
     """
     Pause a micro-goal timer
     """
-    micro_goal = db.query(MicroGoal).filter(MicroGoal.id == goal_id).first()
-    if not micro_goal:
-        raise HTTPException(status_code=404, detail="Micro-goal not found")
+    timer = _live_timer(db, goal_id, user_id)
 
-    if not micro_goal.is_active:
+    if not timer.goal.is_active:
         raise HTTPException(status_code=400, detail="Task is not active")
 
-    now = datetime.utcnow()
-    micro_goal.is_paused = True
+    event_id = _log_event(db, timer, "pause", datetime.utcnow())
+    timer.goal.is_paused = True
+    timer_store.record_event(event_id)
+    timer_store.mark_dirty(timer)
 
-    # Log execution event
-    event = ExecutionEvent(
-        micro_goal_id=goal_id,
-        action="pause",
-        timestamp=now,
-        time_spent_at_event=micro_goal.time_spent_seconds or 0
-    )
-    db.add(event)
-
-    db.commit()
-    db.refresh(micro_goal)
-
-    return MicroGoalSchema.model_validate(micro_goal)
+    return timer.goal
 
 
 @router.post("/micro-goals/{goal_id}/resume", response_model=MicroGoalSchema)
-async def resume_micro_goal(goal_id: int, db: Session = Depends(get_db)):
+@query_budget(3, rows=8)
+async def resume_micro_goal(goal_id: int, user_id: int = Depends(current_user_id), db: Session = Depends(get_db)):
     """
     Resume a paused micro-goal timer
     """
-    # Stop any currently active micro-goals
-    db.query(MicroGoal).filter(MicroGoal.is_active == True, MicroGoal.id != goal_id).update({"is_active": False})
-
-    micro_goal = db.query(MicroGoal).filter(MicroGoal.id == goal_id).first()
-    if not micro_goal:
-        raise HTTPException(status_code=404, detail="Micro-goal not found")
+    timer = _live_timer(db, goal_id, user_id)
 
-    if not micro_goal.is_paused:
+    if not timer.goal.is_paused:
         raise HTTPException(status_code=400, detail="Task is not paused")
 
-    now = datetime.utcnow()
-    micro_goal.is_paused = False
+    event_id = _log_event(db, timer, "resume", datetime.utcnow())
 
-    # Log execution event
-    event = ExecutionEvent(
-        micro_goal_id=goal_id,
-        action="resume",
-        timestamp=now,
-        time_spent_at_event=micro_goal.time_spent_seconds or 0
-    )
-    db.add(event)
+    # Stop the user's other active micro-goals
+    stopped = [other for other in timer_store.active(user_id) if other is not timer]
+    for other in stopped:
+        other.goal.is_active = False
 
-    db.commit()
-    db.refresh(micro_goal)
+    timer.goal.is_paused = False
+    timer_store.record_event(event_id)
+    timer_store.mark_dirty(timer, *stopped)
 
-    return MicroGoalSchema.model_validate(micro_goal)
+    return timer.goal
 
 
 @router.post("/micro-goals/{goal_id}/complete", response_model=MicroGoalSchema)
-async def complete_micro_goal(goal_id: int, db: Session = Depends(get_db)):
+@query_budget(5, rows=8)
+async def complete_micro_goal(goal_id: int, user_id: int = Depends(current_user_id), db: Session = Depends(get_db)):
     """
     Mark a micro-goal as completed
+
+    A checkpoint: the goal's final state is written in the same transaction
+    as its event, and it leaves the timer store.
     """
-    micro_goal = db.query(MicroGoal).filter(MicroGoal.id == goal_id).first()
-    if not micro_goal:
-        raise HTTPException(status_code=404, detail="Micro-goal not found")
+    timer = _live_timer(db, goal_id, user_id)
+    if timer.goal.completed:
+        raise HTTPException(status_code=400, detail="Micro-goal is already completed")
+    goal = timer.goal.model_copy(deep=True)
 
     now = datetime.utcnow()
-    micro_goal.completed = True
-    micro_goal.is_active = False
-    micro_goal.is_paused = False
-    micro_goal.actual_end_time = now
+    goal.completed = True
+    goal.is_active = False
+    goal.is_paused = False
+    goal.actual_end_time = now
 
     # Calculate total time spent
-    if micro_goal.actual_start_time:
-        time_diff = micro_goal.actual_end_time - micro_goal.actual_start_time
-        micro_goal.time_spent_seconds = int(time_diff.total_seconds())
-
-    # Log execution event
-    event = ExecutionEvent(
-        micro_goal_id=goal_id,
-        action="complete",
-        timestamp=now,
-        time_spent_at_event=micro_goal.time_spent_seconds or 0
-    )
-    db.add(event)
+    if goal.actual_start_time:
+        time_diff = goal.actual_end_time - goal.actual_start_time
+        goal.time_spent_seconds = int(time_diff.total_seconds())
 
-    db.commit()
-    db.refresh(micro_goal)
+    try:
+        # Log execution event
+        event = ExecutionEvent(
+            micro_goal_id=goal_id,
+            owner_id=user_id,
+            action="complete",
+            timestamp=now,
+            time_spent_at_event=goal.time_spent_seconds or 0
+        )
+        db.add(event)
+        db.flush()
+        event_id = event.id
+        goal.execution_events = [*(goal.execution_events or []), ExecutionEventSchema.model_validate(event)]
+        timer_store.write(db, [LiveTimer(user_id, timer.task_id, goal)])
+        db.commit()
+    except Exception:
+        # The live state (and anything still unwritten) stays in the store for the next flush
+        db.rollback()
+        raise
 
-    return MicroGoalSchema.model_validate(micro_goal)
+    timer_store.record_event(event_id)
+    timer_store.forget(goal_id)
+    return goal
 
 
 @router.patch("/micro-goals/{goal_id}/time", response_model=MicroGoalSchema)
-async def update_time_spent(goal_id: int, time_spent_seconds: int, db: Session = Depends(get_db)):
+@query_budget(2, rows=8)
+async def update_time_spent(
+    goal_id: int,
+    time_spent_seconds: int,
+    user_id: int = Depends(current_user_id),
+    db: Session = Depends(get_db)
+):
     """
     Update the time spent on a micro-goal (for tracking elapsed time from frontend)
-    """
-    micro_goal = db.query(MicroGoal).filter(MicroGoal.id == goal_id).first()
-    if not micro_goal:
-        raise HTTPException(status_code=404, detail="Micro-goal not found")
-
-    micro_goal.time_spent_seconds = time_spent_seconds
 
-    db.commit()
-    db.refresh(micro_goal)
+    Kept in memory and written with the next timer flush, so the per-second
+    heartbeat costs no database work once the goal is live.
+    """
+    timer = _live_timer(db, goal_id, user_id)
+    timer.goal.time_spent_seconds = time_spent_seconds
+    timer_store.mark_dirty(timer)
 
-    return MicroGoalSchema.model_validate(micro_goal)
+    return timer.goal
 
 
 @router.get("/micro-goals/{goal_id}/execution-summary", response_model=ExecutionSummary)
-async def get_execution_summary(goal_id: int, db: Session = Depends(get_db)):
+@query_budget(3, rows=7)
+async def get_execution_summary(goal_id: int, user_id: int = Depends(current_user_id), db: Session = Depends(get_db)):
     """
     Get detailed execution summary comparing planned vs actual for a micro-goal
     """
-    micro_goal = db.query(MicroGoal).filter(MicroGoal.id == goal_id).first()
-    if not micro_goal:
-        raise HTTPException(status_code=404, detail="Micro-goal not found")
+    micro_goal = _get_micro_goal(db, goal_id, user_id)
+    # Time and start/end not yet flushed are in the timer store
+    live = timer_store.get(goal_id, user_id)
+    state = live.goal if live is not None else micro_goal
 
     # Get all execution events
     events = db.query(ExecutionEvent).filter(
@@ -434,7 +857,13 @@ async def get_execution_summary(goal_id: int, db: Session = Depends(get_db)):
     total_sessions = len(start_events) + len(resume_events)
     total_pauses = len(pause_events)
 
-    actual_duration_seconds = micro_goal.time_spent_seconds or 0
+    # Include events the retention job already rolled up
+    summary = micro_goal.event_summary
+    if summary is not None:
+        total_sessions += summary.start_count + summary.resume_count
+        total_pauses += summary.pause_count
+
+    actual_duration_seconds = state.time_spent_seconds or 0
     actual_duration_minutes = actual_duration_seconds / 60.0
     planned_duration_minutes = micro_goal.estimated_minutes
     variance_minutes = actual_duration_minutes - planned_duration_minutes
@@ -446,23 +875,52 @@ async def get_execution_summary(goal_id: int, db: Session = Depends(get_db)):
         variance_minutes=variance_minutes,
         total_pauses=total_pauses,
         total_sessions=total_sessions,
-        started_at=micro_goal.actual_start_time,
-        completed_at=micro_goal.actual_end_time,
+        started_at=state.actual_start_time,
+        completed_at=state.actual_end_time,
         events=[ExecutionEventSchema.model_validate(e) for e in events]
     )
 
 
 @router.get("/tasks/{task_id}/progress", response_model=ProgressDataResponse)
-async def get_task_progress(task_id: int, db: Session = Depends(get_db)):
+@query_budget(4, rows=13)
+async def get_task_progress(
+    task_id: int,
+    request: Request,
+    if_none_match: Optional[str] = Header(None),
+    user_id: int = Depends(current_user_id),
+    db: Session = Depends(get_db)
+):
     """
     Get progress summary for a task with AI-generated tips
+
+    Supports conditional GET. Tips also depend on the clock, so the ETag
+    changes with the task version and every PROGRESS_ETAG_WINDOW_SECONDS;
+    the cached response is reused until either changes.
     """
-    task = db.query(Task).filter(Task.id == task_id).first()
+    timer_store.flush_owner(user_id)  # Running timers' state, before it's read from the rows
+    window = int(time.time() // settings.PROGRESS_ETAG_WINDOW_SECONDS)
+    cached = cache.get(progress_key(task_id))
+    if cached is not None and cached.owner_id == user_id and cached.etag.endswith(f'-{window}"'):
+        if _etag_matches(if_none_match, cached.etag):
+            return _not_modified(cached.etag)
+        return _cached_json(cached)
+
+    version = db.query(Task.version).filter(Task.id == task_id, Task.owner_id == user_id).scalar()
+    if version is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    etag = f'W/"progress-{task_id}-v{version}-{window}"'
+    if _etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+
+    task = db.query(Task).filter(Task.id == task_id, Task.owner_id == user_id).first()
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
     # Get all micro-goals (excluding breaks for counting)
-    all_goals = db.query(MicroGoal).filter(MicroGoal.task_id == task_id).order_by(MicroGoal.order).all()
+    all_goals = db.query(MicroGoal).filter(
+        MicroGoal.task_id == task_id, MicroGoal.owner_id == user_id
+    ).order_by(MicroGoal.order).all()
     work_goals = [g for g in all_goals if not g.is_break]
 
     # Calculate statistics
@@ -516,6 +974,7 @@ async def get_task_progress(task_id: int, db: Session = Depends(get_db)):
         task_details.append(task_detail)
 
     progress_data = {
+        "task_id": task.id,
         "total_tasks": total_tasks,
         "completed_tasks": completed_tasks,
         "total_planned_minutes": total_planned_minutes,
@@ -533,12 +992,14 @@ async def get_task_progress(task_id: int, db: Session = Depends(get_db)):
 
     # Generate tips using LLM
     try:
-        tips = await llm_service.generate_progress_tips(progress_data)
+        tips = await cancel_on_disconnect(request, llm_service.generate_progress_tips(progress_data))
+    except ClientDisconnected:
+        raise
     except Exception as e:
         print(f"ERROR generating tips: {str(e)}")
-        tips = ["Keep up the good work!", "Stay focused on your goals.", "Take breaks when needed."]
+        tips = heuristic_tips(progress_data)
 
-    return ProgressDataResponse(
+    progress = ProgressDataResponse(
         total_tasks=total_tasks,
         completed_tasks=completed_tasks,
         total_planned_minutes=total_planned_minutes,
@@ -549,3 +1010,10 @@ async def get_task_progress(task_id: int, db: Session = Depends(get_db)):
         upcoming_tasks_count=upcoming_tasks_count,
         tips=tips
     )
+    with phase("serialization"):
+        cached = CachedResponse(user_id, etag, PROGRESS_ADAPTER.dump_json(progress))
+
+    # The task may have changed while the tips were generated; don't cache a stale view
+    if db.query(Task.version).filter(Task.id == task_id).scalar() == version:
+        cache.set(progress_key(task_id), cached)
+    return _cached_json(cached)
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from app.core.auth import create_user, current_user_id
+from app.core.database import get_db
+from app.models.user import User
+from app.schemas.user import UserCreate, UserResponse, UserTokenResponse
+
+router = APIRouter()
+
+
+@router.post("/", response_model=UserTokenResponse, status_code=201)
+async def register_user(user_create: UserCreate):
+    """
+    Create a user and return its API token
+
+    The token is only returned here; send it as "Authorization: Bearer <token>".
+    """
+    user, token = create_user(user_create.name)
+    return UserTokenResponse(id=user.id, name=user.name, created_at=user.created_at, token=token)
+
+
+@router.get("/me", response_model=UserResponse)
+async def get_current_user(user_id: int = Depends(current_user_id), db: Session = Depends(get_db)):
+    """
+    Get the user the request is authenticated as
+    """
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    return UserResponse.model_validate(user)
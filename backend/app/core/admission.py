@@ -0,0 +1,214 @@
+"""
+Admission control: priority lanes, per-user LLM rate limits and load shedding.
+
+Requests are sorted into lanes by route, each with its own concurrency
+limit and wait queue, so a burst of slow LLM-backed requests can't delay
+the cheap timer endpoints:
+
+- "timer": start/pause/resume/complete/time/execution-summary
+- "llm": breakdown (single, batch, queued, drafts) and progress (tips)
+- "default": every other API route
+
+A request waits for a slot in its lane for at most
+ADMISSION_QUEUE_TIMEOUT_SECONDS. When a lane's queue is already at its
+depth limit (or the wait times out) the request is shed immediately with
+503 and a Retry-After estimated from the lane's recent service time,
+instead of piling up. Breakdown POSTs and progress GETs (which generate
+tips) are also rate limited per user with token buckets, one per kind so
+progress polling can't use up the user's breakdowns (429 with
+Retry-After); drafts aren't, they are debounced and superseded by the
+draft service instead.
+
+Job long-polls (GET /jobs/{id}?wait=N) bypass the lanes: they mostly sleep
+and would otherwise hold a slot for up to 30 seconds.
+"""
+import asyncio
+import hashlib
+import json
+import math
+import re
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Optional
+
+from app.core.config import settings
+
+TIMER_PATH_RE = re.compile(r"^/api/tasks/micro-goals/")
+PROGRESS_PATH_RE = re.compile(r"^/api/tasks/tasks/[^/]+/progress$")
+BREAKDOWN_PATHS = {"/api/tasks/breakdown", "/api/tasks/breakdown/batch", "/api/tasks/breakdown/jobs"}
+# Speculative breakdowns while the user types: LLM-backed but not rate limited,
+# since the draft service debounces them and cancels superseded ones
+DRAFT_PATHS = {"/api/tasks/breakdown/drafts"}
+BYPASS_PATH_RE = re.compile(r"^/api/tasks/jobs/")
+
+RATE_LIMIT_MAX_USERS = 10000  # Buckets kept in memory, least recently used dropped first
+
+# Lanes of the running middleware, for /health
+admission_stats: Dict[str, "Lane"] = {}
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status: int, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class Lane:
+    """Concurrency limit with a bounded FIFO wait queue"""
+
+    def __init__(self, name: str, concurrency: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self._waiters = deque()
+        self.service_seconds = 0.1  # EWMA of time a request holds a slot
+        self.shed = 0
+
+    def retry_after(self) -> float:
+        """Rough time until a newly queued request would get a slot"""
+        return self.service_seconds * (len(self._waiters) + 1) / self.concurrency
+
+    async def acquire(self):
+        if self.active < self.concurrency and not self._waiters:
+            self.active += 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self.shed += 1
+            raise AdmissionRejected(503, f"Server is busy ({self.name} queue full), retry later", self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up: pass it on
+                self.release()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.shed += 1
+            raise AdmissionRejected(503, f"Server is busy ({self.name} queue timeout), retry later", self.retry_after())
+
+    def release(self, held_seconds: Optional[float] = None):
+        if held_seconds is not None:
+            self.service_seconds = 0.8 * self.service_seconds + 0.2 * held_seconds
+        # Hand the slot straight to the next waiter so a newcomer can't jump the queue
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> Dict:
+        return {"active": self.active, "queued": len(self._waiters), "limit": self.concurrency, "shed": self.shed}
+
+
+class RateLimiter:
+    """Per-key token buckets: `rate_per_minute` sustained, up to `burst` at once"""
+
+    def __init__(self, rate_per_minute: float, burst: int):
+        self.rate = rate_per_minute / 60.0
+        self.burst = max(1, burst)
+        self._buckets: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def check(self, key: str) -> Optional[float]:
+        """Take a token for key; returns seconds to wait instead when none is left"""
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens < 1:
+            self._buckets[key] = (tokens, now)
+            return (1 - tokens) / self.rate if self.rate > 0 else 60.0
+
+        self._buckets[key] = (tokens - 1, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > RATE_LIMIT_MAX_USERS:
+            self._buckets.popitem(last=False)
+        return None
+
+
+def rate_limit_bucket(method: str, path: str) -> Optional[str]:
+    """Which of the user's LLM token buckets a request draws from, or None when it isn't rate limited"""
+    if method == "POST" and path in BREAKDOWN_PATHS:
+        return "breakdown"
+    if method == "GET" and PROGRESS_PATH_RE.match(path):
+        return "progress"
+    return None
+
+
+def route_lane(method: str, path: str) -> Optional[str]:
+    """Lane name for a request, or None when it bypasses admission control"""
+    if not path.startswith("/api/") or BYPASS_PATH_RE.match(path):
+        return None
+    if TIMER_PATH_RE.match(path):
+        return "timer"
+    if (method == "POST" and (path in BREAKDOWN_PATHS or path in DRAFT_PATHS)) or (method == "GET" and PROGRESS_PATH_RE.match(path)):
+        return "llm"
+    return "default"
+
+
+async def _reject(send, rejected: AdmissionRejected):
+    body = json.dumps({"detail": rejected.detail}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": rejected.status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(rejected.retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware: rejected requests never reach routing, auth or the database"""
+
+    def __init__(self, app):
+        self.app = app
+        timeout = settings.ADMISSION_QUEUE_TIMEOUT_SECONDS
+        self.lanes = {
+            "timer": Lane("timer", settings.ADMISSION_TIMER_CONCURRENCY, settings.ADMISSION_QUEUE_DEPTH, timeout),
+            "llm": Lane("llm", settings.ADMISSION_LLM_CONCURRENCY, settings.ADMISSION_LLM_QUEUE_DEPTH, timeout),
+            "default": Lane("default", settings.ADMISSION_DEFAULT_CONCURRENCY, settings.ADMISSION_QUEUE_DEPTH, timeout),
+        }
+        self.rate_limiter = RateLimiter(settings.ADMISSION_LLM_RATE_PER_MINUTE, settings.ADMISSION_LLM_BURST)
+        admission_stats.update(self.lanes)
+
+    async def __call__(self, scope, receive, send):
+        lane_name = route_lane(scope["method"], scope["path"]) if scope["type"] == "http" else None
+        if lane_name is None or not settings.ADMISSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        bucket = rate_limit_bucket(scope["method"], scope["path"])
+        if bucket is not None:
+            # Same per-user key as the idempotency records: a hash of the token
+            authorization = dict(scope["headers"]).get(b"authorization", b"")
+            retry_after = self.rate_limiter.check(f"{bucket} {hashlib.sha256(authorization).hexdigest()[:16]}")
+            if retry_after is not None:
+                await _reject(send, AdmissionRejected(429, f"Too many {bucket} requests, retry later", retry_after))
+                return
+
+        lane = self.lanes[lane_name]
+        try:
+            await lane.acquire()
+        except AdmissionRejected as rejected:
+            print(f"WARNING: Shedding {scope['method']} {scope['path']}: {rejected.detail}")
+            await _reject(send, rejected)
+            return
+
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            lane.release(time.monotonic() - started)
@@ -0,0 +1,103 @@
+"""
+Lightweight bearer-token auth.
+
+Each user has an API token (only its sha256 is stored). Routes depend on
+`current_user_id` and scope every query by the returned owner id. Resolved
+tokens are cached in-process, so an authenticated request normally costs no
+extra query and no database session (important for /breakdown, which must
+not hold a connection while the LLM runs).
+
+Without AUTH_REQUIRED, requests that send no token act as a local default
+user, which also owns every row created before users existed.
+"""
+import hashlib
+import secrets
+from typing import Dict, Optional, Tuple
+
+from fastapi import Header, HTTPException
+
+from app.core.config import settings
+from app.core.database import session_scope
+from app.models.job import Job
+from app.models.task import Task, MicroGoal, ExecutionEvent
+from app.models.user import User
+
+TOKEN_CACHE_SIZE = 1024
+
+_token_cache: Dict[str, int] = {}
+_default_user_id: Optional[int] = None
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def create_user(name: str) -> Tuple[User, str]:
+    """Create a user and return it with its plain API token (shown once, never stored)"""
+    token = secrets.token_urlsafe(32)
+    with session_scope() as db:
+        user = User(name=name, token_hash=hash_token(token))
+        db.add(user)
+        db.flush()
+        db.expunge(user)
+    return user, token
+
+
+def init_default_user() -> int:
+    """Create the local default user and give it any rows that predate users"""
+    global _default_user_id
+    with session_scope() as db:
+        user = db.query(User).filter(User.token_hash.is_(None)).order_by(User.id).first()
+        if user is None:
+            user = User(name=settings.DEFAULT_USER_NAME)
+            db.add(user)
+            db.flush()
+
+        for model in (Task, MicroGoal, ExecutionEvent, Job):
+            db.query(model).filter(model.owner_id.is_(None)).update(
+                {model.owner_id: user.id}, synchronize_session=False
+            )
+        _default_user_id = user.id
+    return _default_user_id
+
+
+def _user_id_for_token(token: str) -> Optional[int]:
+    token_hash = hash_token(token)
+    user_id = _token_cache.get(token_hash)
+    if user_id is None:
+        with session_scope() as db:
+            user_id = db.query(User.id).filter(User.token_hash == token_hash).scalar()
+        if user_id is not None:
+            if len(_token_cache) >= TOKEN_CACHE_SIZE:
+                _token_cache.clear()
+            _token_cache[token_hash] = user_id
+    return user_id
+
+
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(status_code=401, detail=detail, headers={"WWW-Authenticate": "Bearer"})
+
+
+async def current_user_id(authorization: Optional[str] = Header(None)) -> int:
+    """Dependency: id of the user making the request"""
+    if not authorization:
+        if settings.AUTH_REQUIRED:
+            raise _unauthorized("Not authenticated")
+        return _default_user_id if _default_user_id is not None else init_default_user()
+
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        raise _unauthorized("Invalid authorization header")
+
+    user_id = _user_id_for_token(token.strip())
+    if user_id is None:
+        raise _unauthorized("Invalid token")
+    return user_id
+
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Dependency: reject requests without the operator's ADMIN_TOKEN"""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin token required")
@@ -0,0 +1,188 @@
+"""
+Read-through cache for serialized task responses.
+
+The list, detail and progress endpoints cache their rendered JSON bodies
+(plus the ETag they were served with), so repeated reads skip the database
+and Pydantic entirely. Entries are invalidated precisely: mutations call
+`mark_tasks_changed` on their session and the affected keys are deleted
+right after that session commits (nothing is dropped if it rolls back).
+A TTL bounds staleness when several processes share a Redis backend.
+
+Backends:
+- "memory": in-process LRU (default)
+- "redis": any Redis-compatible server, needs the optional `redis` package
+- "none": caching disabled
+"""
+import pickle
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Iterable, NamedTuple, Optional
+
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+
+
+class CachedResponse(NamedTuple):
+    owner_id: int
+    etag: str
+    body: bytes
+
+
+class Cache(ABC):
+    """Interface for cache backends"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        ...
+
+    @abstractmethod
+    def delete(self, *keys: str):
+        ...
+
+    @abstractmethod
+    def clear(self):
+        ...
+
+
+class NullCache(Cache):
+    def get(self, key: str) -> Optional[Any]:
+        return None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        pass
+
+    def delete(self, *keys: str):
+        pass
+
+    def clear(self):
+        pass
+
+
+class LRUCache(Cache):
+    """Thread-safe in-process LRU with per-entry expiry"""
+
+    def __init__(self, max_entries: int = 2048, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (entry[0] is not None and entry[0] < time.monotonic()):
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        ttl = ttl if ttl is not None else self.ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys: str):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCache(Cache):
+    """Redis-compatible backend; values are pickled under a key prefix"""
+
+    def __init__(self, url: str, ttl: Optional[float] = None, prefix: str = "proc:"):
+        import redis  # Optional dependency, only needed for this backend
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.client.get(self.prefix + key)
+        return pickle.loads(value) if value is not None else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        ttl = ttl if ttl is not None else self.ttl
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=int(ttl) if ttl else None)
+
+    def delete(self, *keys: str):
+        if keys:
+            self.client.delete(*(self.prefix + key for key in keys))
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+
+def create_cache() -> Cache:
+    backend = settings.CACHE_BACKEND.lower()
+    if backend == "none":
+        return NullCache()
+    if backend == "redis":
+        try:
+            return RedisCache(settings.CACHE_REDIS_URL, ttl=settings.CACHE_TTL_SECONDS)
+        except ImportError:
+            print("WARNING: redis is not installed, falling back to the in-process cache")
+    return LRUCache(max_entries=settings.CACHE_MAX_ENTRIES, ttl=settings.CACHE_TTL_SECONDS)
+
+
+cache = create_cache()
+
+
+def task_key(task_id: int) -> str:
+    return f"task:{task_id}"
+
+
+def task_list_key(owner_id: int, confirmed_only: bool) -> str:
+    return f"tasks:{owner_id}:{int(confirmed_only)}"
+
+
+def progress_key(task_id: int) -> str:
+    return f"progress:{task_id}"
+
+
+def mark_tasks_changed(db, owner_id: Optional[int], task_ids: Iterable[int] = ()):
+    """Drop cached responses for these tasks (and the owner's task lists) once db commits"""
+    if not db.in_transaction():
+        # rollback() is a no-op without a transaction, so it would keep these for the next commit
+        db.begin()
+    keys = db.info.setdefault("cache_invalidations", set())
+    for task_id in task_ids:
+        if task_id is not None:
+            keys.update((task_key(task_id), progress_key(task_id)))
+    if owner_id is not None:
+        keys.update((task_list_key(owner_id, False), task_list_key(owner_id, True)))
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _invalidate_after_commit(session):
+    keys = session.info.pop("cache_invalidations", None)
+    if keys:
+        cache.delete(*keys)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop("cache_invalidations", None)
@@ -1,3 +1,4 @@
+from datetime import time
 from pydantic_settings import BaseSettings
 from typing import List
 
@@ -12,9 +13,128 @@ class Settings(BaseSettings):
     # Database
     DATABASE_URL: str = "sqlite:///./tasks.db"
 
+    # Auth: requests send "Authorization: Bearer <token>" (see POST /api/users).
+    # When not required, requests without a token act as the local default user.
+    AUTH_REQUIRED: bool = False
+    DEFAULT_USER_NAME: str = "local"
+
+    # Operator token for /api/admin (sent as "X-Admin-Token"); empty disables the admin API and profiling
+    ADMIN_TOKEN: str = ""
+
+    # On-demand profiling: requests sent with "X-Profile-Token: <ADMIN_TOKEN>" (or ?profile=<ADMIN_TOKEN>)
+    # are sampled and stored for download from /api/admin/profiles
+    PROFILING_SAMPLE_INTERVAL_MS: float = 5.0  # Finer than the GIL switch interval (5 ms) buys little
+    PROFILING_MAX_PROFILES: int = 50  # Oldest stored profiles are dropped beyond this
+
+    # Cache for serialized task and progress responses: "memory", "redis" (needs redis) or "none"
+    CACHE_BACKEND: str = "memory"
+    CACHE_MAX_ENTRIES: int = 2048  # In-process LRU size
+    CACHE_TTL_SECONDS: int = 600  # Upper bound on staleness across processes
+    CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+
+    # Response compression: "gzip", "brotli" (needs brotli-asgi) or "none"
+    RESPONSE_COMPRESSION: str = "gzip"
+    RESPONSE_COMPRESSION_MIN_BYTES: int = 1024  # Small payloads aren't worth compressing
+    RESPONSE_COMPRESSION_LEVEL: int = 5  # gzip 1-9, brotli 0-11
+
+    # Background job queue
+    JOB_WORKERS: int = 2  # Concurrent background LLM jobs per process
+    JOB_STALE_SECONDS: int = 600  # Running jobs older than this are requeued on startup
+    JOB_RETENTION_HOURS: float = 24.0  # Finished jobs (and their results) are deleted after this
+
+    # Admission control: separate lanes so LLM-backed requests can't queue up timer clicks
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_TIMER_CONCURRENCY: int = 32  # Start/pause/resume/complete in flight at once
+    ADMISSION_LLM_CONCURRENCY: int = 8  # Breakdown and progress (tips) requests in flight at once
+    ADMISSION_DEFAULT_CONCURRENCY: int = 16  # All other API requests
+    ADMISSION_LLM_QUEUE_DEPTH: int = 16  # Waiting LLM requests before new ones get 503
+    ADMISSION_QUEUE_DEPTH: int = 64  # Waiting requests in the other lanes before shedding
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 10.0  # Longest wait for a slot before 503
+    ADMISSION_LLM_RATE_PER_MINUTE: float = 20.0  # Breakdown (and, separately, progress) requests per user, sustained
+    ADMISSION_LLM_BURST: int = 5  # Breakdown (and, separately, progress) requests per user allowed back to back
+
+    # How long Idempotency-Key responses are kept for replay
+    IDEMPOTENCY_TTL_SECONDS: int = 24 * 60 * 60
+    IDEMPOTENCY_LEASE_SECONDS: int = 120  # A retry takes over a key whose request ran longer (LLM attempts with retries)
+
+    # Conditional GET: how long progress (and its tips) stays fresh for an unchanged task
+    PROGRESS_ETAG_WINDOW_SECONDS: int = 300
+
+    # Retention: compact old execution events and archive old tasks
+    RETENTION_ENABLED: bool = True
+    RETENTION_EVENT_DAYS: int = 90  # Older events are rolled into per-goal summaries
+    RETENTION_TASK_DAYS: int = 365  # Older tasks are moved to the archive database
+    RETENTION_ARCHIVE_DATABASE_URL: str = "sqlite:///./tasks_archive.db"
+    RETENTION_INTERVAL_HOURS: float = 24.0  # How often the retention job runs
+    RETENTION_BATCH_SIZE: int = 500  # Rows per transaction, keeps write locks short
+    RETENTION_VACUUM: bool = False  # VACUUM after run_retention.py removed rows; locks the database while it runs (SQLite only)
+    RETENTION_UNCONFIRMED_TASK_HOURS: float = 24.0  # Breakdowns never confirmed are deleted after this
+
+    # Live timer state is kept in memory and written behind (see app/services/timer_store.py)
+    TIMER_FLUSH_INTERVAL_SECONDS: float = 5.0  # 0 writes every timer change through immediately
+    TIMER_LEASE_SECONDS: float = 15.0  # A second API process waits this long for the live timers, then refuses to start
+
+    # Task list (GET /api/tasks/): newest first, older pages with ?before=<id of the last task>
+    TASK_LIST_PAGE_SIZE: int = 50  # Tasks per page when the request sets no limit
+
+    # Delta sync feed (/api/sync)
+    SYNC_PAGE_SIZE: int = 500  # Changed entities returned per call
+    SYNC_TOMBSTONE_DAYS: int = 30  # Clients offline for longer get a full resync
+
     # Google Gemini
     GEMINI_API_KEY: str = ""
     GEMINI_MODEL: str = "gemini-2.0-flash-exp"
+    GEMINI_TIPS_MODEL: str = ""  # Cheaper/faster model for progress tips (empty: GEMINI_MODEL)
+
+    # LLM backends: "gemini", "local" (OpenAI-compatible server) and "fake" (offline heuristics),
+    # comma-separated in preference order; each call goes to the fastest healthy one
+    LLM_PROVIDERS: str = "gemini"
+    LLM_TIPS_PROVIDERS: str = ""  # Backends for progress tips (empty: LLM_PROVIDERS)
+    LOCAL_LLM_BASE_URL: str = "http://localhost:8080/v1"  # llama.cpp, vLLM, Ollama (/v1), ...
+    LOCAL_LLM_MODEL: str = "local-model"
+    LOCAL_LLM_TIPS_MODEL: str = ""  # Smaller local model for tips (empty: LOCAL_LLM_MODEL)
+    LOCAL_LLM_API_KEY: str = ""
+    LLM_ROUTER_WINDOW: int = 50  # Recent calls per backend used for its error rate
+    LLM_ROUTER_MAX_ERROR_RATE: float = 0.5  # Above this a backend sits out for LLM_CIRCUIT_RESET_SECONDS
+    LLM_ROUTER_EXPLORE_RATE: float = 0.05  # Share of calls sent to the runner-up to re-measure it
+
+    # LLM resilience
+    LLM_TIMEOUT_SECONDS: float = 30.0  # Deadline for a single upstream attempt
+    LLM_MAX_RETRIES: int = 2  # Retries on transient errors (timeouts, 429, 5xx)
+    LLM_RETRY_BASE_DELAY_SECONDS: float = 0.5  # Base for jittered exponential backoff
+    LLM_CIRCUIT_FAILURE_THRESHOLD: int = 5  # Consecutive failures before failing fast
+    LLM_CIRCUIT_RESET_SECONDS: float = 30.0  # How long the circuit stays open
+    LLM_HEDGE_ENABLED: bool = False  # Send a second request when the first is slow
+    LLM_HEDGE_PERCENTILE: float = 95.0  # Latency percentile that triggers a hedge
+    LLM_STRUCTURED_OUTPUT: bool = True  # JSON mode with a response schema
+
+    # Progress tips prompt budget
+    LLM_TIPS_MAX_PROMPT_TOKENS: int = 1500  # Cap for the per-call (dynamic) part of the prompt
+    LLM_TIPS_MAX_OUTPUT_TOKENS: int = 512  # Three short tips need far less than the old 4096
+    LLM_TIPS_CONTEXT_CACHE: bool = False  # Cache the static preamble upstream when supported
+    LLM_TIPS_CONTEXT_CACHE_TTL_SECONDS: int = 3600
+
+    # Batch breakdown packing
+    LLM_BATCH_MAX_PROMPT_TOKENS: int = 6000  # Estimated input tokens per packed call
+    LLM_BATCH_MAX_ITEMS_PER_CALL: int = 8  # Keeps the output under max_output_tokens
+    LLM_BATCH_CONCURRENCY: int = 4  # Packed calls in flight at once
+    BATCH_MAX_ITEMS: int = 100  # Inputs accepted per batch request
+
+    # Calendar scheduling (schedule_mode="calendar"): working hours and how far ahead goals may be placed
+    SCHEDULE_DAY_START: time = time(9, 0)  # Days after the first start here
+    SCHEDULE_DAY_END: time = time(18, 0)  # Day end when the request has no end_time
+    SCHEDULE_MAX_DAYS: int = 14  # Goals that don't fit within this many days are left unscheduled
+
+    # Reuse a saved template instead of calling the LLM when the input is this similar (0-1, Jaccard on words)
+    TEMPLATE_MATCH_THRESHOLD: float = 0.8
+
+    # Draft breakdowns (/breakdown/drafts) computed while the user is still typing
+    DRAFT_DEBOUNCE_MS: int = 400  # Quiet time before a draft is computed; newer drafts cancel it
+    DRAFT_RESULT_TTL_SECONDS: int = 300  # How long a draft plan is reused by /breakdown
+    DRAFT_MAX_RESULTS: int = 1000  # Draft plans kept in memory, least recently used dropped first
+
+    # Use the local heuristic breakdown when the LLM is unavailable
+    HEURISTIC_FALLBACK_ENABLED: bool = True
 
     @property
     def cors_origins_list(self) -> List[str]:
@@ -1,4 +1,5 @@
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
@@ -20,3 +21,107 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+@contextmanager
+def session_scope():
+    """
+    Short-lived session for one unit of work: commits on success, rolls back
+    on error. Use it instead of get_db in endpoints that await slow upstream
+    calls, so no connection is checked out while they wait.
+    """
+    db = SessionLocal()
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _add_missing_columns(bind, metadata):
+    """
+    Add columns that were introduced after a table was first created
+
+    create_all only creates missing tables; this keeps existing local
+    databases usable without a reset. Only additive changes are handled.
+    """
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table in metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(bind.dialect)}"
+                if column.server_default is not None:
+                    default = column.server_default.arg
+                    ddl += f" DEFAULT {default.text if hasattr(default, 'text') else repr(default)}"
+                print(f"Adding missing column {table.name}.{column.name}")
+                conn.execute(text(ddl))
+
+
+def _enable_sqlite_autoincrement(bind, metadata):
+    """
+    Rebuild SQLite tables that should never reuse ids (sqlite_autoincrement)
+    but were created without AUTOINCREMENT
+
+    Without it SQLite hands the highest id out again after that row is
+    deleted, so a new task could match a stale ETag or an archived task.
+    The table is copied under a temporary name and swapped in. Dropping the
+    old table drops its triggers (full-text search, sync change log), so
+    they are recreated as they were; its indexes are recreated right after.
+    """
+    if bind.dialect.name != "sqlite":
+        return
+    from sqlalchemy.schema import CreateTable
+
+    with bind.begin() as conn:
+        for table in metadata.sorted_tables:
+            if not table.dialect_options["sqlite"].get("autoincrement"):
+                continue
+            ddl = conn.execute(
+                text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": table.name}
+            ).scalar()
+            if ddl is None or "AUTOINCREMENT" in ddl.upper():
+                continue
+
+            print(f"Rebuilding {table.name} with AUTOINCREMENT ids")
+            triggers = conn.execute(
+                text("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = :name"), {"name": table.name}
+            ).scalars().all()
+            rebuild = f"{table.name}_rebuild"
+            create = str(CreateTable(table).compile(dialect=bind.dialect))
+            conn.execute(text(create.replace(f"CREATE TABLE {table.name} ", f"CREATE TABLE {rebuild} ", 1)))
+            columns = ", ".join(f'"{column.name}"' for column in table.columns)
+            conn.execute(text(f"INSERT INTO {rebuild} ({columns}) SELECT {columns} FROM {table.name}"))
+            conn.execute(text(f"DROP TABLE {table.name}"))
+            conn.execute(text(f"ALTER TABLE {rebuild} RENAME TO {table.name}"))
+            for trigger in triggers:
+                conn.exec_driver_sql(trigger)
+
+
+def _create_missing_indexes(bind, metadata):
+    """Create indexes added to models after their table already existed"""
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+
+
+def sync_schema(bind, metadata):
+    """Create any missing tables, columns and indexes for a metadata on an engine"""
+    metadata.create_all(bind=bind)
+    _add_missing_columns(bind, metadata)
+    _enable_sqlite_autoincrement(bind, metadata)
+    _create_missing_indexes(bind, metadata)
+
+
+def init_db():
+    """Create any missing tables, columns and indexes for the registered models"""
+    import app.models  # noqa: F401  Import models to register them
+
+    sync_schema(engine, Base.metadata)
@@ -0,0 +1,61 @@
+"""
+Stop request work when the client goes away.
+
+Starlette keeps running an endpoint after its client disconnects, so an
+abandoned /breakdown would still wait for the LLM and then write a task
+nobody will confirm. `cancel_on_disconnect` runs the work alongside a
+watcher on the ASGI receive channel (which yields `http.disconnect` once
+the body has been read and the client leaves) and cancels the work when
+the watcher fires first. Cancellation reaches the in-flight LLM call (an
+OpenAI-compatible request is aborted; a Gemini SDK call is abandoned to its
+own timeout), and work that hasn't reached its write transaction never
+writes.
+"""
+import asyncio
+from typing import Awaitable, TypeVar
+
+from fastapi import Request
+from fastapi.responses import Response
+
+T = TypeVar("T")
+
+# nginx's "client closed request"; never seen by the client, but shows up in access logs
+CLIENT_CLOSED_REQUEST = 499
+
+
+class ClientDisconnected(Exception):
+    """The client went away before the response was ready; the work was cancelled"""
+
+
+async def _wait_for_disconnect(request: Request):
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def cancel_on_disconnect(request: Request, awaitable: Awaitable[T]) -> T:
+    """
+    Await awaitable, cancelling it if the client disconnects first
+
+    Raises:
+        ClientDisconnected: the client left and the work was cancelled
+    """
+    work = asyncio.ensure_future(awaitable)
+    watcher = asyncio.ensure_future(_wait_for_disconnect(request))
+    try:
+        await asyncio.wait({work, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+        if not work.done():
+            work.cancel()
+            await asyncio.gather(work, return_exceptions=True)
+
+    if work.cancelled():
+        print(f"DEBUG: Client disconnected, cancelled {request.method} {request.url.path}")
+        raise ClientDisconnected()
+    return work.result()
+
+
+async def client_disconnected_handler(request: Request, exc: ClientDisconnected) -> Response:
+    return Response(status_code=CLIENT_CLOSED_REQUEST)
@@ -0,0 +1,174 @@
+"""
+Idempotency-Key support for mutating endpoints.
+
+Clients may send an `Idempotency-Key` header with POST/PUT/PATCH/DELETE
+requests. The first request with a key is executed and its response stored
+for IDEMPOTENCY_TTL_SECONDS; retries with the same key and the same request
+get the stored response replayed instead of running the handler again (no
+duplicate tasks, LLM calls or execution events).
+
+- same key, different request body -> 422 (keys are scoped per method
+  and path, so another endpoint never sees the record)
+- same key while the first request is still running -> 409 with Retry-After
+- a running request holds the key for IDEMPOTENCY_LEASE_SECONDS; a retry
+  after that runs the request again (the first one's process may have
+  died), and a response from the first one is then no longer stored
+- 5xx responses are not stored, so a retry after a server error runs again;
+  neither is a 499 (the client disconnected and the work was cancelled)
+"""
+import hashlib
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.disconnect import CLIENT_CLOSED_REQUEST
+from app.models.idempotency import IdempotencyRecord
+
+IDEMPOTENT_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+HEADER = b"idempotency-key"
+
+
+def _json_response(status: int, detail: str, extra_headers=None):
+    body = json.dumps({"detail": detail}).encode("utf-8")
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    return status, headers + (extra_headers or []), body
+
+
+async def _send_response(send, status: int, headers, body: bytes):
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyMiddleware:
+    """Pure ASGI middleware so the request body can be buffered and replayed safely"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in IDEMPOTENT_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        header_key = dict(scope["headers"]).get(HEADER)
+        if not header_key:
+            await self.app(scope, receive, send)
+            return
+
+        idempotency_key = header_key.decode("latin-1").strip()
+        if len(idempotency_key) > 128:
+            await _send_response(send, *_json_response(400, "Idempotency-Key must be at most 128 characters"))
+            return
+
+        # Buffer the request body so it can be fingerprinted and passed on
+        chunks = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        body = b"".join(chunks)
+
+        # Keys are per user: the same key from two users never shares a record
+        authorization = dict(scope["headers"]).get(b"authorization", b"")
+        user_scope = hashlib.sha256(authorization).hexdigest()[:16]
+        record_key = f"{scope['method']} {scope['path']} {user_scope} {idempotency_key}"
+        fingerprint = hashlib.sha256(
+            b"\n".join([scope["method"].encode(), scope["path"].encode(), scope.get("query_string", b""), body])
+        ).hexdigest()
+
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            existing = db.query(IdempotencyRecord).filter(IdempotencyRecord.key == record_key).first()
+            if existing and existing.expires_at < now:
+                # Expired replay, or a request whose lease ran out; a concurrent retry may have removed it already
+                db.query(IdempotencyRecord).filter(
+                    IdempotencyRecord.id == existing.id, IdempotencyRecord.expires_at < now
+                ).delete(synchronize_session=False)
+                db.commit()
+                existing = None
+
+            if existing:
+                if existing.fingerprint != fingerprint:
+                    await _send_response(send, *_json_response(422, "Idempotency-Key was already used for a different request"))
+                elif existing.status != "completed":
+                    await _send_response(send, *_json_response(409, "A request with this Idempotency-Key is still in progress", [(b"retry-after", b"1")]))
+                else:
+                    headers = [
+                        (b"content-type", (existing.response_content_type or "application/json").encode()),
+                        (b"content-length", str(len(existing.response_body or b"")).encode()),
+                        (b"idempotent-replayed", b"true"),
+                    ]
+                    await _send_response(send, existing.response_status, headers, existing.response_body or b"")
+                return
+
+            # Claim the key; a concurrent duplicate loses the unique constraint race
+            record = IdempotencyRecord(
+                key=record_key,
+                fingerprint=fingerprint,
+                status="in_progress",
+                expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_LEASE_SECONDS),
+            )
+            db.add(record)
+            try:
+                db.flush()
+                record_id = record.id
+                db.commit()
+            except IntegrityError:
+                db.rollback()
+                await _send_response(send, *_json_response(409, "A request with this Idempotency-Key is still in progress", [(b"retry-after", b"1")]))
+                return
+
+            # Opportunistically drop expired keys so the table stays small
+            db.query(IdempotencyRecord).filter(IdempotencyRecord.expires_at < now).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+        response = {"status": 500, "content_type": None, "body": []}
+
+        async def replay_receive():
+            nonlocal body
+            if body is None:
+                return await receive()
+            message = {"type": "http.request", "body": body, "more_body": False}
+            body = None
+            return message
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["content_type"] = dict(message.get("headers", [])).get(b"content-type", b"").decode("latin-1")
+            elif message["type"] == "http.response.body":
+                response["body"].append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        finally:
+            self._finish(record_id, response)
+
+    @staticmethod
+    def _finish(record_id: int, response: dict):
+        """Store the response for replay, or release the key if it shouldn't be replayed"""
+        db = SessionLocal()
+        try:
+            # Gone when a retry took the key over after the lease ran out: that request's outcome stands
+            record = db.get(IdempotencyRecord, record_id)
+            if record is None:
+                return
+            if response["status"] >= 500 or response["status"] == CLIENT_CLOSED_REQUEST:
+                db.delete(record)
+            else:
+                record.status = "completed"
+                record.response_status = response["status"]
+                record.response_body = b"".join(response["body"])
+                record.response_content_type = response["content_type"] or None
+                record.expires_at = datetime.utcnow() + timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS)
+            db.commit()
+        finally:
+            db.close()
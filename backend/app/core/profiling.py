@@ -0,0 +1,282 @@
+"""
+On-demand request profiling.
+
+Off unless ADMIN_TOKEN is set. With a token, the middleware is installed
+and a request that carries it (`X-Profile-Token` header or `?profile=`)
+is profiled:
+
+- a sampler thread snapshots the event loop thread's stack every
+  PROFILING_SAMPLE_INTERVAL_MS and keeps the samples whose stack runs
+  through this request's middleware frame or the root frame of a task it
+  spawned (e.g. the LLM call in cancel_on_disconnect), i.e. time the
+  request's own coroutines spent on the CPU (other requests sharing the
+  loop don't count)
+- SQL statements, LLM calls and response serialization are timed as
+  phases, so waiting time that sampling can't see shows up too
+
+The result is stored as a RequestProfile (a speedscope.app document plus
+the phase timings) and its id returned in the `X-Profile-Id` header;
+download it from /api/admin/profiles. Requests without the token go
+straight through, and without ADMIN_TOKEN none of this is installed.
+
+`phase()` is imported by hot modules (the LLM service), so this module
+only pulls in the database and FastAPI once profiling is set up.
+"""
+import asyncio
+import contextvars
+import json
+import secrets
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from app.core.config import settings
+
+HEADER = b"x-profile-token"
+QUERY_PARAM = "profile"
+
+_current_profile: contextvars.ContextVar[Optional["ProfileRecorder"]] = contextvars.ContextVar(
+    "current_profile", default=None
+)
+
+
+class ProfileRecorder:
+    """Samples and phase timings collected for one request"""
+
+    def __init__(self, method: str, path: str, anchor, thread_id: int):
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.anchor = anchor  # Middleware frame every sample of this request runs through
+        self.task_frames = set()  # Root frames of tasks the request spawned (see _profiling_task_factory)
+        self.thread_id = thread_id
+        self.phases: Dict[str, List[float]] = {}  # name -> [seconds, count]
+        self.frames: Dict[Tuple[str, str, int], int] = {}
+        self.samples: List[List[int]] = []
+        self.weights: List[float] = []
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample_loop, name=f"profile-{self.id[:8]}", daemon=True)
+
+    def add_phase(self, name: str, seconds: float):
+        totals = self.phases.setdefault(name, [0.0, 0])
+        totals[0] += seconds
+        totals[1] += 1
+
+    def start(self):
+        self._sampler.start()
+
+    def stop(self):
+        self.finished = time.perf_counter()
+        self._stop.set()
+        self._sampler.join()
+
+    def _frame_index(self, frame) -> int:
+        code = frame.f_code
+        # co_qualname is Python 3.11+
+        key = (getattr(code, "co_qualname", code.co_name), code.co_filename, code.co_firstlineno)
+        index = self.frames.get(key)
+        if index is None:
+            index = self.frames[key] = len(self.frames)
+        return index
+
+    def _sample_loop(self):
+        interval = settings.PROFILING_SAMPLE_INTERVAL_MS / 1000.0
+        last = time.perf_counter()
+        while not self._stop.wait(interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            stack = []
+            while frame is not None and frame is not self.anchor:
+                stack.append(frame)
+                if frame in self.task_frames:
+                    break
+                frame = frame.f_back
+            if frame is not None:  # Reached the anchor or a spawned task's root: the request is running
+                self.samples.append([self._frame_index(f) for f in reversed(stack)])
+                self.weights.append((now - last) * 1000.0)
+            last = now
+
+    def phase_summary(self) -> Dict[str, Dict[str, float]]:
+        return {name: {"ms": round(seconds * 1000.0, 3), "count": count} for name, (seconds, count) in self.phases.items()}
+
+    def speedscope(self) -> Dict:
+        duration_ms = ((self.finished or time.perf_counter()) - self.started) * 1000.0
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": f"{self.method} {self.path}",
+            "exporter": settings.APP_NAME,
+            "shared": {
+                "frames": [{"name": name, "file": file, "line": line} for name, file, line in self.frames]
+            },
+            "profiles": [{
+                "type": "sampled",
+                "name": f"{self.method} {self.path} (on-CPU samples)",
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": duration_ms,
+                "samples": self.samples,
+                "weights": self.weights,
+            }],
+        }
+
+
+@contextmanager
+def phase(name: str):
+    """Time a block as a named phase of the current profiled request (no-op otherwise)"""
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add_phase(name, time.perf_counter() - started)
+
+
+def _profiling_task_factory(loop, coro, context=None):
+    """Default tasks, but the root frame of one spawned by a profiled request is sampled with it"""
+    task = asyncio.Task(coro, loop=loop, context=context)
+    profile = context.get(_current_profile) if context is not None else _current_profile.get()
+    frame = getattr(coro, "cr_frame", None)
+    if profile is not None and frame is not None:
+        profile.task_frames.add(frame)
+    return task
+
+
+def _track_spawned_tasks():
+    loop = asyncio.get_running_loop()
+    factory = loop.get_task_factory()
+    if factory is None:
+        loop.set_task_factory(_profiling_task_factory)
+    elif factory is not _profiling_task_factory:
+        print("WARNING: The event loop has its own task factory, profiles won't sample spawned tasks")
+
+
+_hooks_installed = False
+
+
+def _install_phase_hooks():
+    """
+    SQL timings from engine events and serialization from FastAPI's response
+    serializer (patched module-wide, once; it only times profiled requests)
+    """
+    global _hooks_installed
+    if _hooks_installed:
+        return
+    _hooks_installed = True
+
+    from fastapi import routing
+    from sqlalchemy import event
+
+    from app.core.database import engine
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        if _current_profile.get() is not None:
+            conn.info.setdefault("profile_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_execute(conn, cursor, statement, parameters, context, executemany):
+        profile = _current_profile.get()
+        started = conn.info.get("profile_started")
+        if profile is not None and started:
+            profile.add_phase("sql", time.perf_counter() - started.pop())
+
+    serialize_response = getattr(routing, "serialize_response", None)
+    if serialize_response is None:
+        print("WARNING: fastapi.routing.serialize_response not found, profiles won't time serialization")
+        return
+
+    async def timed_serialize_response(**kwargs):
+        with phase("serialization"):
+            return await serialize_response(**kwargs)
+
+    routing.serialize_response = timed_serialize_response
+
+
+def _requested(scope) -> bool:
+    token = dict(scope["headers"]).get(HEADER, b"").decode("latin-1")
+    if not token and QUERY_PARAM.encode() in scope.get("query_string", b""):
+        token = parse_qs(scope["query_string"].decode("latin-1")).get(QUERY_PARAM, [""])[0]
+    return bool(token) and secrets.compare_digest(token, settings.ADMIN_TOKEN)
+
+
+def _store(profile: ProfileRecorder, status_code: Optional[int]):
+    from app.core.database import SessionLocal
+    from app.models.profile import RequestProfile
+
+    db = SessionLocal()
+    try:
+        db.add(RequestProfile(
+            id=profile.id,
+            method=profile.method,
+            path=profile.path[:500],
+            status_code=status_code,
+            duration_ms=(profile.finished - profile.started) * 1000.0,
+            phases=profile.phase_summary(),
+            sample_count=len(profile.samples),
+            speedscope=json.dumps(profile.speedscope()),
+            created_at=datetime.utcnow(),
+        ))
+        db.flush()
+        # Keep only the newest PROFILING_MAX_PROFILES
+        stale = [
+            profile_id for (profile_id,) in db.query(RequestProfile.id)
+            .order_by(RequestProfile.created_at.desc())
+            .offset(settings.PROFILING_MAX_PROFILES)
+        ]
+        if stale:
+            db.query(RequestProfile).filter(RequestProfile.id.in_(stale)).delete(synchronize_session=False)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"ERROR storing request profile {profile.id}: {type(e).__name__}: {str(e)}")
+    finally:
+        db.close()
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware; only added when ADMIN_TOKEN is set (see `add_profiling`)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = ProfileRecorder(scope["method"], scope["path"], sys._getframe(), threading.get_ident())
+        response = {"status": None}
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile.id.encode())]}
+            await send(message)
+
+        _track_spawned_tasks()
+        token = _current_profile.set(profile)
+        profile.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profile.stop()
+            _current_profile.reset(token)
+            _store(profile, response["status"])
+            print(f"DEBUG: Profiled {profile.method} {profile.path} as {profile.id}: {profile.phase_summary()}")
+
+
+def add_profiling(app):
+    if not settings.ADMIN_TOKEN:
+        return
+    _install_phase_hooks()
+    app.add_middleware(ProfilingMiddleware)
@@ -0,0 +1,26 @@
+"""
+Per-endpoint SQL query budgets.
+
+Endpoints declare how many statements one request may execute (and, where
+the result size is bounded, how many rows it may fetch) with
+`@query_budget(...)`. Budgets are independent of how much data the user has:
+a request that needs more statements as the data grows is an N+1. Row
+budgets are for the benchmark's task shape (10 goals per task, 2 events per
+goal); they catch queries that stop being bounded by the task or page.
+tests/test_query_budgets.py replays every endpoint against seeded datasets
+of increasing size and fails when a budget is exceeded.
+"""
+from typing import NamedTuple, Optional
+
+
+class QueryBudget(NamedTuple):
+    statements: int
+    rows: Optional[int] = None  # None when the response itself grows with the data (e.g. task lists)
+
+
+def query_budget(statements: int, rows: Optional[int] = None):
+    """Declare the most SQL statements (and rows fetched) one request to the endpoint may use"""
+    def decorator(endpoint):
+        endpoint.query_budget = QueryBudget(statements, rows)
+        return endpoint
+    return decorator
@@ -0,0 +1,64 @@
+import inspect
+import json
+from typing import Any
+
+from fastapi import FastAPI, routing
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse
+
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:  # optional speedup, fall back to the stdlib encoder
+    orjson = None
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson (stdlib json when it isn't installed)"""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def fastapi_serializes_directly() -> bool:
+    """
+    Newer FastAPI versions serialize response models straight to JSON bytes
+    in pydantic-core, but only for the default response class. On those,
+    a custom class would be slower, so we keep the default.
+    """
+    return "dump_json" in inspect.signature(routing.serialize_response).parameters
+
+
+def default_response_class():
+    return JSONResponse if fastapi_serializes_directly() else ORJSONResponse
+
+
+def add_compression(app: FastAPI):
+    """Compress responses above RESPONSE_COMPRESSION_MIN_BYTES (Brotli when available, else GZip)"""
+    mode = settings.RESPONSE_COMPRESSION.lower()
+    if mode == "none":
+        return
+
+    if mode == "brotli":
+        try:
+            from brotli_asgi import BrotliMiddleware
+
+            # Clients that don't accept br still get gzip
+            app.add_middleware(
+                BrotliMiddleware,
+                quality=settings.RESPONSE_COMPRESSION_LEVEL,
+                minimum_size=settings.RESPONSE_COMPRESSION_MIN_BYTES,
+                gzip_fallback=True,
+            )
+            return
+        except ImportError:
+            print("WARNING: brotli-asgi is not installed, falling back to GZip compression")
+
+    app.add_middleware(
+        GZipMiddleware,
+        minimum_size=settings.RESPONSE_COMPRESSION_MIN_BYTES,
+        compresslevel=min(settings.RESPONSE_COMPRESSION_LEVEL, 9),
+    )
@@ -1,19 +1,78 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
-from app.api import tasks
-from app.core.database import engine, Base
-from app.models.task import Task, MicroGoal  # Import models to register them
+from app.api import admin, sync, tasks, users
+from app.core.admission import AdmissionMiddleware, admission_stats
+from app.core.auth import init_default_user
+from app.core.database import init_db
+from app.core.disconnect import ClientDisconnected, client_disconnected_handler
+from app.core.idempotency import IdempotencyMiddleware
+from app.core.profiling import add_profiling
+from app.core.responses import add_compression, default_response_class
+from app.services.breakdown import run_breakdown_job
+from app.services.job_queue import job_queue
+from app.services.llm_service import llm_service
+from app.services.retention import retention_loop
+from app.services.search import init_search_index
+from app.services.sync import init_sync_log
+from app.services.timer_store import timer_flush_loop, timer_store
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create database tables once the server starts, not on import
+    init_db()
+    init_default_user()
+    init_search_index()
+    init_sync_log()
+    await timer_store.start()
+
+    # Background workers for queued LLM work
+    job_queue.register("breakdown", run_breakdown_job)
+    await job_queue.start()
+
+    # Periodically compact old execution events and archive old tasks
+    retention_task = asyncio.create_task(retention_loop()) if settings.RETENTION_ENABLED else None
+
+    # Write live timer state behind, in batches, and keep this process's lease on it
+    flush_task = asyncio.create_task(timer_flush_loop())
+    yield
+    for task in (retention_task, flush_task):
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, timer_store.flush)
+    await loop.run_in_executor(None, timer_store.release_lease)
+    await job_queue.stop()
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
 
 app = FastAPI(
     title=settings.APP_NAME,
     description="API for breaking down daily tasks into micro-goals",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=default_response_class()
 )
 
+# Work cancelled because the client went away ends in a 499 nobody reads
+app.add_exception_handler(ClientDisconnected, client_disconnected_handler)
+
+# Sample requests sent with the admin token (innermost, so only routing and
+# the endpoint are measured); not installed at all without ADMIN_TOKEN
+add_profiling(app)
+
+# Replay responses for retried mutations that carry an Idempotency-Key
+# (added first so it runs inside CORS and compression)
+app.add_middleware(IdempotencyMiddleware)
+
+# Per-route-class concurrency lanes, LLM rate limits and load shedding. Runs
+# before idempotency so shed requests don't claim keys, and inside CORS so
+# browsers can read the 429/503 and its Retry-After.
+app.add_middleware(AdmissionMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -21,10 +80,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Idempotent-Replayed", "Retry-After", "X-Profile-Id"],
 )
 
+# Compress large responses (task lists with execution history)
+add_compression(app)
+
 # Include routers
 app.include_router(tasks.router, prefix="/api/tasks", tags=["tasks"])
+app.include_router(users.router, prefix="/api/users", tags=["users"])
+app.include_router(sync.router, prefix="/api/sync", tags=["sync"])
+app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
 
 
 @app.get("/")
@@ -38,4 +104,9 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "admission": {name: lane.stats() for name, lane in admission_stats.items()},
+        "llm_providers": llm_service.router.stats(),
+        "live_timers": len(timer_store),
+    }
@@ -1,4 +1,12 @@
 # Models package
-from app.models.task import Task, MicroGoal
+from app.models.calendar import BusyBlock
+from app.models.task import Task, MicroGoal, ExecutionEvent, ExecutionEventSummary
+from app.models.idempotency import IdempotencyRecord
+from app.models.job import Job
+from app.models.profile import RequestProfile
+from app.models.sync import SyncChange, SyncState
+from app.models.template import TaskTemplate
+from app.models.timer import TimerCheckpoint
+from app.models.user import User
 
-__all__ = ["Task", "MicroGoal"]
+__all__ = ["BusyBlock", "Task", "MicroGoal", "ExecutionEvent", "ExecutionEventSummary", "IdempotencyRecord", "Job", "RequestProfile", "SyncChange", "SyncState", "TaskTemplate", "TimerCheckpoint", "User"]
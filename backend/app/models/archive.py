@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, DateTime, Boolean, Text, JSON
+from sqlalchemy.ext.declarative import declarative_base
+from datetime import datetime
+
+# Archived rows live in their own database (RETENTION_ARCHIVE_DATABASE_URL),
+# so they use a separate declarative base from the hot tables
+ArchiveBase = declarative_base()
+
+
+class ArchivedTask(ArchiveBase):
+    """A task moved out of the hot tables by the retention job, stored as one document"""
+    __tablename__ = "archived_tasks"
+
+    id = Column(Integer, primary_key=True)  # Same id the task had in the main database
+    owner_id = Column(Integer, nullable=True, index=True)
+    user_input = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=True, index=True)
+    confirmed = Column(Boolean, default=False)
+    archived_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # Full task with micro-goals, their remaining events and event summaries
+    document = Column(JSON, nullable=False)
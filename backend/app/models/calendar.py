@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from datetime import datetime
+from app.core.database import Base
+
+
+class BusyBlock(Base):
+    """A fixed commitment (meeting, appointment) that calendar scheduling works around"""
+    __tablename__ = "busy_blocks"
+    __table_args__ = (
+        Index("ix_busy_blocks_owner_start", "owner_id", "start_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    title = Column(String(200), nullable=False)
+    start_at = Column(DateTime, nullable=False)  # Local time, like micro-goal starting times
+    end_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary
+from datetime import datetime
+from app.core.database import Base
+
+
+class IdempotencyRecord(Base):
+    """Stored outcome of a mutation sent with an Idempotency-Key header"""
+    __tablename__ = "idempotency_keys"
+
+    id = Column(Integer, primary_key=True, index=True)
+    key = Column(String(255), nullable=False, unique=True)  # "<METHOD> <path> <user scope> <Idempotency-Key>"
+    fingerprint = Column(String(64), nullable=False)  # sha256 of method, path, query and body
+    status = Column(String(20), nullable=False, default="in_progress")  # "in_progress" or "completed"
+    response_status = Column(Integer, nullable=True)
+    response_body = Column(LargeBinary, nullable=True)
+    response_content_type = Column(String(100), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON
+from datetime import datetime
+from app.core.database import Base
+
+
+class Job(Base):
+    """Background job (e.g. an LLM breakdown) processed by the in-process job queue"""
+    __tablename__ = "jobs"
+
+    id = Column(String(36), primary_key=True)  # uuid4
+    kind = Column(String(50), nullable=False)  # "breakdown"
+    status = Column(String(20), nullable=False, default="queued", index=True)  # "queued", "running", "succeeded", "failed"
+    payload = Column(JSON, nullable=False)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    task_id = Column(Integer, nullable=True)  # Task created by the job, if any
+    owner_id = Column(Integer, nullable=True, index=True)  # User who queued the job
+    attempts = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, DateTime, Float, Text, JSON
+from datetime import datetime
+from app.core.database import Base
+
+
+class RequestProfile(Base):
+    """Sampling profile of one request, recorded on demand (see app/core/profiling.py)"""
+    __tablename__ = "request_profiles"
+
+    id = Column(String(32), primary_key=True)  # uuid4 hex, returned in the X-Profile-Id header
+    method = Column(String(10), nullable=False)
+    path = Column(String(500), nullable=False)
+    status_code = Column(Integer, nullable=True)
+    duration_ms = Column(Float, nullable=False)
+    phases = Column(JSON, nullable=False)  # {"sql": {"ms": 12.5, "count": 4}, "llm": ..., "serialization": ...}
+    sample_count = Column(Integer, nullable=False, default=0)
+    speedscope = Column(Text, nullable=False)  # speedscope.app JSON document
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Index
+from app.core.database import Base
+
+
+class SyncChange(Base):
+    """
+    Latest change to a task, micro-goal or execution event, for the delta sync feed
+
+    One row per entity, rewritten with the next sequence number on every
+    write (by database triggers, see app/services/sync.py); deletes leave a
+    tombstone row.
+    """
+    __tablename__ = "sync_changes"
+    __table_args__ = (
+        Index("ix_sync_changes_owner_seq", "owner_id", "seq"),
+    )
+
+    entity = Column(String(20), primary_key=True)  # "task", "micro_goal" or "execution_event"
+    entity_id = Column(Integer, primary_key=True)
+    owner_id = Column(Integer, nullable=True)
+    seq = Column(Integer, nullable=False, unique=True)
+    deleted = Column(Boolean, nullable=False, default=False)
+    changed_at = Column(DateTime, nullable=False)
+
+
+class SyncState(Base):
+    """Single row with the last sequence number handed out and the newest purged tombstone"""
+    __tablename__ = "sync_state"
+
+    id = Column(Integer, primary_key=True)
+    last_seq = Column(Integer, nullable=False, default=0)
+    # Cursors older than this may have missed purged tombstones and must resync
+    purged_seq = Column(Integer, nullable=False, default=0)
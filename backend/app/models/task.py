@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Text, Time, JSON
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Boolean, Text, Time, JSON, Index, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.core.database import Base
@@ -6,13 +6,21 @@ from app.core.database import Base
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        Index("ix_tasks_owner_created", "owner_id", "created_at"),
+        # Never reuse the id of a deleted task: ids appear in ETags and archive rows
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # Nullable only for rows predating users
     user_input = Column(Text, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     confirmed = Column(Boolean, default=False)
     starting_time = Column(Time, nullable=True)  # Starting time for first micro-goal
+    # Bumped on every change to the task, its micro-goals or their events (used as ETag)
+    version = Column(Integer, default=1, server_default=text("1"), nullable=False)
 
     # Relationship
     micro_goals = relationship("MicroGoal", back_populates="task", cascade="all, delete-orphan")
@@ -20,9 +28,14 @@ class Task(Base):
 
 class MicroGoal(Base):
     __tablename__ = "micro_goals"
+    __table_args__ = (
+        Index("ix_micro_goals_owner_active", "owner_id", "is_active"),
+        Index("ix_micro_goals_owner_date", "owner_id", "scheduled_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False)
+    task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False, index=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # Copied from the task so goal queries need no join
     title = Column(String(500), nullable=False)
     description = Column(Text)
     estimated_minutes = Column(Integer, nullable=False)
@@ -31,6 +44,7 @@ class MicroGoal(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     starting_time = Column(Time, nullable=True)  # Calculated starting time
     end_time = Column(Time, nullable=True)  # Calculated end time
+    scheduled_date = Column(Date, nullable=True)  # Day it's placed on by calendar scheduling (None: same day as the task)
     exceeds_end_time = Column(Boolean, default=False)  # Whether task exceeds user's desired end time
     is_break = Column(Boolean, default=False)  # Whether this is a Pomodoro break
     break_type = Column(String(10), nullable=True)  # "short" or "long" break type
@@ -49,18 +63,38 @@ class MicroGoal(Base):
     # Relationship
     task = relationship("Task", back_populates="micro_goals")
     execution_events = relationship("ExecutionEvent", back_populates="micro_goal", cascade="all, delete-orphan")
+    event_summary = relationship("ExecutionEventSummary", uselist=False, cascade="all, delete-orphan")
 
 
 class ExecutionEvent(Base):
     """Track every start/pause/resume/complete action for detailed analytics"""
     __tablename__ = "execution_events"
+    # Never reuse ids once retention deleted the newest events: the timer
+    # checkpoint replays events by id
+    __table_args__ = ({"sqlite_autoincrement": True},)
 
     id = Column(Integer, primary_key=True, index=True)
-    micro_goal_id = Column(Integer, ForeignKey("micro_goals.id"), nullable=False)
+    micro_goal_id = Column(Integer, ForeignKey("micro_goals.id"), nullable=False, index=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)  # Copied from the micro-goal
     action = Column(String(50), nullable=False)  # "start", "pause", "resume", "complete"
-    timestamp = Column(DateTime, default=datetime.utcnow, nullable=False)
+    timestamp = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
     time_spent_at_event = Column(Integer, default=0)  # Seconds spent at time of this event
     notes = Column(Text, nullable=True)  # Optional notes about the event
 
     # Relationship
     micro_goal = relationship("MicroGoal", back_populates="execution_events")
+
+
+class ExecutionEventSummary(Base):
+    """Roll-up of a micro-goal's execution events that were compacted by the retention job"""
+    __tablename__ = "execution_event_summaries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    micro_goal_id = Column(Integer, ForeignKey("micro_goals.id"), nullable=False, unique=True)
+    start_count = Column(Integer, default=0, nullable=False)
+    pause_count = Column(Integer, default=0, nullable=False)
+    resume_count = Column(Integer, default=0, nullable=False)
+    complete_count = Column(Integer, default=0, nullable=False)
+    first_event_at = Column(DateTime, nullable=True)
+    last_event_at = Column(DateTime, nullable=True)
+    last_time_spent_at_event = Column(Integer, default=0)  # time_spent_at_event of the last compacted event
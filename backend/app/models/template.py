@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, JSON
+from datetime import datetime
+from app.core.database import Base
+
+
+class TaskTemplate(Base):
+    """A confirmed plan saved for reuse, e.g. a daily routine"""
+    __tablename__ = "task_templates"
+
+    id = Column(Integer, primary_key=True, index=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    name = Column(String(200), nullable=False)
+    source_text = Column(Text, nullable=False)  # user_input of the task it was saved from
+    keywords = Column(JSON, nullable=False, default=list)  # Normalized words of source_text, for near-duplicate matching
+    # Work goals in order (breaks are re-added by the scheduler): [{"title", "description", "estimated_minutes"}]
+    micro_goals = Column(JSON, nullable=False, default=list)
+    use_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_used_at = Column(DateTime, nullable=True)
@@ -0,0 +1,20 @@
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, DateTime, String
+from app.core.database import Base
+
+
+class TimerCheckpoint(Base):
+    """
+    Single row: every execution event up to event_id is reflected in the
+    micro-goal rows (written by the timer store's flush, see
+    app/services/timer_store.py); later ones are replayed after a crash.
+    Also the lease that keeps a second API process from serving the timers.
+    """
+    __tablename__ = "timer_checkpoint"
+
+    id = Column(Integer, primary_key=True)
+    event_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    instance_id = Column(String(32), nullable=True)  # Process holding the lease, None when released
+    heartbeat_at = Column(DateTime, nullable=True)  # Last renewal of the lease
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from datetime import datetime
+from app.core.database import Base
+
+
+class User(Base):
+    """Owner of tasks; requests authenticate with a bearer token"""
+    __tablename__ = "users"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), nullable=False)
+    token_hash = Column(String(64), nullable=True, unique=True)  # sha256 of the API token; None for the local default user
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -6,11 +6,15 @@ from app.schemas.task import (
     TaskResponse,
     TaskConfirm
 )
+from app.schemas.user import UserCreate, UserResponse, UserTokenResponse
 
 __all__ = [
     "TaskInput",
     "MicroGoalSchema",
     "TaskBreakdownResponse",
     "TaskResponse",
-    "TaskConfirm"
+    "TaskConfirm",
+    "UserCreate",
+    "UserResponse",
+    "UserTokenResponse"
 ]
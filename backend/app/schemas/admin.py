@@ -0,0 +1,23 @@
+from pydantic import BaseModel
+from typing import Dict, Optional
+from datetime import datetime
+
+
+class ProfilePhase(BaseModel):
+    ms: float
+    count: int
+
+
+class RequestProfileSummary(BaseModel):
+    """A stored request profile without its samples"""
+    id: str
+    method: str
+    path: str
+    status_code: Optional[int] = None
+    duration_ms: float
+    phases: Dict[str, ProfilePhase]  # "sql", "llm", "serialization"
+    sample_count: int
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,79 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional, Dict, Any
+from datetime import date, datetime, time
+
+
+class SyncTask(BaseModel):
+    """Task row as of its latest change (micro-goals are sent separately)"""
+    id: int
+    user_input: str
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    confirmed: bool
+    starting_time: Optional[time] = None
+    version: int
+
+    class Config:
+        from_attributes = True
+
+
+class SyncMicroGoal(BaseModel):
+    """Micro-goal row as of its latest change (execution events are sent separately)"""
+    id: int
+    task_id: int
+    title: str
+    description: Optional[str] = None
+    estimated_minutes: int
+    order: int
+    completed: Optional[bool] = False
+    starting_time: Optional[time] = None
+    end_time: Optional[time] = None
+    scheduled_date: Optional[date] = None
+    exceeds_end_time: Optional[bool] = False
+    is_break: Optional[bool] = False
+    break_type: Optional[str] = None
+    is_active: Optional[bool] = False
+    is_paused: Optional[bool] = False
+    actual_start_time: Optional[datetime] = None
+    actual_end_time: Optional[datetime] = None
+    time_spent_seconds: Optional[int] = 0
+    execution_history: Optional[List[Dict[str, Any]]] = []
+
+    class Config:
+        from_attributes = True
+
+
+class SyncExecutionEvent(BaseModel):
+    id: int
+    micro_goal_id: int
+    action: str
+    timestamp: datetime
+    time_spent_at_event: Optional[int] = 0
+    notes: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class SyncDeleted(BaseModel):
+    """Ids removed since the cursor (tombstones)"""
+    tasks: List[int] = []
+    micro_goals: List[int] = []
+    execution_events: List[int] = []
+
+
+class SyncResponse(BaseModel):
+    """
+    Changes after the `since` cursor
+
+    Apply them and call again with `next_since` while `has_more` is set. With
+    `reset` the cursor was too old: drop the local copy before applying.
+    """
+    next_since: int = Field(..., description="Cursor for the next call")
+    has_more: bool
+    reset: bool
+    snapshot: bool = Field(..., description="Paging through a full sync; send snapshot=true with the next call")
+    tasks: List[SyncTask]
+    micro_goals: List[SyncMicroGoal]
+    execution_events: List[SyncExecutionEvent]
+    deleted: SyncDeleted
@@ -1,6 +1,10 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
-from datetime import datetime, time
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Literal, Optional, Dict, Any
+from datetime import date, datetime, time
+
+# "contiguous": back to back from starting_time (the default).
+# "calendar": fitted into free time around busy blocks and other scheduled goals, spilling over to later days.
+ScheduleMode = Literal["contiguous", "calendar"]
 
 
 class TaskInput(BaseModel):
@@ -8,6 +12,21 @@ class TaskInput(BaseModel):
     tasks_text: str = Field(..., min_length=1, description="Raw text containing all tasks for the day")
     starting_time: Optional[time] = Field(None, description="Starting time for the first micro-goal")
     end_time: Optional[time] = Field(None, description="Desired end time for tasks")
+    use_templates: bool = Field(True, description="Reuse a matching saved template instead of calling the LLM")
+    schedule_mode: ScheduleMode = "contiguous"
+    starting_date: Optional[date] = Field(None, description="First day for calendar scheduling (default today)")
+
+
+class ExecutionEventSchema(BaseModel):
+    """Schema for a single execution event"""
+    id: Optional[int] = None
+    action: str = Field(..., description="start, pause, resume, or complete")
+    timestamp: datetime
+    time_spent_at_event: int = Field(default=0, description="Total seconds spent at time of event")
+    notes: Optional[str] = None
+
+    class Config:
+        from_attributes = True
 
 
 class MicroGoalSchema(BaseModel):
@@ -20,6 +39,7 @@ class MicroGoalSchema(BaseModel):
     completed: bool = False
     starting_time: Optional[time] = None
     end_time: Optional[time] = None
+    scheduled_date: Optional[date] = None  # Set by calendar scheduling
     exceeds_end_time: bool | None = False  # Flag to indicate if this task goes beyond the user's desired end time
     is_break: bool | None = False  # Flag to indicate if this is a Pomodoro break
     break_type: Optional[str] = None  # "short" (5 min) or "long" (15 min)
@@ -44,6 +64,72 @@ class TaskBreakdownResponse(BaseModel):
     task_id: int
     micro_goals: List[MicroGoalSchema]
     total_estimated_minutes: int
+    source: str = "llm"  # "llm", "template" when a saved template matched, or "heuristic" when the local fallback produced the plan
+    template_id: Optional[int] = None  # Template the plan was copied from
+
+
+class DraftBreakdownInput(BaseModel):
+    """Speculative breakdown of text the user is still typing"""
+    session_id: str = Field(..., min_length=1, max_length=100, description="Client's id for the input box; a newer draft supersedes older ones")
+    tasks_text: str = Field(..., min_length=1, description="Raw text containing all tasks for the day")
+    starting_time: Optional[time] = Field(None, description="Starting time for the first micro-goal")
+    end_time: Optional[time] = Field(None, description="Desired end time for tasks")
+    use_templates: bool = Field(True, description="Reuse a matching saved template instead of calling the LLM")
+
+
+class DraftBreakdownResponse(BaseModel):
+    """Preview of a breakdown; nothing is saved until the text is submitted to /breakdown"""
+    session_id: str
+    micro_goals: List[MicroGoalSchema]
+    total_estimated_minutes: int
+    source: str = "llm"
+    template_id: Optional[int] = None
+
+
+class BatchTaskItem(BaseModel):
+    """One input of a batch breakdown, identified by a caller-chosen id"""
+    id: str = Field(..., min_length=1, max_length=100, description="Caller's id for this input (e.g. user or day)")
+    tasks_text: str = Field(..., min_length=1, description="Raw text containing all tasks for the day")
+    starting_time: Optional[time] = Field(None, description="Starting time for the first micro-goal")
+    end_time: Optional[time] = Field(None, description="Desired end time for tasks")
+
+
+class BatchTaskInput(BaseModel):
+    """Several task inputs to break down in one request"""
+    items: List[BatchTaskItem] = Field(..., min_length=1)
+
+
+class BatchBreakdownResult(BaseModel):
+    """Breakdown of a single batch input"""
+    id: str
+    task_id: Optional[int] = None
+    micro_goals: List[MicroGoalSchema] = []
+    total_estimated_minutes: int = 0
+    source: str = "llm"
+    template_id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class BatchBreakdownResponse(BaseModel):
+    """Per-input results in the order the inputs were given"""
+    results: List[BatchBreakdownResult]
+    llm_calls: int
+
+
+class JobResponse(BaseModel):
+    """Status of a background job; result is set once a breakdown job has succeeded"""
+    id: str
+    kind: str
+    status: str  # "queued", "running", "succeeded" or "failed"
+    task_id: Optional[int] = None
+    result: Optional[TaskBreakdownResponse] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
 
 
 class TaskResponse(BaseModel):
@@ -63,18 +149,11 @@ class TaskConfirm(BaseModel):
     """Confirmation request with possibly edited micro-goals"""
     task_id: int
     micro_goals: List[MicroGoalSchema]
-
-
-class ExecutionEventSchema(BaseModel):
-    """Schema for a single execution event"""
-    id: Optional[int] = None
-    action: str = Field(..., description="start, pause, resume, or complete")
-    timestamp: datetime
-    time_spent_at_event: int = Field(default=0, description="Total seconds spent at time of event")
-    notes: Optional[str] = None
-
-    class Config:
-        from_attributes = True
+    # With "calendar", the work goals are re-placed (and breaks re-added) around the user's calendar
+    schedule_mode: ScheduleMode = "contiguous"
+    starting_date: Optional[date] = None
+    starting_time: Optional[time] = None
+    end_time: Optional[time] = None
 
 
 class ExecutionSummary(BaseModel):
@@ -101,3 +180,77 @@ class ProgressDataResponse(BaseModel):
     overdue_tasks_count: int
     upcoming_tasks_count: int
     tips: List[str] = []
+
+
+class TemplateGoal(BaseModel):
+    """A work goal stored in a template"""
+    title: str
+    description: Optional[str] = None
+    estimated_minutes: int
+
+
+class TemplateCreate(BaseModel):
+    """Save a confirmed task as a recurring template"""
+    task_id: int
+    name: Optional[str] = Field(None, max_length=200, description="Defaults to the first line of the task input")
+
+
+class TemplateResponse(BaseModel):
+    id: int
+    name: str
+    source_text: str
+    micro_goals: List[TemplateGoal]
+    use_count: int
+    created_at: datetime
+    last_used_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class TemplateInstantiate(BaseModel):
+    """Create a new day's task from a template"""
+    starting_time: Optional[time] = Field(None, description="Starting time for the first micro-goal")
+    end_time: Optional[time] = Field(None, description="Desired end time for tasks")
+
+
+class BusyBlockCreate(BaseModel):
+    """A fixed commitment for calendar scheduling to work around"""
+    title: str = Field(..., min_length=1, max_length=200)
+    start_at: datetime
+    end_at: datetime
+
+    @model_validator(mode="after")
+    def check_order(self):
+        if self.end_at <= self.start_at:
+            raise ValueError("end_at must be after start_at")
+        return self
+
+
+class BusyBlockResponse(BaseModel):
+    id: int
+    title: str
+    start_at: datetime
+    end_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class SearchResult(BaseModel):
+    """A task or micro-goal matching a search; matched words are wrapped in <mark></mark>"""
+    kind: str  # "task" or "micro_goal"
+    task_id: int
+    micro_goal_id: Optional[int] = None
+    title: Optional[str] = None  # Highlighted micro-goal title
+    snippet: str  # Highlighted excerpt of the task input or micro-goal description
+    rank: float  # Lower is better
+    task_created_at: Optional[datetime] = None
+
+
+class SearchResponse(BaseModel):
+    query: str
+    results: List[SearchResult]
+    limit: int
+    offset: int
+    has_more: bool
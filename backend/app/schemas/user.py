@@ -0,0 +1,21 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+
+
+class UserCreate(BaseModel):
+    """Register a user"""
+    name: str = Field(..., min_length=1, max_length=100)
+
+
+class UserResponse(BaseModel):
+    id: int
+    name: str
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class UserTokenResponse(UserResponse):
+    """Newly created user with the API token to send as "Authorization: Bearer <token>" (shown only once)"""
+    token: str
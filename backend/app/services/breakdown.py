@@ -0,0 +1,183 @@
+from datetime import date, time
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.core.cache import mark_tasks_changed
+from app.core.config import settings
+from app.core.database import session_scope
+from app.models.task import Task, MicroGoal
+from app.schemas.task import MicroGoalSchema, TaskBreakdownResponse
+from app.services.heuristic_breakdown import heuristic_breakdown, load_duration_priors
+from app.services.llm_service import llm_service
+from app.services.resilience import LLMUnavailableError
+from app.services.calendar import calendar_schedule
+from app.services.drafts import draft_registry
+from app.services.scheduler import build_schedule
+from app.services.templates import find_matching_template, load_template_keywords, use_template
+
+
+async def generate_micro_goals(
+    tasks_text: str, owner_id: Optional[int] = None, db: Optional[Session] = None
+) -> Tuple[List[Dict], str]:
+    """
+    Break tasks down with the LLM, falling back to the local heuristic
+    breakdown so the user still gets a plan while the LLM is degraded
+
+    An answer from the offline "fake" backend is the heuristic without the
+    user's duration priors, so it is redone here with them and labelled
+    "heuristic" (which also keeps it out of the draft plan cache).
+
+    Args:
+        tasks_text: User's raw input of tasks
+        owner_id: User whose history the heuristic duration priors come from
+        db: Session for loading duration priors; a short-lived one is opened when omitted
+
+    Returns:
+        (micro_goals_data, source) where source is "llm" or "heuristic"
+
+    Raises:
+        LLMUnavailableError: if the LLM is unavailable and the fallback is disabled
+    """
+    try:
+        micro_goals_data, provider = await llm_service.breakdown_tasks(tasks_text)
+        if provider != "fake":
+            return micro_goals_data, "llm"
+    except LLMUnavailableError as e:
+        if not settings.HEURISTIC_FALLBACK_ENABLED:
+            raise
+        print(f"WARNING: Using heuristic breakdown, LLM unavailable: {str(e)}")
+
+    priors = load_duration_priors(db, owner_id) if db is not None else load_priors(owner_id)
+    return heuristic_breakdown(tasks_text, priors), "heuristic"
+
+
+def match_templates(inputs: Dict[str, str], owner_id: int) -> Dict[str, Tuple[int, List[Dict]]]:
+    """
+    For each input (id -> tasks_text) nearly identical to one of the user's
+    saved templates: (template_id, micro_goals_data), in one short session
+    """
+    matches = {}
+    with session_scope() as db:
+        candidates = load_template_keywords(db, owner_id)
+        if not candidates:
+            return matches
+        for input_id, tasks_text in inputs.items():
+            match = find_matching_template(db, owner_id, tasks_text, candidates)
+            if match is None:
+                continue
+            micro_goals_data = use_template(db, match[0], owner_id)
+            if micro_goals_data:
+                matches[input_id] = (match[0], micro_goals_data)
+    return matches
+
+
+async def plan_micro_goals(
+    tasks_text: str, owner_id: int, use_templates: bool = True
+) -> Tuple[List[Dict], str, Optional[int]]:
+    """
+    Micro-goals for the input: the plan of a recent draft of the same text,
+    a matching template, or else the LLM (or its heuristic fallback)
+
+    Returns:
+        (micro_goals_data, source, template_id)
+    """
+    draft_plan = draft_registry.cached_plan(owner_id, tasks_text, use_templates)
+    if draft_plan is not None:
+        print("DEBUG: Reusing the plan of a draft breakdown")
+        return draft_plan
+
+    if use_templates:
+        template_plan = match_templates({"input": tasks_text}, owner_id).get("input")
+        if template_plan is not None:
+            return template_plan[1], "template", template_plan[0]
+
+    micro_goals_data, source = await generate_micro_goals(tasks_text, owner_id)
+    return micro_goals_data, source, None
+
+
+def load_priors(owner_id: Optional[int] = None) -> Dict[str, int]:
+    """Duration priors for the heuristic breakdown, read with a short-lived session"""
+    with session_scope() as db:
+        return load_duration_priors(db, owner_id)
+
+
+def schedule_micro_goals(
+    micro_goals_data: List[Dict],
+    owner_id: int,
+    starting_time: Optional[time] = None,
+    end_time: Optional[time] = None,
+    schedule_mode: str = "contiguous",
+    starting_date: Optional[date] = None,
+    db: Optional[Session] = None,
+    exclude_task_id: Optional[int] = None,
+) -> List[Dict]:
+    """
+    Rows to insert for the micro-goals: back to back from starting_time, or
+    with schedule_mode "calendar" fitted around the user's calendar
+
+    Calendar scheduling reads busy time with db, or a short-lived session when omitted.
+    """
+    if schedule_mode != "calendar":
+        return build_schedule(micro_goals_data, starting_time, end_time)
+    if db is None:
+        with session_scope() as db:
+            return calendar_schedule(db, owner_id, micro_goals_data, starting_date, starting_time, end_time)
+    return calendar_schedule(db, owner_id, micro_goals_data, starting_date, starting_time, end_time, exclude_task_id)
+
+
+def save_breakdown(db: Session, owner_id: int, tasks_text: str, starting_time, schedule: List[dict]) -> Task:
+    """Create an unconfirmed task and bulk insert its scheduled micro-goals (caller commits)"""
+    task = Task(
+        owner_id=owner_id,
+        user_input=tasks_text,
+        confirmed=False,
+        starting_time=starting_time
+    )
+    db.add(task)
+    db.flush()  # Get the task ID
+
+    if schedule:
+        # Core insert on the table: the ORM variant splits the executemany
+        # wherever a row's NULL columns differ (every break vs goal boundary)
+        db.execute(insert(MicroGoal.__table__), [dict(row, task_id=task.id, owner_id=owner_id) for row in schedule])
+    mark_tasks_changed(db, owner_id)
+    return task
+
+
+def breakdown_response(
+    task_id: int, schedule: List[dict], source: str, template_id: Optional[int] = None
+) -> TaskBreakdownResponse:
+    return TaskBreakdownResponse(
+        task_id=task_id,
+        micro_goals=[MicroGoalSchema(**row) for row in schedule],
+        total_estimated_minutes=sum(row["estimated_minutes"] for row in schedule),
+        source=source,
+        template_id=template_id
+    )
+
+
+async def run_breakdown_job(job_id: str, payload: Dict) -> Tuple[Dict, int]:
+    """
+    Job queue handler for background breakdowns
+
+    The LLM call runs without a database session; the result is written in
+    one short transaction afterwards.
+    """
+    starting_time = time.fromisoformat(payload["starting_time"]) if payload.get("starting_time") else None
+    end_time = time.fromisoformat(payload["end_time"]) if payload.get("end_time") else None
+
+    owner_id = payload.get("owner_id")
+    micro_goals_data, source, template_id = await plan_micro_goals(
+        payload["tasks_text"], owner_id, payload.get("use_templates", True)
+    )
+    starting_date = date.fromisoformat(payload["starting_date"]) if payload.get("starting_date") else None
+    schedule = schedule_micro_goals(
+        micro_goals_data, owner_id, starting_time, end_time, payload.get("schedule_mode", "contiguous"), starting_date
+    )
+
+    with session_scope() as db:
+        task_id = save_breakdown(db, owner_id, payload["tasks_text"], starting_time, schedule).id
+
+    return breakdown_response(task_id, schedule, source, template_id).model_dump(mode="json"), task_id
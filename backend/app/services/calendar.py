@@ -0,0 +1,257 @@
+"""
+Calendar-aware scheduling across days.
+
+Busy time (the user's busy blocks plus the scheduled, unfinished goals of
+their other confirmed tasks) is loaded once for the scheduling horizon into
+an IntervalIndex: the intervals sorted by start and merged into disjoint
+runs, so overlap and free-slot lookups are a bisect plus a walk over the
+intervals actually touched.
+
+`place_on_calendar` then walks the free slots of each day's working window
+(the request's start/end on the first day, SCHEDULE_DAY_START/END after)
+and places micro-goals first-fit in their original order, adding Pomodoro
+breaks with the same rules as the contiguous scheduler. A goal that doesn't
+fit what's left of a slot moves to the next slot that can hold it, and one
+that fits no slot in the horizon is left unscheduled; a pending break is
+dropped when the next goal lands on a later day. With m busy intervals,
+n goals and s free slots this is O(m log m + n + s).
+"""
+from bisect import bisect_right
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.calendar import BusyBlock
+from app.models.task import MicroGoal, Task
+from app.services.scheduler import (
+    LONG_BREAK_MINUTES,
+    POMODOROS_PER_LONG_BREAK,
+    SHORT_BREAK_MINUTES,
+    WORK_MINUTES_BEFORE_BREAK,
+)
+
+Interval = Tuple[datetime, datetime]
+
+
+class IntervalIndex:
+    """Disjoint busy intervals sorted by start (overlapping and touching inputs are merged)"""
+
+    def __init__(self, intervals: Iterable[Interval] = ()):
+        merged: List[List[datetime]] = []
+        for start, end in sorted(interval for interval in intervals if interval[1] > interval[0]):
+            if merged and start <= merged[-1][1]:
+                if end > merged[-1][1]:
+                    merged[-1][1] = end
+            else:
+                merged.append([start, end])
+        self.starts = [start for start, _ in merged]
+        self.ends = [end for _, end in merged]
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def overlapping(self, start: datetime, end: datetime) -> List[Interval]:
+        """Busy intervals that intersect [start, end)"""
+        result = []
+        index = bisect_right(self.ends, start)  # First interval ending after start
+        while index < len(self.starts) and self.starts[index] < end:
+            result.append((self.starts[index], self.ends[index]))
+            index += 1
+        return result
+
+    def is_free(self, start: datetime, end: datetime) -> bool:
+        index = bisect_right(self.ends, start)
+        return index == len(self.starts) or self.starts[index] >= end
+
+    def free_slots(self, start: datetime, end: datetime) -> Iterator[Interval]:
+        """Gaps between busy intervals within [start, end), in order"""
+        cursor = start
+        index = bisect_right(self.ends, start)
+        while index < len(self.starts) and self.starts[index] < end:
+            if self.starts[index] > cursor:
+                yield cursor, self.starts[index]
+            cursor = max(cursor, self.ends[index])
+            index += 1
+        if cursor < end:
+            yield cursor, end
+
+
+def _day_windows(start: datetime, first_day_end: time, max_days: int) -> Iterator[Interval]:
+    for offset in range(max_days):
+        day = start.date() + timedelta(days=offset)
+        window_start = start if offset == 0 else datetime.combine(day, settings.SCHEDULE_DAY_START)
+        window_end = datetime.combine(day, first_day_end if offset == 0 else settings.SCHEDULE_DAY_END)
+        if window_end > window_start:
+            yield window_start, window_end
+
+
+def _row(goal_data: Dict, order: int, start: Optional[datetime], end: Optional[datetime], first_day: date) -> Dict:
+    return {
+        "title": goal_data.get("title", ""),
+        "description": goal_data.get("description", ""),
+        "estimated_minutes": goal_data.get("estimated_minutes", 30),
+        "order": order,
+        "completed": bool(goal_data.get("completed", False)),
+        "starting_time": start.time() if start else None,
+        "end_time": end.time() if end else None,
+        "scheduled_date": start.date() if start else None,
+        # Pushed past the first day's end (or not placed at all)
+        "exceeds_end_time": start is None or start.date() != first_day,
+        "is_break": False,
+        "break_type": None,
+    }
+
+
+def place_on_calendar(
+    micro_goals_data: List[Dict],
+    busy: IntervalIndex,
+    start: datetime,
+    first_day_end: time,
+    max_days: int,
+) -> List[Dict]:
+    """
+    Place micro-goals (and Pomodoro breaks) into free time from start on
+
+    Pure computation: returns one dict per row to insert, like
+    `build_schedule`, with scheduled_date set. Goals that don't fit within
+    max_days are returned without times and flagged exceeds_end_time.
+    """
+    slots = [slot for window in _day_windows(start, first_day_end, max_days) for slot in busy.free_slots(*window)]
+    # Longest slot from each position on, so an item that fits nowhere is
+    # rejected without scanning (and without giving up the slots it skipped)
+    longest_after = [timedelta(0)] * (len(slots) + 1)
+    for index in range(len(slots) - 1, -1, -1):
+        longest_after[index] = max(longest_after[index + 1], slots[index][1] - slots[index][0])
+    position = 0
+    cursor = slots[0][0] if slots else None
+
+    def reserve(minutes: int) -> Optional[Interval]:
+        """First-fit from the cursor, skipping slots too short for the item"""
+        nonlocal position, cursor
+        duration = timedelta(minutes=minutes)
+        if position >= len(slots) or max(slots[position][1] - cursor, longest_after[position + 1]) < duration:
+            return None
+        while slots[position][1] - cursor < duration:
+            position += 1
+            cursor = slots[position][0]
+        placed = (cursor, cursor + duration)
+        cursor = placed[1]
+        return placed
+
+    schedule = []
+    accumulated_work_minutes = 0
+    total_pomodoros_completed = 0
+    pending_break = None  # Break owed before the next goal
+    last_day = None
+
+    for idx, goal_data in enumerate(micro_goals_data):
+        estimated_minutes = goal_data.get("estimated_minutes", 30)
+
+        if pending_break is not None:
+            is_long_break, break_minutes = pending_break
+            pending_break = None
+            placed = reserve(break_minutes)
+            if placed is not None and placed[0].date() == last_day:
+                schedule.append({
+                    "title": f"{'Long' if is_long_break else 'Short'} Break",
+                    "description": f"Take a {break_minutes} minute break - relax, stretch, hydrate! 🧘",
+                    "estimated_minutes": break_minutes,
+                    "order": len(schedule),
+                    "completed": False,
+                    "starting_time": placed[0].time(),
+                    "end_time": placed[1].time(),
+                    "scheduled_date": placed[0].date(),
+                    "exceeds_end_time": placed[0].date() != start.date(),
+                    "is_break": True,
+                    "break_type": "long" if is_long_break else "short",
+                })
+            elif placed is not None:
+                # Only fits on a later day: the night is the break, so give the time back to the goal
+                cursor = placed[0]
+
+        placed = reserve(estimated_minutes)
+        if placed is not None and last_day is not None and placed[0].date() != last_day and schedule[-1]["is_break"]:
+            schedule.pop()  # Don't end the day on a break
+        schedule.append(_row(goal_data, len(schedule), *(placed or (None, None)), start.date()))
+        if placed is None:
+            continue
+
+        if last_day is not None and placed[0].date() != last_day:
+            accumulated_work_minutes = 0
+        last_day = placed[0].date()
+        accumulated_work_minutes += estimated_minutes
+
+        if accumulated_work_minutes >= WORK_MINUTES_BEFORE_BREAK and idx < len(micro_goals_data) - 1:
+            total_pomodoros_completed += 1
+            is_long_break = total_pomodoros_completed % POMODOROS_PER_LONG_BREAK == 0
+            pending_break = (is_long_break, LONG_BREAK_MINUTES if is_long_break else SHORT_BREAK_MINUTES)
+            accumulated_work_minutes = 0
+
+    return schedule
+
+
+def _goal_interval(scheduled_date: date, starting_time: time, end_time: time) -> Interval:
+    start = datetime.combine(scheduled_date, starting_time)
+    end = datetime.combine(scheduled_date, end_time)
+    if end < start:  # Runs past midnight
+        end += timedelta(days=1)
+    return start, end
+
+
+def load_busy_index(
+    db: Session, owner_id: int, window_start: datetime, window_end: datetime, exclude_task_id: Optional[int] = None
+) -> IntervalIndex:
+    """Busy blocks and other confirmed tasks' scheduled, unfinished goals overlapping the window"""
+    intervals = [
+        (start_at, end_at)
+        for start_at, end_at in db.query(BusyBlock.start_at, BusyBlock.end_at).filter(
+            BusyBlock.owner_id == owner_id,
+            BusyBlock.start_at < window_end,
+            BusyBlock.end_at > window_start,
+        )
+    ]
+
+    goals = db.query(MicroGoal.scheduled_date, MicroGoal.starting_time, MicroGoal.end_time).join(Task).filter(
+        MicroGoal.owner_id == owner_id,
+        MicroGoal.scheduled_date >= window_start.date() - timedelta(days=1),
+        MicroGoal.scheduled_date <= window_end.date(),
+        MicroGoal.starting_time.isnot(None),
+        MicroGoal.end_time.isnot(None),
+        MicroGoal.completed == False,
+        Task.confirmed == True,
+    )
+    if exclude_task_id is not None:
+        goals = goals.filter(MicroGoal.task_id != exclude_task_id)
+    intervals.extend(_goal_interval(*row) for row in goals)
+
+    return IntervalIndex(intervals)
+
+
+def calendar_schedule(
+    db: Session,
+    owner_id: int,
+    micro_goals_data: List[Dict],
+    starting_date: Optional[date] = None,
+    starting_time: Optional[time] = None,
+    end_time: Optional[time] = None,
+    exclude_task_id: Optional[int] = None,
+) -> List[Dict]:
+    """
+    Schedule micro-goals around the user's calendar from starting_date/starting_time
+
+    Without a starting time the first day starts at SCHEDULE_DAY_START, or
+    now when that has already passed today.
+    """
+    now = datetime.now().replace(second=0, microsecond=0)
+    first_day = starting_date or now.date()
+    start = datetime.combine(first_day, starting_time or settings.SCHEDULE_DAY_START)
+    if starting_time is None and start < now:
+        start = now
+
+    window_end = datetime.combine(first_day + timedelta(days=settings.SCHEDULE_MAX_DAYS), time.min)
+    busy = load_busy_index(db, owner_id, start, window_end, exclude_task_id)
+    return place_on_calendar(
+        micro_goals_data, busy, start, end_time or settings.SCHEDULE_DAY_END, settings.SCHEDULE_MAX_DAYS
+    )
@@ -0,0 +1,113 @@
+"""
+Speculative "draft" breakdowns computed while the user is still typing.
+
+The client posts the input box's text to /breakdown/drafts as it changes,
+with an id for the box (`session_id`). Each draft waits DRAFT_DEBOUNCE_MS
+before doing any work, and a newer draft for the same session cancels the
+one still running, so a burst of keystrokes costs at most one LLM call
+(the superseded requests get 409). Drafts never write to the database.
+
+LLM plans from finished drafts are kept for DRAFT_RESULT_TTL_SECONDS,
+keyed by the owner and the normalized text. When the user submits the same
+text, `plan_micro_goals` picks the plan up instead of calling the LLM
+again, so /breakdown returns about as fast as a template match. Template
+and heuristic plans aren't kept: the first is cheap to redo, the second
+should get another try at the LLM. Plans live in this process only; with
+several workers a submit that lands elsewhere just calls the LLM.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+Plan = Tuple[List[Dict], str, Optional[int]]  # (micro_goals_data, source, template_id)
+
+
+class DraftSuperseded(Exception):
+    """A newer draft for the same session cancelled this one"""
+
+
+def _plan_key(owner_id: int, tasks_text: str, use_templates: bool) -> Tuple[int, str, bool]:
+    return owner_id, " ".join(tasks_text.split()).lower(), use_templates
+
+
+class DraftRegistry:
+    """Running drafts per (owner, session) and the recent plans they produced"""
+
+    def __init__(self):
+        self._running: Dict[Tuple[int, str], asyncio.Task] = {}
+        self._plans: "OrderedDict[Tuple[int, str, bool], Tuple[float, Plan]]" = OrderedDict()
+
+    def cached_plan(self, owner_id: int, tasks_text: str, use_templates: bool = True) -> Optional[Plan]:
+        """A draft's plan for this text if one finished recently"""
+        key = _plan_key(owner_id, tasks_text, use_templates)
+        entry = self._plans.get(key)
+        if entry is None:
+            return None
+        expires, plan = entry
+        if expires < time.monotonic():
+            del self._plans[key]
+            return None
+        self._plans.move_to_end(key)
+        return plan
+
+    def _store_plan(self, owner_id: int, tasks_text: str, use_templates: bool, plan: Plan):
+        key = _plan_key(owner_id, tasks_text, use_templates)
+        self._plans[key] = (time.monotonic() + settings.DRAFT_RESULT_TTL_SECONDS, plan)
+        self._plans.move_to_end(key)
+        while len(self._plans) > settings.DRAFT_MAX_RESULTS:
+            self._plans.popitem(last=False)
+
+    async def _run(
+        self, owner_id: int, tasks_text: str, use_templates: bool, compute: Callable[[], Awaitable[Plan]]
+    ) -> Plan:
+        await asyncio.sleep(settings.DRAFT_DEBOUNCE_MS / 1000.0)
+        plan = await compute()
+        if plan[1] == "llm":
+            self._store_plan(owner_id, tasks_text, use_templates, plan)
+        return plan
+
+    async def submit(
+        self,
+        owner_id: int,
+        session_id: str,
+        tasks_text: str,
+        use_templates: bool,
+        compute: Callable[[], Awaitable[Plan]],
+    ) -> Plan:
+        """
+        Plan for a draft: a recent plan for the same text, or compute() after
+        the debounce delay
+
+        Raises:
+            DraftSuperseded: a newer draft for the session arrived first
+        """
+        cached = self.cached_plan(owner_id, tasks_text, use_templates)
+        if cached is not None:
+            return cached
+
+        key = (owner_id, session_id)
+        previous = self._running.get(key)
+        if previous is not None:
+            previous.cancel()
+
+        task = asyncio.ensure_future(self._run(owner_id, tasks_text, use_templates, compute))
+        self._running[key] = task
+        try:
+            await asyncio.wait({task})
+        except asyncio.CancelledError:
+            # This request was cancelled (client disconnected): stop its draft too
+            task.cancel()
+            raise
+        finally:
+            if self._running.get(key) is task:
+                del self._running[key]
+
+        if task.cancelled():
+            raise DraftSuperseded()
+        return task.result()
+
+
+draft_registry = DraftRegistry()
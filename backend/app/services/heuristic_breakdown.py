@@ -0,0 +1,216 @@
+"""
+Fast, deterministic task breakdown used when the LLM is slow or unavailable.
+
+Splits the user's input into lines and then clauses (sentences, commas,
+"and then"), turns each into one or more micro-goals and estimates their
+duration from (in order of preference): an explicit duration in the clause,
+the user's own history of similar goals, or keyword rules. Only explicit
+durations are split into parts; an estimate stays one goal.
+"""
+import re
+import statistics
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.models.task import MicroGoal
+
+DEFAULT_MINUTES = 15
+MAX_CHUNK_MINUTES = 20  # Same 10-20 minute target the LLM prompt asks for
+MIN_MINUTES = 5
+
+# Rough durations for common kinds of work, matched on whole words
+KEYWORD_MINUTES = {
+    "email": 10, "emails": 10, "reply": 10, "respond": 10, "message": 5, "slack": 5,
+    "call": 15, "meeting": 30, "standup": 15, "sync": 20,
+    "write": 20, "draft": 20, "report": 20, "document": 20, "blog": 20,
+    "read": 15, "review": 15, "research": 20, "study": 20, "learn": 20,
+    "code": 20, "implement": 20, "fix": 15, "debug": 20, "test": 15, "deploy": 15,
+    "plan": 10, "organize": 10, "clean": 15, "tidy": 10,
+    "exercise": 30, "workout": 30, "run": 30, "walk": 20, "gym": 45,
+    "cook": 30, "shop": 30, "groceries": 30, "laundry": 15, "pay": 5, "bills": 10,
+    "prepare": 20, "presentation": 20, "slides": 20,
+}
+
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "to", "for", "of", "on", "in", "at", "with",
+    "my", "our", "some", "this", "that", "then", "also", "about", "from", "up",
+}
+
+DURATION_RE = re.compile(
+    r"\(?\s*(\d+(?:\.\d+)?)\s*(h|hr|hrs|hour|hours|m|min|mins|minute|minutes)\b\.?\s*\)?",
+    re.IGNORECASE,
+)
+BULLET_RE = re.compile(r"^\s*(?:[-*•]+|\d+[.)]|\[[ xX]?\])\s*")
+# Sentence ends, commas (not inside numbers like 1,000) and sequencing words, in one pass
+CLAUSE_SPLIT_RE = re.compile(
+    r"(?<=[.!?;])\s+|(?<!\d),|,(?!\d)|\s+(?:and then|then|after that)\s+", re.IGNORECASE
+)
+LEADING_FILLER_RE = re.compile(r"^(?:and|then|also|after that)\s+", re.IGNORECASE)
+WORD_RE = re.compile(r"[a-z]+")
+
+PRIORS_TTL_SECONDS = 300
+PRIORS_SAMPLE_SIZE = 2000
+
+# owner_id -> (loaded_at, priors)
+_priors_cache: Dict[Optional[int], tuple] = {}
+
+
+def _keywords(text: str) -> List[str]:
+    return [w for w in WORD_RE.findall(text.lower()) if w not in STOPWORDS and len(w) > 2]
+
+
+def load_duration_priors(db: Session, owner_id: Optional[int] = None) -> Dict[str, int]:
+    """
+    Median minutes per keyword from the user's recent completed micro-goals.
+
+    Uses the actual time spent when it was tracked, otherwise the estimate the
+    user confirmed. Cached per user for a few minutes so the fallback stays fast.
+    """
+    now = time.monotonic()
+    cached = _priors_cache.get(owner_id)
+    if cached and now - cached[0] < PRIORS_TTL_SECONDS:
+        return cached[1]
+
+    query = db.query(MicroGoal.title, MicroGoal.estimated_minutes, MicroGoal.time_spent_seconds).filter(
+        MicroGoal.is_break == False, MicroGoal.completed == True
+    )
+    if owner_id is not None:
+        query = query.filter(MicroGoal.owner_id == owner_id)
+    rows = (
+        query
+        .order_by(MicroGoal.id.desc())
+        .limit(PRIORS_SAMPLE_SIZE)
+        .all()
+    )
+
+    samples: Dict[str, List[float]] = {}
+    for title, estimated_minutes, time_spent_seconds in rows:
+        minutes = (time_spent_seconds / 60) if time_spent_seconds else estimated_minutes
+        if not minutes:
+            continue
+        for word in set(_keywords(title)):
+            samples.setdefault(word, []).append(minutes)
+
+    # Require a few samples before trusting a word over the keyword rules
+    priors = {word: int(round(statistics.median(values))) for word, values in samples.items() if len(values) >= 3}
+
+    _priors_cache[owner_id] = (now, priors)
+    return priors
+
+
+def _split_items(tasks_text: str) -> List[str]:
+    """Split raw input into individual task phrases"""
+    items = []
+    for line in tasks_text.splitlines():
+        line = BULLET_RE.sub("", line).strip()
+        if not line:
+            continue
+        for part in CLAUSE_SPLIT_RE.split(line):
+            part = LEADING_FILLER_RE.sub("", part.strip(" .;,!"))
+            if part:
+                items.append(part)
+    return items
+
+
+def _estimate_minutes(text: str, priors: Dict[str, int]) -> int:
+    words = _keywords(text)
+
+    history = [priors[w] for w in words if w in priors]
+    if history:
+        return max(MIN_MINUTES, int(statistics.median(history)))
+
+    rules = [KEYWORD_MINUTES[w] for w in words if w in KEYWORD_MINUTES]
+    if rules:
+        return max(rules)
+
+    return DEFAULT_MINUTES
+
+
+def _title_case(text: str) -> str:
+    return text[0].upper() + text[1:] if text else text
+
+
+def heuristic_breakdown(tasks_text: str, priors: Optional[Dict[str, int]] = None) -> List[Dict]:
+    """
+    Break raw task text into micro-goals without calling the LLM
+
+    Args:
+        tasks_text: User's raw input of tasks
+        priors: Optional keyword -> minutes mapping from load_duration_priors
+
+    Returns:
+        List of micro-goals with title, description, estimated_minutes and order,
+        in the same shape as LLMService.breakdown_tasks
+    """
+    priors = priors or {}
+    goals = []
+
+    for item in _split_items(tasks_text):
+        explicit = DURATION_RE.search(item)
+        if explicit:
+            value, unit = float(explicit.group(1)), explicit.group(2).lower()
+            minutes = int(round(value * 60 if unit.startswith("h") else value))
+            title = DURATION_RE.sub("", item).strip(" -:,.") or item
+        else:
+            title = item
+            minutes = _estimate_minutes(item, priors)
+
+        minutes = max(MIN_MINUTES, min(minutes, 480))
+        title = _title_case(title)[:200]
+
+        # Long items the user timed become several focused steps of at most
+        # MAX_CHUNK_MINUTES; an estimate ("gym" = 45) is not worth splitting
+        parts = max(1, -(-minutes // MAX_CHUNK_MINUTES)) if explicit else 1
+        for index in range(parts):
+            chunk = minutes // parts + (1 if index < minutes % parts else 0)
+            goals.append({
+                "title": title if parts == 1 else f"{title} (part {index + 1}/{parts})",
+                "description": "Quick plan generated offline - edit freely before confirming",
+                "estimated_minutes": chunk,
+                "order": len(goals),
+            })
+
+    return goals
+
+
+def heuristic_tips(progress_data: Dict) -> List[str]:
+    """Rule-based progress tips used when the LLM can't generate them"""
+    total = progress_data.get("total_tasks", 0)
+    completed = progress_data.get("completed_tasks", 0)
+    overdue = progress_data.get("overdue_tasks_count", 0)
+    planned = progress_data.get("total_planned_minutes", 0)
+    actual = progress_data.get("total_actual_minutes", 0)
+    current = progress_data.get("current_task_title")
+    details = progress_data.get("task_details", [])
+
+    tips = []
+    remaining = total - completed
+
+    if total and completed == total:
+        tips.append("🎉 Every micro-goal is done - take a real break, you earned it.")
+    elif current:
+        tips.append(f"Stay with \"{current}\" until it's done - finishing beats switching.")
+    else:
+        next_goal = next((d for d in details if not d.get("completed")), None)
+        if next_goal:
+            tips.append(f"Start \"{next_goal['title']}\" now - just the first two minutes.")
+
+    behind = [d for d in details if not d.get("completed") and d.get("time_status") == "past_scheduled_time"]
+    if overdue or behind:
+        tips.append("You're behind schedule - pick the most important remaining goal and let the rest slide.")
+    elif completed and planned and actual > planned * 1.25:
+        tips.append("Tasks are taking longer than planned - try estimating smaller steps next time.")
+    elif completed:
+        tips.append(f"{completed} done - progress > perfection, keep the streak going.")
+
+    if remaining > 0:
+        tips.append(f"Just {remaining} more to go - take a short break after every 25 minutes of focus.")
+
+    defaults = ["Focus on one task at a time.", "Take breaks when needed.", "Keep up the great work! 💪"]
+    for tip in defaults:
+        if len(tips) >= 3:
+            break
+        tips.append(tip)
+    return tips[:3]
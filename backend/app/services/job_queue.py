@@ -0,0 +1,175 @@
+"""
+In-process background job queue backed by the `jobs` table.
+
+Requests enqueue a job and return its id immediately; asyncio workers pick
+jobs up, run the registered handler (e.g. the LLM breakdown) and store the
+result. Database sessions are only held for the short bookkeeping steps,
+never while a handler waits on the upstream.
+
+Jobs survive restarts: queued jobs, and running jobs whose worker died,
+are requeued when the queue starts. Jobs are claimed with a conditional
+UPDATE, so a job is never run twice even if two processes see the same
+table (e.g. while a restarting API overlaps the old one). The API itself
+runs as a single process because of the live timer state (see
+app/services/timer_store.py).
+"""
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.job import Job
+
+# handler(job_id, payload) -> (result, task_id)
+JobHandler = Callable[[str, Dict], Awaitable[tuple]]
+
+
+class JobQueue:
+    def __init__(self, workers: int = 2):
+        self.worker_count = workers
+        self.handlers: Dict[str, JobHandler] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers = []
+        self._waiters: Dict[str, asyncio.Event] = {}
+
+    def register(self, kind: str, handler: JobHandler):
+        self.handlers[kind] = handler
+
+    async def start(self):
+        """Start the workers and requeue jobs left over from a previous run"""
+        self._queue = asyncio.Queue()
+        for job_id in self._recoverable_job_ids():
+            self._queue.put_nowait(job_id)
+        self._workers = [asyncio.create_task(self._worker(index)) for index in range(self.worker_count)]
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def _recoverable_job_ids(self):
+        stale_before = datetime.utcnow() - timedelta(seconds=settings.JOB_STALE_SECONDS)
+        db = SessionLocal()
+        try:
+            # Running jobs that haven't finished long after starting lost their worker
+            db.query(Job).filter(Job.status == "running", Job.started_at < stale_before).update(
+                {"status": "queued"}, synchronize_session=False
+            )
+            db.commit()
+            return [job_id for (job_id,) in db.query(Job.id).filter(Job.status == "queued").order_by(Job.created_at)]
+        finally:
+            db.close()
+
+    def enqueue(self, kind: str, payload: Dict, owner_id: Optional[int] = None) -> str:
+        """Persist a new job and hand it to the workers; the handler sees owner_id in the payload"""
+        if kind not in self.handlers:
+            raise ValueError(f"No handler registered for job kind '{kind}'")
+        if self._queue is None:
+            raise RuntimeError("Job queue is not running")
+
+        job_id = str(uuid.uuid4())
+        db = SessionLocal()
+        try:
+            db.add(Job(id=job_id, kind=kind, status="queued", payload=dict(payload, owner_id=owner_id), owner_id=owner_id))
+            db.commit()
+        finally:
+            db.close()
+
+        self._queue.put_nowait(job_id)
+        return job_id
+
+    def _claim(self, job_id: str) -> Optional[Job]:
+        db = SessionLocal()
+        try:
+            claimed = db.query(Job).filter(Job.id == job_id, Job.status == "queued").update(
+                {"status": "running", "started_at": datetime.utcnow(), "attempts": Job.attempts + 1},
+                synchronize_session=False,
+            )
+            db.commit()
+            if not claimed:
+                return None
+            job = db.query(Job).filter(Job.id == job_id).first()
+            db.expunge(job)
+            return job
+        finally:
+            db.close()
+
+    def _finish(self, job_id: str, status: str, result=None, error: Optional[str] = None, task_id: Optional[int] = None):
+        db = SessionLocal()
+        try:
+            db.query(Job).filter(Job.id == job_id).update(
+                {
+                    "status": status,
+                    "result": result,
+                    "error": error,
+                    "task_id": task_id,
+                    "finished_at": datetime.utcnow(),
+                },
+                synchronize_session=False,
+            )
+            db.commit()
+        finally:
+            db.close()
+
+        waiter = self._waiters.pop(job_id, None)
+        if waiter is not None:
+            waiter.set()
+
+    async def _worker(self, index: int):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                job = self._claim(job_id)
+                if job is None:
+                    continue  # Already taken by another worker/process
+
+                handler = self.handlers.get(job.kind)
+                if handler is None:
+                    self._finish(job_id, "failed", error=f"No handler for job kind '{job.kind}'")
+                    continue
+
+                try:
+                    result, task_id = await handler(job.id, job.payload)
+                except Exception as e:
+                    print(f"ERROR in job {job_id} ({job.kind}): {type(e).__name__}: {str(e)}")
+                    self._finish(job_id, "failed", error=str(e))
+                else:
+                    self._finish(job_id, "succeeded", result=result, task_id=task_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"ERROR in job worker {index}: {type(e).__name__}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def get(self, job_id: str, owner_id: Optional[int] = None) -> Optional[Job]:
+        db = SessionLocal()
+        try:
+            query = db.query(Job).filter(Job.id == job_id)
+            if owner_id is not None:
+                query = query.filter(Job.owner_id == owner_id)
+            job = query.first()
+            if job is not None:
+                db.expunge(job)
+            return job
+        finally:
+            db.close()
+
+    async def wait(self, job_id: str, timeout: float, owner_id: Optional[int] = None) -> Optional[Job]:
+        """Long-poll: return the job once it has finished or the timeout expires"""
+        job = self.get(job_id, owner_id)
+        if job is None or job.status in ("succeeded", "failed"):
+            return job
+
+        waiter = self._waiters.setdefault(job_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(waiter.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.get(job_id, owner_id)
+
+
+job_queue = JobQueue(workers=settings.JOB_WORKERS)
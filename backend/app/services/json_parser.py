@@ -0,0 +1,119 @@
+"""
+Tolerant JSON extraction for LLM responses.
+
+Handles the usual ways model output deviates from pure JSON: markdown code
+fences, chatter before or after the payload, and responses truncated by the
+output token limit (recovered up to the last complete array element).
+"""
+import json
+from typing import Any, Iterable, List
+
+try:
+    import orjson
+except ImportError:  # optional speedup, fall back to the stdlib parser
+    orjson = None
+
+
+def _loads(content: str) -> Any:
+    """Both parsers raise a ValueError subclass on invalid input"""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+_CLOSERS = {"[": "]", "{": "}"}
+
+
+def _strip_to_payload(content: str) -> str:
+    """Drop code fences and any text before the first [ or {"""
+    content = content.strip()
+    if content.startswith("```"):
+        content = content.split("\n", 1)[1] if "\n" in content else content[3:]
+        fence_end = content.rfind("```")
+        if fence_end != -1:
+            content = content[:fence_end]
+
+    starts = [i for i in (content.find("["), content.find("{")) if i != -1]
+    if starts:
+        content = content[min(starts):]
+    return content.strip()
+
+
+def _recover_truncated(content: str) -> str:
+    """
+    Cut a truncated payload back to its last complete array element and
+    close any brackets still open at that point.
+
+    Single pass over the text, tracking strings and nesting depth.
+    """
+    stack = []
+    in_string = False
+    escaped = False
+    best_end = -1
+    best_stack = None
+
+    for index, char in enumerate(content):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+                if stack and stack[-1] == "[":
+                    best_end, best_stack = index + 1, list(stack)
+            continue
+
+        if char == '"':
+            in_string = True
+        elif char in "[{":
+            stack.append(char)
+        elif char in "]}":
+            if not stack:
+                break
+            stack.pop()
+            if not stack:
+                # The whole payload closed cleanly
+                return content[:index + 1]
+            if stack[-1] == "[":
+                best_end, best_stack = index + 1, list(stack)
+
+    if best_stack is None:
+        raise ValueError("No complete JSON element found in truncated response")
+
+    return content[:best_end] + "".join(_CLOSERS[opener] for opener in reversed(best_stack))
+
+
+def parse_llm_json(content: str) -> Any:
+    """
+    Parse JSON out of raw LLM text
+
+    Raises:
+        ValueError: if nothing parseable could be recovered
+    """
+    payload = _strip_to_payload(content)
+    try:
+        return _loads(payload)
+    except ValueError:
+        pass
+
+    print(f"WARNING: LLM response is not valid JSON, attempting partial recovery")
+    try:
+        return _loads(_recover_truncated(payload))
+    except ValueError as e:
+        raise ValueError(f"Failed to parse LLM response as JSON: {content[:200]}... Error: {str(e)}")
+
+
+def extract_list(result: Any, keys: Iterable[str] = ("micro_goals", "tasks", "results", "tips")) -> List:
+    """Return the array from a parsed response, unwrapping {"<key>": [...]} objects"""
+    if isinstance(result, list):
+        return result
+    if isinstance(result, dict):
+        for key in keys:
+            if isinstance(result.get(key), list):
+                return result[key]
+        # If it's a dict with some other key, take the first array
+        for value in result.values():
+            if isinstance(value, list):
+                return value
+    return []
@@ -0,0 +1,440 @@
+"""
+LLM backends and the router that picks one per call.
+
+Backends (LLM_PROVIDERS, in preference order):
+- "gemini": Google Gemini via google.generativeai (GEMINI_MODEL, GEMINI_TIPS_MODEL for tips)
+- "local": any OpenAI-compatible chat completions server, e.g. llama.cpp,
+  vLLM or Ollama (LOCAL_LLM_BASE_URL, LOCAL_LLM_MODEL, LOCAL_LLM_TIPS_MODEL)
+- "fake": deterministic offline answers from the heuristic breakdown, for
+  running without any model; only used when nothing else is healthy, and
+  never with HEURISTIC_FALLBACK_ENABLED off. Breakdown callers label its
+  answers "heuristic" (see LLMResult.provider).
+
+Each backend has one circuit breaker and, per kind of call (breakdown,
+breakdown_batch, tips), a ResilientCaller whose latency window also feeds
+the router. For every call the router tries the healthy backends fastest
+first (p50 of recent calls of that kind; unmeasured ones first so they get
+measured), now and then trying the runner-up so a backend that got faster
+is noticed. A backend is unhealthy while its breaker is open or when most
+of its recent calls failed. If a backend stays unavailable after its
+retries, the call moves on to the next one; other errors (blocked prompt,
+bad request) are raised as they are.
+"""
+import asyncio
+import json
+from abc import ABC, abstractmethod
+import random
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+from functools import partial
+from typing import Dict, List, NamedTuple, Optional
+
+from app.core.config import settings
+from app.services.heuristic_breakdown import heuristic_breakdown, heuristic_tips
+from app.services.prompt_builder import TIPS_PREAMBLE
+from app.services.resilience import CircuitBreaker, LLMUnavailableError, ResilientCaller
+
+KINDS = ("breakdown", "breakdown_batch", "tips")
+MIN_OUTCOMES_FOR_ERROR_RATE = 5
+
+
+class LLMResult(NamedTuple):
+    """A backend's answer, normalized across providers"""
+    text: str
+    finish_reason: str  # "stop", "max_tokens", "safety" or "other"
+    provider: str
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    output_tokens: int = 0
+
+
+# Upstream errors for OpenAI-compatible servers, named so resilience.is_retryable matches them
+class TooManyRequests(Exception):
+    pass
+
+
+class ServiceUnavailable(Exception):
+    pass
+
+
+class LLMProvider(ABC):
+    """One LLM backend"""
+    name = "base"
+    fallback_only = False  # Only used when no other backend is healthy
+
+    @abstractmethod
+    async def generate(
+        self, kind: str, prompt: str, generation_config: Dict, response_schema: Optional[Dict], inputs: Dict
+    ) -> LLMResult:
+        """
+        Run one call. `inputs` carries the structured request behind the
+        prompt (tasks_text, items or progress_data) for backends that don't
+        need the prompt.
+        """
+
+
+class GeminiProvider(LLMProvider):
+    name = "gemini"
+
+    def __init__(self):
+        # The Gemini SDK is heavy to import and configure, so the client is
+        # created on first use instead of when the app (or a script) imports us
+        self._model = None
+        self._safety_settings = None
+        self._tips_model = None
+        self._tips_model_expires_at = 0.0
+        self._init_lock = threading.RLock()
+
+    @property
+    def model(self):
+        """Lazily configure the Gemini client on first access"""
+        if self._model is None:
+            with self._init_lock:
+                if self._model is None:
+                    import google.generativeai as genai
+
+                    genai.configure(api_key=settings.GEMINI_API_KEY)
+                    self._model = genai.GenerativeModel(settings.GEMINI_MODEL)
+        return self._model
+
+    @property
+    def safety_settings(self) -> List[Dict]:
+        """Less restrictive safety settings, built once and reused for every call"""
+        if self._safety_settings is None:
+            from google.generativeai.types import HarmCategory, HarmBlockThreshold
+
+            self._safety_settings = [
+                {"category": HarmCategory.HARM_CATEGORY_HARASSMENT, "threshold": HarmBlockThreshold.BLOCK_NONE},
+                {"category": HarmCategory.HARM_CATEGORY_HATE_SPEECH, "threshold": HarmBlockThreshold.BLOCK_NONE},
+                {"category": HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT, "threshold": HarmBlockThreshold.BLOCK_NONE},
+                {"category": HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT, "threshold": HarmBlockThreshold.BLOCK_NONE},
+            ]
+        return self._safety_settings
+
+    @property
+    def tips_model(self):
+        """
+        Model for progress tips with the static coaching preamble attached
+
+        Uses a cached context for the preamble when LLM_TIPS_CONTEXT_CACHE is on
+        and the SDK/model accept it (caching has a minimum size and isn't
+        available for every model); otherwise sends it as a system instruction.
+        """
+        if self._tips_model is None or time.monotonic() >= self._tips_model_expires_at:
+            with self._init_lock:
+                if self._tips_model is None or time.monotonic() >= self._tips_model_expires_at:
+                    self._tips_model, self._tips_model_expires_at = self._build_tips_model()
+        return self._tips_model
+
+    def _build_tips_model(self):
+        import google.generativeai as genai
+
+        self.model  # Make sure the SDK is configured
+        model_name = settings.GEMINI_TIPS_MODEL or settings.GEMINI_MODEL
+
+        if settings.LLM_TIPS_CONTEXT_CACHE:
+            ttl = settings.LLM_TIPS_CONTEXT_CACHE_TTL_SECONDS
+            try:
+                cached = genai.caching.CachedContent.create(
+                    model=f"models/{model_name}",
+                    system_instruction=TIPS_PREAMBLE,
+                    ttl=timedelta(seconds=ttl),
+                )
+                print(f"DEBUG: Created cached context for tips preamble: {cached.name}")
+                # Rebuild a little before the cache expires upstream
+                return genai.GenerativeModel.from_cached_content(cached), time.monotonic() + ttl * 0.9
+            except Exception as e:
+                print(f"WARNING: Context caching unavailable, using system instruction: {type(e).__name__}: {str(e)}")
+
+        model = genai.GenerativeModel(model_name, system_instruction=TIPS_PREAMBLE)
+        return model, float("inf")
+
+    def _to_result(self, response) -> LLMResult:
+        """Check a Gemini response for blocks and truncation and pull out its text"""
+        print(f"DEBUG: Prompt feedback: {response.prompt_feedback if hasattr(response, 'prompt_feedback') else 'N/A'}")
+        if not response.candidates or len(response.candidates) == 0:
+            raise ValueError(f"No response generated. The request may have been blocked by safety filters. Please try rephrasing your tasks.")
+
+        candidate = response.candidates[0]
+        # FinishReason enum: 0=UNSPECIFIED, 1=STOP (success), 2=MAX_TOKENS, 3=SAFETY, 4=RECITATION, 5=OTHER
+        finish_reason_value = int(candidate.finish_reason) if hasattr(candidate.finish_reason, '__int__') else candidate.finish_reason
+        finish_reason_name = candidate.finish_reason.name if hasattr(candidate.finish_reason, 'name') else str(finish_reason_value)
+        print(f"DEBUG: Finish reason: {finish_reason_name} ({finish_reason_value})")
+
+        if not candidate.content or not candidate.content.parts:
+            # No content parts - likely blocked
+            if hasattr(candidate, 'safety_ratings'):
+                print(f"DEBUG: Safety ratings: {candidate.safety_ratings}")
+            if finish_reason_value == 3 or finish_reason_name == 'SAFETY':
+                raise ValueError(f"Content generation blocked by safety filters. Please try rephrasing your tasks with simpler language.")
+            raise ValueError(f"No valid content returned. Finish reason: {finish_reason_name} ({finish_reason_value})")
+
+        try:
+            text = response.text
+        except ValueError as e:
+            # If response.text accessor fails, try to get text from parts directly
+            if not candidate.content.parts:
+                raise ValueError(f"Unable to extract text from response: {str(e)}")
+            text = candidate.content.parts[0].text
+
+        if finish_reason_value == 1 or finish_reason_name == 'STOP':
+            finish_reason = "stop"
+        elif finish_reason_value == 2 or finish_reason_name == 'MAX_TOKENS':
+            finish_reason = "max_tokens"
+        elif finish_reason_value == 3 or finish_reason_name == 'SAFETY':
+            finish_reason = "safety"
+        else:
+            finish_reason = "other"
+
+        usage = getattr(response, "usage_metadata", None)
+        return LLMResult(
+            text=text.strip(),
+            finish_reason=finish_reason,
+            provider=self.name,
+            prompt_tokens=getattr(usage, "prompt_token_count", 0) or 0,
+            cached_tokens=getattr(usage, "cached_content_token_count", 0) or 0,
+            output_tokens=getattr(usage, "candidates_token_count", 0) or 0,
+        )
+
+    def _generate_sync(self, kind: str, prompt: str, generation_config: Dict) -> LLMResult:
+        model = self.tips_model if kind == "tips" else self.model
+        response = model.generate_content(
+            prompt,
+            generation_config=generation_config,
+            safety_settings=self.safety_settings,
+            # Let the SDK give up too, so timed-out calls don't pin an executor thread
+            request_options={"timeout": settings.LLM_TIMEOUT_SECONDS},
+        )
+        return self._to_result(response)
+
+    async def generate(self, kind, prompt, generation_config, response_schema, inputs) -> LLMResult:
+        if response_schema is not None and settings.LLM_STRUCTURED_OUTPUT:
+            generation_config = dict(
+                generation_config,
+                response_mime_type="application/json",
+                response_schema=response_schema,
+            )
+        # Run in executor since the SDK call is blocking
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, partial(self._generate_sync, kind, prompt, generation_config))
+
+
+class OpenAICompatibleProvider(LLMProvider):
+    """Chat completions against a local (or any OpenAI-compatible) server"""
+    name = "local"
+
+    def __init__(self):
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            import httpx
+
+            headers = {"Authorization": f"Bearer {settings.LOCAL_LLM_API_KEY}"} if settings.LOCAL_LLM_API_KEY else {}
+            self._client = httpx.AsyncClient(
+                base_url=settings.LOCAL_LLM_BASE_URL.rstrip("/"),
+                headers=headers,
+                timeout=settings.LLM_TIMEOUT_SECONDS,
+            )
+        return self._client
+
+    async def generate(self, kind, prompt, generation_config, response_schema, inputs) -> LLMResult:
+        messages = [{"role": "user", "content": prompt}]
+        if kind == "tips":
+            messages.insert(0, {"role": "system", "content": TIPS_PREAMBLE})
+        payload = {
+            "model": (settings.LOCAL_LLM_TIPS_MODEL if kind == "tips" else "") or settings.LOCAL_LLM_MODEL,
+            "messages": messages,
+            "temperature": generation_config.get("temperature", 0.7),
+            "top_p": generation_config.get("top_p", 0.95),
+            "max_tokens": generation_config.get("max_output_tokens"),
+        }
+        if response_schema is not None and settings.LLM_STRUCTURED_OUTPUT:
+            payload["response_format"] = {"type": "json_schema", "json_schema": {"name": kind, "schema": response_schema}}
+
+        response = await self.client.post("/chat/completions", json=payload)
+        if response.status_code == 429:
+            raise TooManyRequests(response.text[:200])
+        if response.status_code >= 500:
+            raise ServiceUnavailable(f"{response.status_code}: {response.text[:200]}")
+        if response.status_code >= 400:
+            raise ValueError(f"Local LLM rejected the request ({response.status_code}): {response.text[:200]}")
+
+        data = response.json()
+        if not data.get("choices"):
+            raise ValueError("No response generated by the local LLM")
+        choice = data["choices"][0]
+        finish_reason = {"stop": "stop", "length": "max_tokens", "content_filter": "safety"}.get(
+            choice.get("finish_reason"), "other"
+        )
+        usage = data.get("usage") or {}
+        return LLMResult(
+            text=(choice.get("message", {}).get("content") or "").strip(),
+            finish_reason=finish_reason,
+            provider=self.name,
+            prompt_tokens=usage.get("prompt_tokens", 0) or 0,
+            cached_tokens=(usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0) or 0,
+            output_tokens=usage.get("completion_tokens", 0) or 0,
+        )
+
+
+class FakeProvider(LLMProvider):
+    """Deterministic offline answers (heuristic breakdown and tips), no model needed"""
+    name = "fake"
+    fallback_only = True
+
+    async def generate(self, kind, prompt, generation_config, response_schema, inputs) -> LLMResult:
+        if kind == "tips":
+            answer = heuristic_tips(inputs.get("progress_data", {}))
+        elif kind == "breakdown_batch":
+            answer = [
+                {"id": item["id"], "micro_goals": heuristic_breakdown(item["tasks_text"])}
+                for item in inputs.get("items", [])
+            ]
+        else:
+            answer = heuristic_breakdown(inputs.get("tasks_text", ""))
+        return LLMResult(text=json.dumps(answer), finish_reason="stop", provider=self.name)
+
+
+PROVIDERS = {
+    "gemini": GeminiProvider,
+    "local": OpenAICompatibleProvider,
+    "fake": FakeProvider,
+}
+
+
+class Backend:
+    """A provider with its breaker, per-kind callers and recent outcomes"""
+
+    def __init__(self, provider: LLMProvider):
+        self.provider = provider
+        self.breaker = CircuitBreaker(
+            failure_threshold=settings.LLM_CIRCUIT_FAILURE_THRESHOLD,
+            reset_timeout=settings.LLM_CIRCUIT_RESET_SECONDS,
+        )
+        self.callers: Dict[str, ResilientCaller] = {}
+        self.outcomes = deque(maxlen=settings.LLM_ROUTER_WINDOW)  # True for success
+        self.last_failure_at = 0.0
+
+    @property
+    def name(self) -> str:
+        return self.provider.name
+
+    def caller(self, kind: str) -> ResilientCaller:
+        if kind not in self.callers:
+            # Latencies differ a lot between kinds (output size), so each gets
+            # its own window for hedging and routing; the breaker is shared
+            self.callers[kind] = ResilientCaller(
+                timeout=settings.LLM_TIMEOUT_SECONDS,
+                max_retries=settings.LLM_MAX_RETRIES,
+                base_delay=settings.LLM_RETRY_BASE_DELAY_SECONDS,
+                breaker=self.breaker,
+                hedge=settings.LLM_HEDGE_ENABLED,
+                hedge_percentile=settings.LLM_HEDGE_PERCENTILE,
+            )
+        return self.callers[kind]
+
+    def latency(self, kind: str) -> Optional[float]:
+        caller = self.callers.get(kind)
+        return caller.latency.percentile(50) if caller else None
+
+    def error_rate(self) -> float:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def healthy(self) -> bool:
+        if self.breaker.state == "open" and self.breaker.retry_after() > 0:
+            return False
+        # A mostly failing backend sits out for a breaker reset period after its last failure
+        failing = len(self.outcomes) >= MIN_OUTCOMES_FOR_ERROR_RATE and self.error_rate() > settings.LLM_ROUTER_MAX_ERROR_RATE
+        return not (failing and time.monotonic() - self.last_failure_at < settings.LLM_CIRCUIT_RESET_SECONDS)
+
+    def record(self, success: bool):
+        self.outcomes.append(success)
+        if not success:
+            self.last_failure_at = time.monotonic()
+
+    def stats(self) -> Dict:
+        return {
+            "healthy": self.healthy(),
+            "breaker": self.breaker.state,
+            "error_rate": round(self.error_rate(), 3),
+            "p50_ms": {
+                kind: round(latency * 1000.0, 1)
+                for kind in KINDS
+                if (latency := self.latency(kind)) is not None
+            },
+        }
+
+
+def _names(value: str) -> List[str]:
+    return [name.strip().lower() for name in value.split(",") if name.strip()]
+
+
+class ProviderRouter:
+    """Sends each call to the fastest healthy backend, failing over to the others"""
+
+    def __init__(self, provider_names: Optional[List[str]] = None, tips_provider_names: Optional[List[str]] = None):
+        provider_names = provider_names if provider_names is not None else _names(settings.LLM_PROVIDERS)
+        tips_provider_names = tips_provider_names if tips_provider_names is not None else _names(settings.LLM_TIPS_PROVIDERS)
+
+        self.backends: Dict[str, Backend] = {}
+        for name in dict.fromkeys(provider_names + tips_provider_names):
+            if name not in PROVIDERS:
+                print(f"WARNING: Unknown LLM provider '{name}', ignoring it")
+                continue
+            self.backends[name] = Backend(PROVIDERS[name]())
+
+        self.order = {
+            kind: [name for name in ((tips_provider_names or provider_names) if kind == "tips" else provider_names)
+                   if name in self.backends]
+            for kind in KINDS
+        }
+        if not self.backends:
+            print("WARNING: No LLM providers configured, every call will fall back to the heuristics")
+
+    def candidates(self, kind: str) -> List[Backend]:
+        """Backends to try for a call, best first"""
+        backends = [
+            self.backends[name] for name in self.order[kind]
+            if settings.HEURISTIC_FALLBACK_ENABLED or not self.backends[name].provider.fallback_only
+        ]
+        healthy = [backend for backend in backends if backend.healthy() and not backend.provider.fallback_only]
+        # Unmeasured backends sort first (so they get measured), then by median latency;
+        # sorted() is stable, so ties keep the configured order
+        healthy.sort(key=lambda backend: backend.latency(kind) or 0.0)
+        if len(healthy) > 1 and random.random() < settings.LLM_ROUTER_EXPLORE_RATE:
+            healthy[0], healthy[1] = healthy[1], healthy[0]
+        rest = [backend for backend in backends if backend not in healthy]
+        rest.sort(key=lambda backend: not (backend.provider.fallback_only and backend.healthy()))
+        return healthy + rest
+
+    async def generate(
+        self, kind: str, prompt: str, generation_config: Dict, response_schema: Optional[Dict] = None, inputs: Optional[Dict] = None
+    ) -> LLMResult:
+        """
+        Raises:
+            LLMUnavailableError: every backend was unavailable
+        """
+        last_error: Optional[LLMUnavailableError] = None
+        for backend in self.candidates(kind):
+            try:
+                result = await backend.caller(kind).call(
+                    lambda: backend.provider.generate(kind, prompt, generation_config, response_schema, inputs or {})
+                )
+            except LLMUnavailableError as e:
+                backend.record(False)
+                last_error = e
+                print(f"WARNING: LLM provider {backend.name} unavailable for {kind}: {e}")
+                continue
+            backend.record(True)
+            return result
+
+        if last_error is None:
+            raise LLMUnavailableError("No LLM provider configured")
+        raise last_error
+
+    def stats(self) -> Dict:
+        return {name: backend.stats() for name, backend in self.backends.items()}
@@ -1,17 +1,81 @@
-import google.generativeai as genai
 from app.core.config import settings
-from typing import List, Dict
-import json
+from app.core.profiling import phase
+from app.services.heuristic_breakdown import heuristic_tips
+from app.services.llm_providers import LLMResult, ProviderRouter
+from app.services.resilience import LLMUnavailableError
+from app.services.json_parser import extract_list, parse_llm_json
+from app.services.prompt_builder import TipsPromptBuilder
+from typing import List, Dict, Optional, Tuple
 import asyncio
-from functools import partial
+
+
+# Response schemas for structured-output (JSON mode) generation
+MICRO_GOAL_ITEM_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        "description": {"type": "string"},
+        "estimated_minutes": {"type": "integer"},
+        "order": {"type": "integer"},
+    },
+    "required": ["title", "estimated_minutes"],
+}
+
+MICRO_GOALS_SCHEMA = {"type": "array", "items": MICRO_GOAL_ITEM_SCHEMA}
+
+BATCH_BREAKDOWN_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "id": {"type": "string"},
+            "micro_goals": MICRO_GOALS_SCHEMA,
+        },
+        "required": ["id", "micro_goals"],
+    },
+}
+
+TIPS_SCHEMA = {"type": "array", "items": {"type": "string"}}
 
 
 class LLMService:
     def __init__(self):
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        self.model = genai.GenerativeModel(settings.GEMINI_MODEL)
+        # Backends are created lazily by the router's providers, so importing
+        # this module stays cheap
+        self.router = ProviderRouter()
+        self.tips_prompt_builder = TipsPromptBuilder(max_prompt_tokens=settings.LLM_TIPS_MAX_PROMPT_TOKENS)
+        self.token_usage: Dict[str, Dict[str, int]] = {}
+
+    def _record_usage(self, kind: str, result: LLMResult, estimated_prompt_tokens: Optional[int] = None):
+        """Log and accumulate token usage reported by the backend for one call"""
+        totals = self.token_usage.setdefault(kind, {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "output_tokens": 0})
+        totals["calls"] += 1
+        totals["prompt_tokens"] += result.prompt_tokens
+        totals["cached_tokens"] += result.cached_tokens
+        totals["output_tokens"] += result.output_tokens
+
+        print(
+            f"DEBUG: {kind} tokens ({result.provider}): prompt={result.prompt_tokens} (estimated {estimated_prompt_tokens}), "
+            f"cached={result.cached_tokens}, output={result.output_tokens}"
+        )
+
+    async def _generate(
+        self, kind: str, prompt: str, generation_config: Dict, response_schema: Optional[Dict] = None, inputs: Optional[Dict] = None
+    ) -> LLMResult:
+        """
+        Call the fastest healthy backend with deadlines, retries, circuit
+        breaking and hedging applied, failing over to the others
+
+        With a response_schema (and LLM_STRUCTURED_OUTPUT on), the backend runs
+        in JSON mode and its output is constrained to the schema.
+
+        Raises:
+            LLMUnavailableError: if no backend answered in time
+        """
+        with phase("llm"):
+            return await self.router.generate(kind, prompt, generation_config, response_schema, inputs)
 
-    async def breakdown_tasks(self, tasks_text: str) -> List[Dict]:
+    async def breakdown_tasks(self, tasks_text: str) -> Tuple[List[Dict], str]:
         """
         Takes raw task text and returns structured micro-goals
 
@@ -19,7 +83,9 @@ class LLMService:
             tasks_text: User's raw input of tasks
 
         Returns:
-            List of micro-goals with title, description, and estimated_minutes
+            (micro_goals, provider): micro-goals with title, description and
+            estimated_minutes, and the backend that answered ("fake" is the
+            offline heuristic, not a model)
         """
 
         prompt = f"""Break down these tasks into small, focused micro-goals:
@@ -52,137 +118,138 @@ Return ONLY a JSON array (no markdown):
 Return pure JSON only."""
 
         try:
-            # Generate content using Gemini (run in executor since it's blocking)
-            loop = asyncio.get_event_loop()
-
-            # Configure safety settings to be less restrictive
-            from google.generativeai.types import HarmCategory, HarmBlockThreshold
-
-            safety_settings = [
-                {
-                    "category": HarmCategory.HARM_CATEGORY_HARASSMENT,
-                    "threshold": HarmBlockThreshold.BLOCK_NONE,
-                },
-                {
-                    "category": HarmCategory.HARM_CATEGORY_HATE_SPEECH,
-                    "threshold": HarmBlockThreshold.BLOCK_NONE,
-                },
-                {
-                    "category": HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT,
-                    "threshold": HarmBlockThreshold.BLOCK_NONE,
-                },
-                {
-                    "category": HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT,
-                    "threshold": HarmBlockThreshold.BLOCK_NONE,
-                },
-            ]
-
-            generate_func = partial(
-                self.model.generate_content,
+            result = await self._generate(
+                "breakdown",
                 prompt,
-                generation_config={
+                {
                     'temperature': 0.7,
                     'top_p': 0.95,
                     'top_k': 40,
                     'max_output_tokens': 4096,  # Increased to avoid truncation
                 },
-                safety_settings=safety_settings
+                response_schema=MICRO_GOALS_SCHEMA,
+                inputs={"tasks_text": tasks_text},
             )
-            response = await loop.run_in_executor(None, generate_func)
-
-            # Check if response was blocked or has no valid parts
-            print(f"DEBUG: Response candidates: {response.candidates if hasattr(response, 'candidates') else 'N/A'}")
-            print(f"DEBUG: Prompt feedback: {response.prompt_feedback if hasattr(response, 'prompt_feedback') else 'N/A'}")
-
-            # Check if we have valid parts in the response
-            if not response.candidates or len(response.candidates) == 0:
-                raise ValueError(f"No response generated. The request may have been blocked by safety filters. Please try rephrasing your tasks.")
-
-            candidate = response.candidates[0]
-            print(f"DEBUG: Finish reason: {candidate.finish_reason}")
-            print(f"DEBUG: Finish reason name: {candidate.finish_reason.name if hasattr(candidate.finish_reason, 'name') else 'N/A'}")
-
-            # Check finish reason
-            # FinishReason enum: 0=UNSPECIFIED, 1=STOP (success), 2=MAX_TOKENS, 3=SAFETY, 4=RECITATION, 5=OTHER
-            finish_reason_value = int(candidate.finish_reason) if hasattr(candidate.finish_reason, '__int__') else candidate.finish_reason
-            finish_reason_name = candidate.finish_reason.name if hasattr(candidate.finish_reason, 'name') else str(finish_reason_value)
-
-            # Check if we have valid content parts first
-            if not candidate.content or not candidate.content.parts:
-                # No content parts - likely blocked
-                if hasattr(candidate, 'safety_ratings'):
-                    print(f"DEBUG: Safety ratings: {candidate.safety_ratings}")
-
-                if finish_reason_value == 3 or finish_reason_name == 'SAFETY':
-                    raise ValueError(f"Content generation blocked by safety filters. Please try rephrasing your tasks with simpler language.")
-                else:
-                    raise ValueError(f"No valid content returned. Finish reason: {finish_reason_name} ({finish_reason_value})")
-
-            # If we got here, we have content parts - check for truncation
-            if finish_reason_value == 2 or finish_reason_name == 'MAX_TOKENS':
+            self._record_usage("breakdown", result)
+
+            if result.finish_reason == "max_tokens":
                 print(f"WARNING: Response may be truncated due to max tokens limit")
                 # We'll try to process it anyway and fix incomplete JSON later
 
-            # Extract text safely
-            try:
-                content = response.text.strip()
-            except ValueError as e:
-                # If response.text accessor fails, try to get text from parts directly
-                if candidate.content.parts:
-                    content = candidate.content.parts[0].text.strip()
-                else:
-                    raise ValueError(f"Unable to extract text from response: {str(e)}")
-            print(f"DEBUG: Full Gemini response length: {len(content)}")
+            content = result.text
+            print(f"DEBUG: Full {result.provider} response length: {len(content)}")
             print(f"DEBUG: Response ends with: '{content[-100:]}'")  # Check ending
 
-            # Remove markdown code blocks if present
-            if content.startswith('```json'):
-                content = content[7:]  # Remove ```json
-            elif content.startswith('```'):
-                content = content[3:]  # Remove ```
-
-            if content.endswith('```'):
-                content = content[:-3]  # Remove trailing ```
-
-            content = content.strip()
-
-            # Check if response seems incomplete (doesn't end with ] or })
-            if not (content.endswith(']') or content.endswith('}')):
-                print(f"WARNING: Response appears incomplete!")
-                # Try to fix incomplete JSON by adding closing bracket
-                if '[' in content and not content.endswith(']'):
-                    # Find the last complete object
-                    last_complete = content.rfind('}')
-                    if last_complete != -1:
-                        # Truncate to last complete object and add closing bracket
-                        content = content[:last_complete + 1] + '\n]'
-                        print(f"DEBUG: Fixed incomplete JSON array by truncating")
-
-            # Parse the JSON response
-            try:
-                result = json.loads(content)
-
-                # Handle if wrapped in an object
-                if isinstance(result, dict) and "micro_goals" in result:
-                    return result["micro_goals"]
-                elif isinstance(result, dict) and "tasks" in result:
-                    return result["tasks"]
-                elif isinstance(result, list):
-                    return result
-                else:
-                    # If it's a dict with some key, try to extract the array
-                    for key, value in result.items():
-                        if isinstance(value, list):
-                            return value
-                    return []
-            except json.JSONDecodeError as e:
-                raise ValueError(f"Failed to parse LLM response as JSON: {content}. Error: {str(e)}")
+            # Parse the JSON response (tolerates code fences and truncation)
+            return extract_list(parse_llm_json(content)), result.provider
 
+        except LLMUnavailableError:
+            raise
         except Exception as e:
             print(f"ERROR in LLM Service: {type(e).__name__}: {str(e)}")
             import traceback
             traceback.print_exc()
-            raise Exception(f"Error calling Gemini API: {str(e)}")
+            raise Exception(f"Error calling the LLM: {str(e)}")
+
+    @staticmethod
+    def pack_batches(items: List[Dict]) -> List[List[Dict]]:
+        """
+        Group batch inputs into as few LLM calls as the token limits allow
+
+        Token counts are estimated at ~4 characters per token, which is close
+        enough for Gemini to keep each call under the configured limits.
+        """
+        batches = []
+        current = []
+        current_tokens = 0
+        for item in items:
+            item_tokens = len(item["tasks_text"]) // 4 + 20  # id and separators
+            too_big = current_tokens + item_tokens > settings.LLM_BATCH_MAX_PROMPT_TOKENS
+            too_many = len(current) >= settings.LLM_BATCH_MAX_ITEMS_PER_CALL
+            if current and (too_big or too_many):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(item)
+            current_tokens += item_tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    async def _breakdown_batch_call(self, items: List[Dict]) -> Dict[str, Tuple[List[Dict], str]]:
+        """Break down one packed group of inputs with a single LLM call"""
+        inputs = "\n\n".join(f"=== id: {item['id']} ===\n{item['tasks_text']}" for item in items)
+
+        prompt = f"""Break down each of the following task lists into small, focused micro-goals.
+Each list starts with a line "=== id: <id> ===".
+
+{inputs}
+
+IMPORTANT Rules:
+- Keep tasks SHORT: 10-20 minutes each (NOT 25-30 minutes)
+- Break large tasks into multiple smaller steps
+- Order logically (dependencies first)
+- Add brief description with motivation
+- Never mix micro-goals from different lists
+
+Return ONLY a JSON array with one entry per list, using the exact ids given (no markdown):
+[
+  {{
+    "id": "<id>",
+    "micro_goals": [
+      {{"title": "Specific action to take", "description": "Brief context", "estimated_minutes": 15, "order": 0}}
+    ]
+  }}
+]
+
+Return pure JSON only."""
+
+        response = await self._generate(
+            "breakdown_batch",
+            prompt,
+            {
+                'temperature': 0.7,
+                'top_p': 0.95,
+                'top_k': 40,
+                'max_output_tokens': 8192,
+            },
+            response_schema=BATCH_BREAKDOWN_SCHEMA,
+            inputs={"items": items},
+        )
+        self._record_usage("breakdown_batch", response)
+
+        result = extract_list(parse_llm_json(response.text), keys=("results",))
+        return {
+            str(entry.get("id")): (entry.get("micro_goals", []), response.provider)
+            for entry in result
+            if isinstance(entry, dict)
+        }
+
+    async def breakdown_tasks_batch(self, items: List[Dict]) -> Dict[str, Tuple[List[Dict], str]]:
+        """
+        Break down several task inputs with as few LLM calls as possible
+
+        Args:
+            items: List of {"id": str, "tasks_text": str}
+
+        Returns:
+            Mapping of input id to (micro_goals, provider), as for
+            breakdown_tasks. Ids whose group failed or that the LLM left out
+            are missing from the mapping.
+        """
+        semaphore = asyncio.Semaphore(settings.LLM_BATCH_CONCURRENCY)
+
+        async def run(batch: List[Dict]) -> Dict[str, Tuple[List[Dict], str]]:
+            async with semaphore:
+                try:
+                    return await self._breakdown_batch_call(batch)
+                except Exception as e:
+                    print(f"ERROR in batch breakdown ({len(batch)} inputs): {type(e).__name__}: {str(e)}")
+                    return {}
+
+        results = {}
+        for partial_result in await asyncio.gather(*(run(batch) for batch in self.pack_batches(items))):
+            results.update(partial_result)
+        return results
 
     async def generate_progress_tips(self, progress_data: Dict) -> List[str]:
         """
@@ -204,165 +271,43 @@ Return pure JSON only."""
             List of 3-5 personalized tips as strings
         """
 
-        prompt = f"""You are an expert productivity coach analyzing a user's work session. Generate EXACTLY 3 SHORT personalized tips based on their current progress and patterns.
-
-Current Progress:
-- Total Tasks: {progress_data.get('total_tasks', 0)}
-- Completed: {progress_data.get('completed_tasks', 0)}
-- Upcoming: {progress_data.get('upcoming_tasks_count', 0)}
-- Behind Schedule: {progress_data.get('overdue_tasks_count', 0)}
-- Planned Time: {progress_data.get('total_planned_minutes', 0)} minutes
-- Actual Time: {progress_data.get('total_actual_minutes', 0)} minutes
-- Current Task: {progress_data.get('current_task_title', 'None')}
-
-Time Context:
-- Current Time: {progress_data.get('current_time', 'Unknown')}
-- Session Started: {progress_data.get('session_start_time', 'Unknown')}
-- First Task Scheduled: {progress_data.get('first_task_start', 'Unknown')}
-- Last Task Ends: {progress_data.get('last_task_end', 'Unknown')}
-
-Task Details (with scheduled times):
-{json.dumps(progress_data.get('task_details', []), indent=2)}
-
-Generate 3-5 tips following these principles:
-
-**Core Principles:**
-1. 🧩 Include "why" - Connect to larger goals (e.g., "This builds toward your project completion")
-2. 🧘 Add mindset cues - Motivational reminders like "Start ugly – progress > perfection" or "Future you will thank you"
-3. 🚀 Apply 2-minute rule - If something can start in <2 min, say "Do Now"
-4. 🧭 Suggest time blocks - When tasks fit best (Morning Focus, Midday Sprint, Evening Wrap-up)
-5. 🏁 Reward milestones - After 2-3 Pomodoros, suggest breaks/rewards
-
-**Context-Aware Intelligence:**
-6. 🎯 Detect patterns - If consistently over/under estimating time, suggest recalibration strategies
-7. ⚡ Energy management - Match task difficulty with likely energy levels throughout the day
-8. 🔄 Task switching - If many incomplete tasks, suggest deep focus strategies to reduce context switching
-9. 🧠 Cognitive load - If many complex tasks, suggest grouping similar work or taking strategic breaks
-10. ✅ Quick wins - Identify easy completions for building momentum and confidence
-11. ⏰ Time awareness - If actual >> planned consistently, suggest breaking tasks into smaller chunks
-12. 🏃 Deadline intelligence - If time is limited, suggest triage and prioritization strategies
-13. 📊 Progress reflection - Acknowledge achievements and suggest realistic next steps
-14. ⚠️ Risk alerts - Gently warn if current pace might affect downstream tasks
-15. 🎁 Completion incentive - "Just X more tasks until [milestone]" to maintain motivation
-
-**Time-Based Intelligence (IMPORTANT):**
-16. ⏱️ Schedule adherence - Compare current time to scheduled start/end times for each task
-17. 🚨 Behind schedule alerts - If tasks with "past_scheduled_time" status aren't completed, suggest catching up
-18. ⏳ Time remaining - Calculate how much time is left until last_task_end and adjust urgency
-19. 🎯 Next task timing - If current time is before next task's scheduled start, suggest preparation or early start
-20. 📅 Realistic expectations - If too many tasks remain for time available, suggest prioritization
-21. 🕐 Pacing guidance - Based on time_status field, give specific advice (e.g., "You should be working on Task X now based on your schedule")
-
-**Adaptive Tone Based on Situation:**
-- If AHEAD of schedule: Positive reinforcement + optional stretch goals
-- If BEHIND schedule: Practical triage without guilt-tripping, focus on what matters most
-- If STUCK on one task: Suggest breaking it down, taking a strategic break, or asking for help
-- If COMPLETING many tasks: Celebrate momentum while gently warning against burnout
-- If NO tasks active: Encourage starting with the easiest or most important task
-
-Tips should be:
-- Specific to their current situation and data patterns
-- Actionable and practical with clear next steps
-- Encouraging but realistic (no toxic positivity)
-- **CONCISE: Maximum 1-2 sentences per tip** (this is critical!)
-- Use emojis sparingly for emphasis (max 1 per tip)
-- Personalized based on actual progress metrics
-- **IMPORTANT: Keep tips SHORT to avoid truncation**
-
-Return ONLY a JSON array of tip strings (no markdown, no code blocks):
-[
-  "Tip text here...",
-  "Another tip..."
-]
-
-Return pure JSON only. Keep each tip to 1-2 sentences maximum."""
+        # Only the progress data is sent per call; the coaching instructions
+        # live in the tips model's system instruction / cached context
+        prompt, estimated_tokens = self.tips_prompt_builder.build(progress_data)
 
         try:
-            loop = asyncio.get_event_loop()
-
-            from google.generativeai.types import HarmCategory, HarmBlockThreshold
-
-            safety_settings = [
-                {"category": HarmCategory.HARM_CATEGORY_HARASSMENT, "threshold": HarmBlockThreshold.BLOCK_NONE},
-                {"category": HarmCategory.HARM_CATEGORY_HATE_SPEECH, "threshold": HarmBlockThreshold.BLOCK_NONE},
-                {"category": HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT, "threshold": HarmBlockThreshold.BLOCK_NONE},
-                {"category": HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT, "threshold": HarmBlockThreshold.BLOCK_NONE},
-            ]
-
-            generate_func = partial(
-                self.model.generate_content,
+            result = await self._generate(
+                "tips",
                 prompt,
-                generation_config={
+                {
                     'temperature': 0.8,  # Slightly higher for more creative tips
                     'top_p': 0.95,
                     'top_k': 40,
-                    'max_output_tokens': 4096,  # Increased to avoid truncation with enhanced prompt
+                    'max_output_tokens': settings.LLM_TIPS_MAX_OUTPUT_TOKENS,
                 },
-                safety_settings=safety_settings
+                response_schema=TIPS_SCHEMA,
+                inputs={"progress_data": progress_data},
             )
-            response = await loop.run_in_executor(None, generate_func)
-
-            # Check response validity
-            if not response.candidates or len(response.candidates) == 0:
-                return ["Keep up the great work! 💪", "Take breaks when needed.", "Focus on one task at a time."]
-
-            candidate = response.candidates[0]
+            self._record_usage("tips", result, estimated_tokens)
 
-            # Check finish reason for truncation
-            finish_reason_value = int(candidate.finish_reason) if hasattr(candidate.finish_reason, '__int__') else candidate.finish_reason
-            finish_reason_name = candidate.finish_reason.name if hasattr(candidate.finish_reason, 'name') else str(finish_reason_value)
-
-            if finish_reason_value == 2 or finish_reason_name == 'MAX_TOKENS':
+            if result.finish_reason == "max_tokens":
                 print(f"WARNING: Tips response may be truncated due to max tokens limit")
 
-            if not candidate.content or not candidate.content.parts:
-                return ["Stay focused on your current task.", "Remember to take breaks.", "You're making progress!"]
+            content = result.text
+            if not content:
+                return heuristic_tips(progress_data)
 
-            # Extract text
-            try:
-                content = response.text.strip()
-            except ValueError:
-                if candidate.content.parts:
-                    content = candidate.content.parts[0].text.strip()
-                else:
-                    return ["Keep going!", "You've got this!", "One step at a time."]
-
-            # Clean markdown
-            if content.startswith('```json'):
-                content = content[7:]
-            elif content.startswith('```'):
-                content = content[3:]
-            if content.endswith('```'):
-                content = content[:-3]
-
-            content = content.strip()
-
-            # Fix incomplete JSON if necessary
-            if not content.endswith(']'):
-                print(f"WARNING: Tips response appears incomplete!")
-                # Find the last complete tip (ending with quote)
-                last_quote = content.rfind('"')
-                if last_quote != -1:
-                    # Find the quote before that (start of last complete tip)
-                    quote_before = content.rfind('"', 0, last_quote)
-                    if quote_before != -1:
-                        # Truncate to last complete tip and add closing bracket
-                        content = content[:last_quote + 1] + '\n]'
-                        print(f"DEBUG: Fixed incomplete tips JSON by truncating to last complete tip")
-
-            # Parse JSON
+            # Parse JSON (tolerates code fences and truncation)
             try:
-                tips = json.loads(content)
-                if isinstance(tips, list) and len(tips) > 0:
-                    return tips
-                return ["Keep pushing forward!", "Great progress so far!", "Stay consistent!"]
-            except json.JSONDecodeError as e:
-                print(f"ERROR: Failed to parse tips JSON: {content[:200]}... Error: {str(e)}")
-                return ["Focus on completing your current task.", "Take a short break if needed.", "You're doing well!"]
+                tips = [tip for tip in extract_list(parse_llm_json(content)) if isinstance(tip, str)]
+            except ValueError as e:
+                print(f"ERROR: Failed to parse tips JSON: {str(e)}")
+                return heuristic_tips(progress_data)
+            return tips or heuristic_tips(progress_data)
 
         except Exception as e:
             print(f"ERROR generating tips: {type(e).__name__}: {str(e)}")
-            return ["Stay focused!", "Keep up the momentum!", "You're making progress!"]
+            return heuristic_tips(progress_data)
 
 
 # Singleton instance
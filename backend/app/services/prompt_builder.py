@@ -0,0 +1,175 @@
+"""
+Prompt construction and token budgeting for progress tips.
+
+The tips prompt is a large static coaching preamble plus a per-poll
+description of the user's progress. The builder keeps the dynamic part small:
+completed goals are summarized, details are serialized without indentation,
+only changes since the previous tips for the same task are called out, and
+upcoming goals are dropped from the end until the prompt fits its budget.
+"""
+import json
+from typing import Dict, List, Optional, Tuple
+
+# Static instructions; sent as a system instruction (or cached context) so the
+# per-call prompt only carries the progress data
+TIPS_PREAMBLE = """You are an expert productivity coach analyzing a user's work session. Generate EXACTLY 3 SHORT personalized tips based on their current progress and patterns.
+
+Generate 3-5 tips following these principles:
+
+**Core Principles:**
+1. 🧩 Include "why" - Connect to larger goals (e.g., "This builds toward your project completion")
+2. 🧘 Add mindset cues - Motivational reminders like "Start ugly – progress > perfection" or "Future you will thank you"
+3. 🚀 Apply 2-minute rule - If something can start in <2 min, say "Do Now"
+4. 🧭 Suggest time blocks - When tasks fit best (Morning Focus, Midday Sprint, Evening Wrap-up)
+5. 🏁 Reward milestones - After 2-3 Pomodoros, suggest breaks/rewards
+
+**Context-Aware Intelligence:**
+6. 🎯 Detect patterns - If consistently over/under estimating time, suggest recalibration strategies
+7. ⚡ Energy management - Match task difficulty with likely energy levels throughout the day
+8. 🔄 Task switching - If many incomplete tasks, suggest deep focus strategies to reduce context switching
+9. 🧠 Cognitive load - If many complex tasks, suggest grouping similar work or taking strategic breaks
+10. ✅ Quick wins - Identify easy completions for building momentum and confidence
+11. ⏰ Time awareness - If actual >> planned consistently, suggest breaking tasks into smaller chunks
+12. 🏃 Deadline intelligence - If time is limited, suggest triage and prioritization strategies
+13. 📊 Progress reflection - Acknowledge achievements and suggest realistic next steps
+14. ⚠️ Risk alerts - Gently warn if current pace might affect downstream tasks
+15. 🎁 Completion incentive - "Just X more tasks until [milestone]" to maintain motivation
+
+**Time-Based Intelligence (IMPORTANT):**
+16. ⏱️ Schedule adherence - Compare current time to scheduled start/end times for each task
+17. 🚨 Behind schedule alerts - If tasks with "past_scheduled_time" status aren't completed, suggest catching up
+18. ⏳ Time remaining - Calculate how much time is left until last_task_end and adjust urgency
+19. 🎯 Next task timing - If current time is before next task's scheduled start, suggest preparation or early start
+20. 📅 Realistic expectations - If too many tasks remain for time available, suggest prioritization
+21. 🕐 Pacing guidance - Based on time_status field, give specific advice (e.g., "You should be working on Task X now based on your schedule")
+
+**Adaptive Tone Based on Situation:**
+- If AHEAD of schedule: Positive reinforcement + optional stretch goals
+- If BEHIND schedule: Practical triage without guilt-tripping, focus on what matters most
+- If STUCK on one task: Suggest breaking it down, taking a strategic break, or asking for help
+- If COMPLETING many tasks: Celebrate momentum while gently warning against burnout
+- If NO tasks active: Encourage starting with the easiest or most important task
+
+Tips should be:
+- Specific to their current situation and data patterns
+- Actionable and practical with clear next steps
+- Encouraging but realistic (no toxic positivity)
+- **CONCISE: Maximum 1-2 sentences per tip** (this is critical!)
+- Use emojis sparingly for emphasis (max 1 per tip)
+- Personalized based on actual progress metrics
+- **IMPORTANT: Keep tips SHORT to avoid truncation**
+
+Return ONLY a JSON array of tip strings (no markdown, no code blocks):
+[
+  "Tip text here...",
+  "Another tip..."
+]
+
+Return pure JSON only. Keep each tip to 1-2 sentences maximum."""
+
+# Fields of a task detail that are worth sending only when set
+OPTIONAL_DETAIL_FIELDS = ("is_active", "exceeds_end_time", "scheduled_start", "scheduled_end", "time_status")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local token estimate (~4 characters per token for English text)"""
+    return len(text) // 4 + 1
+
+
+def _compact_detail(detail: Dict) -> Dict:
+    compact = {
+        "title": detail.get("title"),
+        "est": detail.get("estimated_minutes"),
+    }
+    if detail.get("actual_minutes"):
+        compact["actual"] = detail["actual_minutes"]
+    for field in OPTIONAL_DETAIL_FIELDS:
+        if detail.get(field):
+            compact[field] = detail[field]
+    return compact
+
+
+class TipsPromptBuilder:
+    """Builds compact, size-capped tips prompts and remembers what was last sent per task"""
+
+    def __init__(self, max_prompt_tokens: int = 1500, max_tracked_tasks: int = 1000):
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_tracked_tasks = max_tracked_tasks
+        # task_id -> {goal title: (completed, is_active)} as of the last tips
+        self._last_seen: Dict[int, Dict[str, Tuple[bool, bool]]] = {}
+
+    def _deltas(self, task_id: Optional[int], details: List[Dict]) -> List[str]:
+        """Describe what changed since the previous tips for this task"""
+        snapshot = {d.get("title"): (bool(d.get("completed")), bool(d.get("is_active"))) for d in details}
+        if task_id is None:
+            return []
+
+        previous = self._last_seen.pop(task_id, None)
+        if len(self._last_seen) >= self.max_tracked_tasks:
+            # Forget the oldest task (dicts keep insertion order)
+            self._last_seen.pop(next(iter(self._last_seen)))
+        self._last_seen[task_id] = snapshot
+
+        if previous is None:
+            return []
+
+        changes = []
+        for title, (completed, active) in snapshot.items():
+            was_completed, was_active = previous.get(title, (False, False))
+            if completed and not was_completed:
+                changes.append(f"completed \"{title}\"")
+            elif active and not was_active:
+                changes.append(f"started \"{title}\"")
+        return changes
+
+    def build(self, progress_data: Dict) -> Tuple[str, int]:
+        """
+        Build the dynamic part of the tips prompt
+
+        Returns:
+            (prompt, estimated token count)
+        """
+        details = progress_data.get("task_details", [])
+        done = [d for d in details if d.get("completed")]
+        remaining = [_compact_detail(d) for d in details if not d.get("completed")]
+
+        lines = [
+            "Current Progress:",
+            f"- Total Tasks: {progress_data.get('total_tasks', 0)}",
+            f"- Completed: {progress_data.get('completed_tasks', 0)}",
+            f"- Upcoming: {progress_data.get('upcoming_tasks_count', 0)}",
+            f"- Behind Schedule: {progress_data.get('overdue_tasks_count', 0)}",
+            f"- Planned Time: {progress_data.get('total_planned_minutes', 0)} minutes",
+            f"- Actual Time: {progress_data.get('total_actual_minutes', 0)} minutes",
+            f"- Current Task: {progress_data.get('current_task_title') or 'None'}",
+            "",
+            "Time Context:",
+            f"- Current Time: {progress_data.get('current_time') or 'Unknown'}",
+            f"- Session Started: {progress_data.get('session_start_time') or 'Unknown'}",
+            f"- First Task Scheduled: {progress_data.get('first_task_start') or 'Unknown'}",
+            f"- Last Task Ends: {progress_data.get('last_task_end') or 'Unknown'}",
+        ]
+
+        if done:
+            planned = sum(d.get("estimated_minutes") or 0 for d in done)
+            actual = round(sum(d.get("actual_minutes") or 0 for d in done), 1)
+            lines += ["", f"Completed Goals: {len(done)} ({planned} min planned, {actual} min actual), last: \"{done[-1].get('title')}\""]
+
+        deltas = self._deltas(progress_data.get("task_id"), details)
+        if deltas:
+            lines += ["", "Since Last Tips: " + "; ".join(deltas)]
+
+        header = "\n".join(lines) + "\n\nRemaining Goals (est/actual in minutes):\n"
+
+        # Drop upcoming goals from the end until the prompt fits the budget
+        shown = remaining
+        while True:
+            omitted = len(remaining) - len(shown)
+            body = json.dumps(shown, separators=(",", ":"), ensure_ascii=False)
+            if omitted:
+                body += f"\n(+{omitted} more upcoming goals not shown)"
+            prompt = header + body
+            tokens = estimate_tokens(prompt)
+            if tokens <= self.max_prompt_tokens or not shown:
+                return prompt, tokens
+            shown = shown[:max(0, len(shown) - max(1, len(shown) // 4))]
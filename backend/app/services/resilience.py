@@ -0,0 +1,242 @@
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class LLMUnavailableError(Exception):
+    """Raised when the upstream LLM can't answer in time (open circuit, timeouts, exhausted retries)"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+# Upstream errors worth retrying. Matched by class name so we don't have to
+# import google.api_core (and the rest of the SDK) just to classify errors;
+# httpx (the local backend's client) is checked by type, see is_retryable.
+RETRYABLE_ERROR_NAMES = {
+    "TimeoutError",
+    "DeadlineExceeded",
+    "ServiceUnavailable",
+    "InternalServerError",
+    "ResourceExhausted",
+    "TooManyRequests",
+    "GatewayTimeout",
+    "BadGateway",
+    "ConnectionError",
+    "ConnectError",
+    "ReadTimeout",
+}
+
+
+_transport_errors = None
+
+
+def _httpx_transport_errors() -> tuple:
+    """httpx's network and timeout errors (ConnectTimeout, PoolTimeout, RemoteProtocolError, ...)"""
+    global _transport_errors
+    if _transport_errors is None:
+        try:
+            import httpx
+        except ImportError:
+            _transport_errors = ()
+        else:
+            _transport_errors = (httpx.TransportError, httpx.TimeoutException)
+    return _transport_errors
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Check whether an error (or any of its base classes) is a transient upstream failure"""
+    if isinstance(error, _httpx_transport_errors()):
+        return True
+    return any(cls.__name__ in RETRYABLE_ERROR_NAMES for cls in type(error).__mro__)
+
+
+class LatencyTracker:
+    """Rolling window of call latencies used to pick the hedging threshold"""
+
+    def __init__(self, window: int = 100):
+        self.samples = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+class CircuitBreaker:
+    """
+    Fail fast while the upstream is degraded.
+
+    closed    -> calls go through, consecutive failures are counted
+    open      -> calls are rejected until reset_timeout has passed
+    half_open -> a single trial call is let through; success closes the circuit,
+                 failure opens it again
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    def retry_after(self) -> float:
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def before_call(self):
+        """Raise LLMUnavailableError if the call should not be attempted"""
+        if self.state == "open":
+            if self.retry_after() > 0:
+                raise LLMUnavailableError("LLM circuit breaker is open", retry_after=self.retry_after())
+            self.state = "half_open"
+            self._trial_in_flight = False
+
+        if self.state == "half_open":
+            if self._trial_in_flight:
+                raise LLMUnavailableError("LLM circuit breaker is half-open", retry_after=1.0)
+            self._trial_in_flight = True
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                print(f"WARNING: LLM circuit breaker opened after {self.failures} failures")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def release_trial(self):
+        """
+        The call says nothing about upstream health (cancelled, or rejected
+        as bad input): no verdict, but free the half-open trial slot
+        """
+        self._trial_in_flight = False
+
+
+class ResilientCaller:
+    """
+    Wraps an upstream call with a per-attempt deadline, jittered exponential
+    retries on transient errors, a circuit breaker and optional hedging.
+    """
+
+    def __init__(
+        self,
+        timeout: float = 30.0,
+        max_retries: int = 2,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+        breaker: Optional[CircuitBreaker] = None,
+        hedge: bool = False,
+        hedge_percentile: float = 95.0,
+        hedge_min_samples: int = 20,
+    ):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker or CircuitBreaker()
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.latency = LatencyTracker()
+
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _hedge_delay(self) -> Optional[float]:
+        if not self.hedge or len(self.latency.samples) < self.hedge_min_samples:
+            return None
+        return self.latency.percentile(self.hedge_percentile)
+
+    async def _attempt(self, func: Callable[[], Awaitable[T]]) -> T:
+        """One logical attempt, optionally hedged with a second concurrent request"""
+        hedge_delay = self._hedge_delay()
+        if hedge_delay is None or hedge_delay >= self.timeout:
+            return await asyncio.wait_for(func(), timeout=self.timeout)
+
+        deadline = time.monotonic() + self.timeout
+        primary = asyncio.ensure_future(func())
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=hedge_delay)
+            if done:
+                # Finished before the hedge delay: no hedge, its result (or error) stands
+                return primary.result()
+            print(f"DEBUG: Hedging LLM call after {hedge_delay:.2f}s")
+            pending.add(asyncio.ensure_future(func()))
+
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                done, pending = await asyncio.wait(
+                    pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                # Every finished request failed and nothing is left to wait for
+                if not pending:
+                    raise next(iter(done)).exception()
+            raise asyncio.TimeoutError()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def call(self, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        Call func() with resilience policies applied
+
+        Raises:
+            LLMUnavailableError: circuit open, or every attempt timed out / failed transiently
+            Exception: non-retryable errors from func are re-raised unchanged
+        """
+        last_error: Optional[BaseException] = None
+
+        for attempt in range(self.max_retries + 1):
+            self.breaker.before_call()
+            started = time.monotonic()
+            try:
+                result = await self._attempt(func)
+            except asyncio.CancelledError:
+                self.breaker.release_trial()
+                raise
+            except Exception as e:
+                retryable = is_retryable(e)
+                if retryable:
+                    self.breaker.record_failure()
+                else:
+                    # Bad input or a blocked prompt says nothing about upstream health
+                    self.breaker.release_trial()
+                    raise
+                last_error = e
+                print(f"WARNING: LLM attempt {attempt + 1} failed: {type(e).__name__}: {e}")
+                if attempt < self.max_retries:
+                    await asyncio.sleep(self._backoff(attempt))
+                continue
+
+            self.latency.record(time.monotonic() - started)
+            self.breaker.record_success()
+            return result
+
+        raise LLMUnavailableError(
+            f"LLM unavailable after {self.max_retries + 1} attempts: {type(last_error).__name__}: {last_error}",
+            retry_after=self.breaker.retry_after() if self.breaker.state == "open" else None,
+        )
@@ -0,0 +1,370 @@
+"""
+Retention for execution data.
+
+Every start/pause/resume/complete adds an ExecutionEvent row, so without
+pruning the hot tables grow forever. The retention job:
+
+- rolls events older than RETENTION_EVENT_DAYS into one
+  ExecutionEventSummary per micro-goal and deletes them
+- drops execution_history entries older than the same window
+- deletes breakdowns that were never confirmed within
+  RETENTION_UNCONFIRMED_TASK_HOURS (abandoned or speculative ones)
+- moves tasks older than RETENTION_TASK_DAYS (with their micro-goals,
+  events and summaries) into the archive database as JSON documents
+- purges delta sync tombstones older than SYNC_TOMBSTONE_DAYS
+- deletes background jobs that finished (succeeded or failed) more than
+  JOB_RETENTION_HOURS ago; clients poll them right after queueing
+- runs ANALYZE / PRAGMA optimize; `python run_retention.py` can also
+  VACUUM when rows were removed (never the in-process job: VACUUM rewrites
+  the whole SQLite file while holding its lock)
+
+Work is done in RETENTION_BATCH_SIZE chunks with a commit per chunk so the
+SQLite write lock is never held for long. It runs periodically inside the
+API process (see `retention_loop`) and can be run by hand with
+`python run_retention.py`.
+"""
+import asyncio
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.orm import Session, selectinload, sessionmaker
+
+from app.core.cache import cache
+from app.core.config import settings
+from app.core.database import SessionLocal, engine, sync_schema
+from app.models.archive import ArchiveBase, ArchivedTask
+from app.models.job import Job
+from app.models.task import ExecutionEvent, ExecutionEventSummary, MicroGoal, Task
+from app.services.sync import purge_tombstones
+from app.services.timer_store import timer_store
+
+_archive_session_factory = None
+
+COUNT_COLUMNS = {
+    "start": "start_count",
+    "pause": "pause_count",
+    "resume": "resume_count",
+    "complete": "complete_count",
+}
+
+
+def archive_session() -> Session:
+    """Session for the archive database, created (with its tables) on first use"""
+    global _archive_session_factory
+    if _archive_session_factory is None:
+        url = settings.RETENTION_ARCHIVE_DATABASE_URL
+        archive_engine = create_engine(
+            url,
+            connect_args={"check_same_thread": False} if "sqlite" in url else {}
+        )
+        sync_schema(archive_engine, ArchiveBase.metadata)
+        _archive_session_factory = sessionmaker(autocommit=False, autoflush=False, bind=archive_engine)
+    return _archive_session_factory()
+
+
+def _bump_versions(db: Session, task_ids):
+    """Compacted tasks render differently, so invalidate their ETags"""
+    if task_ids:
+        db.query(Task).filter(Task.id.in_(task_ids)).update(
+            {Task.version: Task.version + 1}, synchronize_session=False
+        )
+
+
+def compact_execution_events(db: Session, cutoff: datetime) -> int:
+    """Roll events older than cutoff into per-goal summaries; returns the number of events removed"""
+    removed = 0
+    while True:
+        events = (
+            db.query(ExecutionEvent)
+            .filter(ExecutionEvent.timestamp < cutoff)
+            .order_by(ExecutionEvent.id)
+            .limit(settings.RETENTION_BATCH_SIZE)
+            .all()
+        )
+        if not events:
+            return removed
+
+        goal_ids = {event.micro_goal_id for event in events}
+        summaries = {
+            summary.micro_goal_id: summary
+            for summary in db.query(ExecutionEventSummary).filter(ExecutionEventSummary.micro_goal_id.in_(goal_ids))
+        }
+
+        for event in events:
+            summary = summaries.get(event.micro_goal_id)
+            if summary is None:
+                summary = ExecutionEventSummary(
+                    micro_goal_id=event.micro_goal_id,
+                    start_count=0,
+                    pause_count=0,
+                    resume_count=0,
+                    complete_count=0,
+                    last_time_spent_at_event=0
+                )
+                db.add(summary)
+                summaries[event.micro_goal_id] = summary
+
+            column = COUNT_COLUMNS.get(event.action)
+            if column:
+                setattr(summary, column, getattr(summary, column) + 1)
+            if summary.first_event_at is None or event.timestamp < summary.first_event_at:
+                summary.first_event_at = event.timestamp
+            if summary.last_event_at is None or event.timestamp >= summary.last_event_at:
+                summary.last_event_at = event.timestamp
+                summary.last_time_spent_at_event = event.time_spent_at_event or 0
+            db.delete(event)
+
+        task_ids = {task_id for (task_id,) in db.query(MicroGoal.task_id).filter(MicroGoal.id.in_(goal_ids))}
+        _bump_versions(db, task_ids)
+        db.commit()
+        removed += len(events)
+
+
+def _entry_time(entry) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(str(entry.get("timestamp"))).replace(tzinfo=None)
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def trim_execution_history(db: Session, cutoff: datetime) -> int:
+    """Drop execution_history entries older than cutoff; returns the number of entries removed"""
+    removed = 0
+    last_id = 0
+    while True:
+        goals = (
+            db.query(MicroGoal)
+            .filter(MicroGoal.id > last_id, MicroGoal.created_at < cutoff, MicroGoal.execution_history.isnot(None))
+            .order_by(MicroGoal.id)
+            .limit(settings.RETENTION_BATCH_SIZE)
+            .all()
+        )
+        if not goals:
+            return removed
+        last_id = goals[-1].id
+
+        task_ids = set()
+        for goal in goals:
+            history = goal.execution_history or []
+            kept = [entry for entry in history if (_entry_time(entry) or cutoff) >= cutoff]
+            if len(kept) != len(history):
+                goal.execution_history = kept
+                removed += len(history) - len(kept)
+                task_ids.add(goal.task_id)
+
+        _bump_versions(db, task_ids)
+        db.commit()
+
+
+def _jsonable(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return value
+
+
+def _row(obj) -> Dict:
+    return {column.key: _jsonable(getattr(obj, column.key)) for column in obj.__table__.columns}
+
+
+def _task_document(task: Task) -> Dict:
+    document = _row(task)
+    document["micro_goals"] = []
+    for goal in task.micro_goals:
+        goal_document = _row(goal)
+        goal_document["execution_events"] = [_row(event) for event in goal.execution_events]
+        goal_document["event_summary"] = _row(goal.event_summary) if goal.event_summary else None
+        document["micro_goals"].append(goal_document)
+    return document
+
+
+def delete_stale_unconfirmed_tasks(db: Session, cutoff: datetime) -> int:
+    """Delete unconfirmed tasks created before cutoff, with their micro-goals; returns the number deleted"""
+    deleted = 0
+    while True:
+        active_task_ids = db.query(MicroGoal.task_id).filter(MicroGoal.is_active == True)
+        task_ids = [
+            task_id for (task_id,) in db.query(Task.id)
+            .filter(Task.confirmed == False, Task.created_at < cutoff, Task.id.notin_(active_task_ids))
+            .order_by(Task.id)
+            .limit(settings.RETENTION_BATCH_SIZE)
+        ]
+        if not task_ids:
+            return deleted
+
+        goal_ids = select(MicroGoal.id).where(MicroGoal.task_id.in_(task_ids))
+        db.query(ExecutionEvent).filter(ExecutionEvent.micro_goal_id.in_(goal_ids)).delete(synchronize_session=False)
+        db.query(ExecutionEventSummary).filter(
+            ExecutionEventSummary.micro_goal_id.in_(goal_ids)
+        ).delete(synchronize_session=False)
+        db.query(MicroGoal).filter(MicroGoal.task_id.in_(task_ids)).delete(synchronize_session=False)
+        db.query(Task).filter(Task.id.in_(task_ids)).delete(synchronize_session=False)
+        db.commit()
+        deleted += len(task_ids)
+
+
+def delete_finished_jobs(db: Session, cutoff: datetime) -> int:
+    """Delete succeeded and failed jobs that finished before cutoff; returns the number deleted"""
+    deleted = 0
+    while True:
+        job_ids = [
+            job_id for (job_id,) in db.query(Job.id)
+            .filter(Job.status.in_(("succeeded", "failed")), Job.finished_at < cutoff)
+            .limit(settings.RETENTION_BATCH_SIZE)
+        ]
+        if not job_ids:
+            return deleted
+
+        db.query(Job).filter(Job.id.in_(job_ids)).delete(synchronize_session=False)
+        db.commit()
+        deleted += len(job_ids)
+
+
+def _reserve_archived_ids(db: Session, archive_db: Session):
+    """
+    Keep new task ids above every archived one
+
+    Archived rows keep their task's id, so an id handed out again (tasks
+    created before the table used AUTOINCREMENT) would overwrite an older
+    archived task. Raises the SQLite sequence past the archive's highest id.
+    """
+    if db.get_bind().dialect.name != "sqlite":
+        return
+    highest = archive_db.query(func.max(ArchivedTask.id)).scalar()
+    if highest is None:
+        return
+    updated = db.execute(
+        text("UPDATE sqlite_sequence SET seq = :highest WHERE name = 'tasks' AND seq < :highest"),
+        {"highest": highest}
+    ).rowcount
+    if not updated and db.execute(text("SELECT 1 FROM sqlite_sequence WHERE name = 'tasks'")).first() is None:
+        db.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES ('tasks', :highest)"), {"highest": highest})
+    db.commit()
+
+
+def archive_old_tasks(db: Session, cutoff: datetime) -> int:
+    """Move tasks created before cutoff to the archive database; returns the number archived"""
+    archive_db = archive_session()
+    try:
+        _reserve_archived_ids(db, archive_db)
+    finally:
+        archive_db.close()
+
+    archived = 0
+    skipped = set()
+    while True:
+        # A task with a running timer is still in use, however old it is
+        active_task_ids = db.query(MicroGoal.task_id).filter(MicroGoal.is_active == True)
+        tasks = (
+            db.query(Task)
+            .options(
+                selectinload(Task.micro_goals).selectinload(MicroGoal.execution_events),
+                selectinload(Task.micro_goals).selectinload(MicroGoal.event_summary),
+            )
+            .filter(Task.created_at < cutoff, Task.id.notin_(active_task_ids), Task.id.notin_(skipped))
+            .order_by(Task.id)
+            .limit(settings.RETENTION_BATCH_SIZE)
+            .all()
+        )
+        if not tasks:
+            return archived
+
+        # Write the archive copy first: a crash in between leaves a duplicate, never a loss
+        archive_db = archive_session()
+        try:
+            existing = {
+                row.id: row for row in
+                archive_db.query(ArchivedTask).filter(ArchivedTask.id.in_([task.id for task in tasks]))
+            }
+            for task in list(tasks):
+                previous = existing.get(task.id)
+                if previous is not None and (previous.created_at, previous.user_input) != (task.created_at, task.user_input):
+                    # Another task had this id before ids were AUTOINCREMENT: keep both, leave this one live
+                    print(f"WARNING: Not archiving task {task.id}: its id belongs to an archived task")
+                    skipped.add(task.id)
+                    tasks.remove(task)
+                    continue
+                archive_db.merge(ArchivedTask(
+                    id=task.id,
+                    owner_id=task.owner_id,
+                    user_input=task.user_input,
+                    created_at=task.created_at,
+                    confirmed=task.confirmed,
+                    document=_task_document(task)
+                ))
+            archive_db.commit()
+        finally:
+            archive_db.close()
+
+        for task in tasks:
+            db.delete(task)
+        db.commit()
+        archived += len(tasks)
+
+
+def optimize_database(vacuum: bool = False):
+    """Refresh planner statistics and, on SQLite, optionally reclaim free pages"""
+    is_sqlite = engine.dialect.name == "sqlite"
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("ANALYZE"))
+        if is_sqlite:
+            conn.execute(text("PRAGMA optimize"))
+            if vacuum:
+                conn.execute(text("VACUUM"))
+
+
+def run_retention(now: Optional[datetime] = None, vacuum: bool = False) -> Dict[str, int]:
+    """Run one retention pass and return what it did; vacuum is for offline runs (run_retention.py)"""
+    now = now or datetime.utcnow()
+    event_cutoff = now - timedelta(days=settings.RETENTION_EVENT_DAYS)
+    task_cutoff = now - timedelta(days=settings.RETENTION_TASK_DAYS)
+
+    # Timer flags decide which tasks are in use: write the live ones first
+    timer_store.flush()
+
+    db = SessionLocal()
+    try:
+        stats = {
+            # Before archiving, so abandoned breakdowns aren't archived
+            "stale_tasks_deleted": delete_stale_unconfirmed_tasks(
+                db, now - timedelta(hours=settings.RETENTION_UNCONFIRMED_TASK_HOURS)
+            ),
+            "tasks_archived": archive_old_tasks(db, task_cutoff),
+            "events_compacted": compact_execution_events(db, event_cutoff),
+            "history_entries_trimmed": trim_execution_history(db, event_cutoff),
+            "sync_tombstones_purged": purge_tombstones(db, now - timedelta(days=settings.SYNC_TOMBSTONE_DAYS)),
+            "jobs_deleted": delete_finished_jobs(db, now - timedelta(hours=settings.JOB_RETENTION_HOURS)),
+        }
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    if (
+        stats["stale_tasks_deleted"] or stats["tasks_archived"]
+        or stats["events_compacted"] or stats["history_entries_trimmed"]
+    ):
+        # Changes span many users' tasks, so drop cached responses wholesale
+        cache.clear()
+
+    removed_rows = (
+        stats["stale_tasks_deleted"] or stats["tasks_archived"] or stats["events_compacted"] or stats["jobs_deleted"]
+    )
+    optimize_database(vacuum=vacuum and bool(removed_rows))
+    return stats
+
+
+async def retention_loop():
+    """Run the retention job every RETENTION_INTERVAL_HOURS, off the event loop"""
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            stats = await loop.run_in_executor(None, run_retention)
+            print(f"DEBUG: Retention pass finished: {stats}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"ERROR in retention job: {type(e).__name__}: {str(e)}")
+        await asyncio.sleep(settings.RETENTION_INTERVAL_HOURS * 3600)
@@ -0,0 +1,95 @@
+from datetime import datetime, time, timedelta
+from typing import Dict, List, Optional
+
+# Pomodoro break rules
+WORK_MINUTES_BEFORE_BREAK = 25
+SHORT_BREAK_MINUTES = 5
+LONG_BREAK_MINUTES = 15
+POMODOROS_PER_LONG_BREAK = 3
+
+
+def _add_minutes(start: time, minutes: int) -> time:
+    return (datetime.combine(datetime.today(), start) + timedelta(minutes=minutes)).time()
+
+
+def build_schedule(
+    micro_goals_data: List[Dict],
+    starting_time: Optional[time] = None,
+    end_time: Optional[time] = None,
+) -> List[Dict]:
+    """
+    Lay out micro-goals back to back from starting_time and insert Pomodoro breaks
+
+    Pure computation, no database access: returns one dict per row to insert
+    (work goals and breaks, in order) with the MicroGoal column values.
+
+    Args:
+        micro_goals_data: Micro-goals as returned by the LLM (title, description, estimated_minutes)
+        starting_time: When the first micro-goal starts; without it no times are assigned
+        end_time: User's desired end time, used to flag goals that run past it
+    """
+    schedule = []
+    current_time = starting_time
+    accumulated_work_minutes = 0  # Track time since last break
+    total_pomodoros_completed = 0  # Track total pomodoros for long break scheduling
+
+    for idx, goal_data in enumerate(micro_goals_data):
+        start_time = None
+        goal_end_time = None
+        exceeds_end_time = False
+        estimated_minutes = goal_data.get("estimated_minutes", 30)
+
+        if current_time:
+            start_time = current_time
+            goal_end_time = _add_minutes(current_time, estimated_minutes)
+
+            # Check if this micro-goal exceeds the user's desired end time
+            if end_time and goal_end_time > end_time:
+                exceeds_end_time = True
+
+            # Update current_time for next item (task or break)
+            current_time = goal_end_time
+
+        schedule.append({
+            "title": goal_data.get("title", ""),
+            "description": goal_data.get("description", ""),
+            "estimated_minutes": estimated_minutes,
+            "order": len(schedule),  # Use actual position in list
+            "completed": False,
+            "starting_time": start_time,
+            "end_time": goal_end_time,
+            "exceeds_end_time": exceeds_end_time,
+            "is_break": False,
+            "break_type": None,
+        })
+
+        # Accumulate work time
+        accumulated_work_minutes += estimated_minutes
+
+        # Add a break after at least 25 minutes of work, but not after the last task
+        if accumulated_work_minutes >= WORK_MINUTES_BEFORE_BREAK and idx < len(micro_goals_data) - 1 and current_time:
+            total_pomodoros_completed += 1
+
+            # Long break after every 3 pomodoros, short break otherwise
+            is_long_break = (total_pomodoros_completed % POMODOROS_PER_LONG_BREAK == 0)
+            break_minutes = LONG_BREAK_MINUTES if is_long_break else SHORT_BREAK_MINUTES
+            break_end = _add_minutes(current_time, break_minutes)
+
+            schedule.append({
+                "title": f"{'Long' if is_long_break else 'Short'} Break",
+                "description": f"Take a {break_minutes} minute break - relax, stretch, hydrate! 🧘",
+                "estimated_minutes": break_minutes,
+                "order": len(schedule),
+                "completed": False,
+                "starting_time": current_time,
+                "end_time": break_end,
+                "exceeds_end_time": bool(end_time and break_end > end_time),
+                "is_break": True,
+                "break_type": "long" if is_long_break else "short",
+            })
+
+            # Update current time to after the break and reset accumulated work time
+            current_time = break_end
+            accumulated_work_minutes = 0
+
+    return schedule
@@ -0,0 +1,203 @@
+"""
+Full-text search over task inputs and micro-goal titles/descriptions.
+
+SQLite: an FTS5 table (`search_index`, porter stemming) kept in sync by
+triggers on `tasks` and `micro_goals`, so every write path (breakdown bulk
+inserts, confirm, delete, retention) updates it without extra code. Tasks
+and goals share the table with disjoint rowids (goal id * 2, task id * 2 + 1)
+so the triggers touch a single row by rowid. The owner is an indexed column
+that every query matches on, keeping lookups within one user's rows.
+
+Postgres: GIN expression indexes over to_tsvector() of the same columns,
+which the database maintains by itself; queries rank with ts_rank and build
+snippets with ts_headline.
+"""
+import re
+from typing import Dict, List
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.database import engine
+
+SNIPPET_START = "<mark>"
+SNIPPET_END = "</mark>"
+SNIPPET_TOKENS = 12
+TITLE_WEIGHT = 2.0  # A hit in a goal title counts double a hit in descriptions or task input
+
+TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+SQLITE_TRIGGERS = {
+    "search_tasks_ai": """
+        CREATE TRIGGER search_tasks_ai AFTER INSERT ON tasks BEGIN
+            INSERT INTO search_index(rowid, owner, task_id, goal_id, title, body)
+            VALUES (NEW.id * 2 + 1, 'u' || NEW.owner_id, NEW.id, NULL, '', NEW.user_input);
+        END""",
+    "search_tasks_au": """
+        CREATE TRIGGER search_tasks_au AFTER UPDATE OF user_input, owner_id ON tasks BEGIN
+            DELETE FROM search_index WHERE rowid = OLD.id * 2 + 1;
+            INSERT INTO search_index(rowid, owner, task_id, goal_id, title, body)
+            VALUES (NEW.id * 2 + 1, 'u' || NEW.owner_id, NEW.id, NULL, '', NEW.user_input);
+        END""",
+    "search_tasks_ad": """
+        CREATE TRIGGER search_tasks_ad AFTER DELETE ON tasks BEGIN
+            DELETE FROM search_index WHERE rowid = OLD.id * 2 + 1;
+        END""",
+    "search_goals_ai": """
+        CREATE TRIGGER search_goals_ai AFTER INSERT ON micro_goals WHEN coalesce(NEW.is_break, 0) = 0 BEGIN
+            INSERT INTO search_index(rowid, owner, task_id, goal_id, title, body)
+            VALUES (NEW.id * 2, 'u' || NEW.owner_id, NEW.task_id, NEW.id, NEW.title, coalesce(NEW.description, ''));
+        END""",
+    "search_goals_au": """
+        CREATE TRIGGER search_goals_au AFTER UPDATE OF title, description, owner_id ON micro_goals
+        WHEN coalesce(NEW.is_break, 0) = 0 BEGIN
+            DELETE FROM search_index WHERE rowid = OLD.id * 2;
+            INSERT INTO search_index(rowid, owner, task_id, goal_id, title, body)
+            VALUES (NEW.id * 2, 'u' || NEW.owner_id, NEW.task_id, NEW.id, NEW.title, coalesce(NEW.description, ''));
+        END""",
+    "search_goals_ad": """
+        CREATE TRIGGER search_goals_ad AFTER DELETE ON micro_goals BEGIN
+            DELETE FROM search_index WHERE rowid = OLD.id * 2;
+        END""",
+}
+
+POSTGRES_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_tasks_search ON tasks USING GIN (to_tsvector('english', user_input))",
+    "CREATE INDEX IF NOT EXISTS ix_micro_goals_search ON micro_goals "
+    "USING GIN (to_tsvector('english', title || ' ' || coalesce(description, '')))",
+]
+
+
+def _init_sqlite():
+    with engine.begin() as conn:
+        existing = {
+            name for (name,) in conn.execute(
+                text("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+            )
+        }
+        if "search_index" in existing and all(name in existing for name in SQLITE_TRIGGERS):
+            return
+
+        # New index, or the base tables were recreated (dropping their triggers): rebuild
+        print("Building full-text search index")
+        conn.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+            "owner, task_id UNINDEXED, goal_id UNINDEXED, title, body, tokenize = 'porter unicode61')"
+        ))
+        conn.execute(text("DELETE FROM search_index"))
+        for name, ddl in SQLITE_TRIGGERS.items():
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+            conn.execute(text(ddl))
+
+        conn.execute(text(
+            "INSERT INTO search_index(rowid, owner, task_id, goal_id, title, body) "
+            "SELECT id * 2 + 1, 'u' || owner_id, id, NULL, '', user_input FROM tasks"
+        ))
+        conn.execute(text(
+            "INSERT INTO search_index(rowid, owner, task_id, goal_id, title, body) "
+            "SELECT id * 2, 'u' || owner_id, task_id, id, title, coalesce(description, '') "
+            "FROM micro_goals WHERE coalesce(is_break, 0) = 0"
+        ))
+
+
+def init_search_index():
+    """Create the full-text index for the current database (idempotent)"""
+    if engine.dialect.name == "sqlite":
+        _init_sqlite()
+    elif engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            for ddl in POSTGRES_INDEXES:
+                conn.execute(text(ddl))
+    else:
+        print(f"WARNING: Full-text search is not supported on {engine.dialect.name}")
+
+
+def _terms(query: str) -> List[str]:
+    return TERM_RE.findall(query.lower())
+
+
+def _search_sqlite(db: Session, owner_id: int, terms: List[str], limit: int, offset: int):
+    # Quote every term so user input can't inject FTS syntax; the last one
+    # is a prefix so results show up while the user is still typing
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    match = f'owner : "u{owner_id}" AND {{title body}} : ({" ".join(quoted)})'
+
+    return db.execute(text(f"""
+        SELECT search_index.task_id, search_index.goal_id,
+               highlight(search_index, 3, :start, :end) AS title,
+               snippet(search_index, 4, :start, :end, '…', {SNIPPET_TOKENS}) AS snippet,
+               bm25(search_index, 0.0, 0.0, 0.0, {TITLE_WEIGHT}, 1.0) AS rank,
+               tasks.created_at
+        FROM search_index JOIN tasks ON tasks.id = search_index.task_id
+        WHERE search_index MATCH :match
+        ORDER BY rank
+        LIMIT :limit OFFSET :offset
+    """), {
+        "match": match, "start": SNIPPET_START, "end": SNIPPET_END, "limit": limit, "offset": offset
+    }).all()
+
+
+def _search_postgres(db: Session, owner_id: int, terms: List[str], limit: int, offset: int):
+    headline = f"'StartSel={SNIPPET_START}, StopSel={SNIPPET_END}, MaxWords={SNIPPET_TOKENS * 2}, MinWords=5'"
+    # Prefix match on the last term, like the SQLite variant
+    tsquery = " & ".join(terms[:-1] + [f"{terms[-1]}:*"])
+
+    # bm25 ranks ascending, ts_rank descending: negate so both sort the same way.
+    # Headlines are expensive, so they're only built for the page being returned.
+    return db.execute(text(f"""
+        WITH q AS (SELECT to_tsquery('english', :tsquery) AS query),
+        page AS (
+            SELECT * FROM (
+                SELECT t.id AS task_id, NULL::integer AS goal_id, '' AS title_text, t.user_input AS body_text,
+                       -ts_rank(to_tsvector('english', t.user_input), q.query) AS rank,
+                       t.created_at
+                FROM tasks t, q
+                WHERE t.owner_id = :owner_id AND to_tsvector('english', t.user_input) @@ q.query
+                UNION ALL
+                SELECT g.task_id, g.id, g.title, coalesce(g.description, ''),
+                       -{TITLE_WEIGHT} * ts_rank(to_tsvector('english', g.title || ' ' || coalesce(g.description, '')), q.query),
+                       t.created_at
+                FROM micro_goals g JOIN tasks t ON t.id = g.task_id, q
+                WHERE g.owner_id = :owner_id AND NOT coalesce(g.is_break, false)
+                  AND to_tsvector('english', g.title || ' ' || coalesce(g.description, '')) @@ q.query
+            ) matches
+            ORDER BY rank
+            LIMIT :limit OFFSET :offset
+        )
+        SELECT page.task_id, page.goal_id,
+               ts_headline('english', page.title_text, q.query, {headline}) AS title,
+               ts_headline('english', page.body_text, q.query, {headline}) AS snippet,
+               page.rank, page.created_at
+        FROM page, q
+        ORDER BY page.rank
+    """), {"tsquery": tsquery, "owner_id": owner_id, "limit": limit, "offset": offset}).all()
+
+
+def search(db: Session, owner_id: int, query: str, limit: int = 20, offset: int = 0) -> List[Dict]:
+    """
+    Ranked matches for the user's tasks and micro-goals, best first
+
+    Fetches one row beyond limit so callers can tell whether there's a next page.
+    """
+    terms = _terms(query)
+    if not terms:
+        return []
+
+    if engine.dialect.name == "postgresql":
+        rows = _search_postgres(db, owner_id, terms, limit + 1, offset)
+    else:
+        rows = _search_sqlite(db, owner_id, terms, limit + 1, offset)
+
+    return [
+        {
+            "kind": "micro_goal" if row.goal_id is not None else "task",
+            "task_id": row.task_id,
+            "micro_goal_id": row.goal_id,
+            "title": row.title or None,
+            "snippet": row.snippet,
+            "rank": float(row.rank),
+            "task_created_at": row.created_at,
+        }
+        for row in rows
+    ]
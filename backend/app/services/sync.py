@@ -0,0 +1,195 @@
+"""
+Delta sync feed: what changed in a user's tasks since a sequence number.
+
+Every insert, update and delete of a task, micro-goal or execution event
+rewrites that entity's row in `sync_changes` with the next number from
+`sync_state.last_seq` (deletes set `deleted`, leaving a tombstone). This is
+done by database triggers, like the search index, so bulk inserts, Core
+deletes and the retention job are all covered without extra code. Only the
+latest change per entity is kept, so the log is as large as the data.
+
+Clients keep the last `seq` they applied and ask for everything after it.
+Tombstones older than SYNC_TOMBSTONE_DAYS are purged by the retention job;
+a cursor older than the newest purged tombstone might have missed a delete,
+so it gets a reset (a fresh snapshot) instead of a delta.
+
+Sequence numbers follow commit order because writes are serialized: SQLite
+has a single writer, and on Postgres the triggers update the one sync_state
+row, which makes concurrent writers to these tables queue on its row lock.
+"""
+from datetime import datetime
+from typing import Dict, List
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.database import engine
+from app.models.sync import SyncChange, SyncState
+from app.models.task import ExecutionEvent, MicroGoal, Task
+
+ENTITY_TABLES = {
+    "task": "tasks",
+    "micro_goal": "micro_goals",
+    "execution_event": "execution_events",
+}
+ENTITY_MODELS = {
+    "task": Task,
+    "micro_goal": MicroGoal,
+    "execution_event": ExecutionEvent,
+}
+
+SQLITE_TRIGGER = """
+    CREATE TRIGGER {name} AFTER {operation} ON {table} BEGIN
+        UPDATE sync_state SET last_seq = last_seq + 1 WHERE id = 1;
+        INSERT OR REPLACE INTO sync_changes(entity, entity_id, owner_id, seq, deleted, changed_at)
+        VALUES ('{entity}', {row}.id, {row}.owner_id, (SELECT last_seq FROM sync_state WHERE id = 1), {deleted},
+                strftime('%Y-%m-%d %H:%M:%f', 'now'));
+    END"""
+
+POSTGRES_FUNCTION = """
+    CREATE OR REPLACE FUNCTION sync_record_change() RETURNS trigger AS $$
+    DECLARE
+        next_seq integer;
+        row_data record;
+    BEGIN
+        IF TG_OP = 'DELETE' THEN row_data := OLD; ELSE row_data := NEW; END IF;
+        UPDATE sync_state SET last_seq = last_seq + 1 WHERE id = 1 RETURNING last_seq INTO next_seq;
+        INSERT INTO sync_changes(entity, entity_id, owner_id, seq, deleted, changed_at)
+        VALUES (TG_ARGV[0], row_data.id, row_data.owner_id, next_seq, TG_OP = 'DELETE', now() AT TIME ZONE 'utc')
+        ON CONFLICT (entity, entity_id) DO UPDATE
+        SET owner_id = EXCLUDED.owner_id, seq = EXCLUDED.seq, deleted = EXCLUDED.deleted, changed_at = EXCLUDED.changed_at;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql"""
+
+POSTGRES_TRIGGER = """
+    CREATE TRIGGER {name} AFTER INSERT OR UPDATE OR DELETE ON {table}
+    FOR EACH ROW EXECUTE FUNCTION sync_record_change('{entity}')"""
+
+
+def _sqlite_triggers() -> Dict[str, str]:
+    triggers = {}
+    for entity, table in ENTITY_TABLES.items():
+        for operation, row, deleted in (("INSERT", "NEW", 0), ("UPDATE", "NEW", 0), ("DELETE", "OLD", 1)):
+            name = f"sync_{table}_{operation.lower()}"
+            triggers[name] = SQLITE_TRIGGER.format(
+                name=name, operation=operation, table=table, entity=entity, row=row, deleted=deleted
+            )
+    return triggers
+
+
+def _existing_triggers(conn) -> set:
+    if engine.dialect.name == "sqlite":
+        query = "SELECT name FROM sqlite_master WHERE type = 'trigger'"
+    else:
+        query = "SELECT tgname FROM pg_trigger WHERE NOT tgisinternal"
+    return {name for (name,) in conn.execute(text(query))}
+
+
+def init_sync_log():
+    """Install the change triggers for the current database (idempotent)"""
+    if engine.dialect.name not in ("sqlite", "postgresql"):
+        print(f"WARNING: Delta sync is not supported on {engine.dialect.name}")
+        return
+
+    trigger_names = [f"sync_{table}_{operation}" for table in ENTITY_TABLES.values() for operation in ("insert", "update", "delete")]
+    if engine.dialect.name == "postgresql":
+        trigger_names = [f"sync_{table}" for table in ENTITY_TABLES.values()]
+
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO sync_state (id, last_seq, purged_seq) SELECT 1, 0, 0 "
+            "WHERE NOT EXISTS (SELECT 1 FROM sync_state WHERE id = 1)"
+        ))
+        if all(name in _existing_triggers(conn) for name in trigger_names):
+            return
+
+        # New log, or the base tables were recreated (dropping their triggers): rebuild
+        print("Building delta sync change log")
+        if engine.dialect.name == "sqlite":
+            for name, ddl in _sqlite_triggers().items():
+                conn.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+                conn.execute(text(ddl))
+        else:
+            conn.execute(text(POSTGRES_FUNCTION))
+            for entity, table in ENTITY_TABLES.items():
+                conn.execute(text(f"DROP TRIGGER IF EXISTS sync_{table} ON {table}"))
+                conn.execute(text(POSTGRES_TRIGGER.format(name=f"sync_{table}", table=table, entity=entity)))
+
+        conn.execute(text("DELETE FROM sync_changes"))
+        for entity, table in ENTITY_TABLES.items():
+            conn.execute(text(f"""
+                INSERT INTO sync_changes(entity, entity_id, owner_id, seq, deleted, changed_at)
+                SELECT '{entity}', id, owner_id,
+                       (SELECT last_seq FROM sync_state WHERE id = 1) + row_number() OVER (ORDER BY id), false, :now
+                FROM {table}
+            """), {"now": datetime.utcnow()})
+            conn.execute(text(
+                "UPDATE sync_state SET last_seq = coalesce((SELECT max(seq) FROM sync_changes), last_seq) WHERE id = 1"
+            ))
+        # Cursors from before the rebuild can't be trusted: make them resync
+        conn.execute(text("UPDATE sync_state SET purged_seq = last_seq WHERE id = 1"))
+
+
+def purge_tombstones(db: Session, cutoff: datetime) -> int:
+    """Drop tombstones older than cutoff (caller commits); returns how many were removed"""
+    tombstones = db.query(SyncChange).filter(SyncChange.deleted == True, SyncChange.changed_at < cutoff)
+    newest = tombstones.with_entities(SyncChange.seq).order_by(SyncChange.seq.desc()).limit(1).scalar()
+    if newest is None:
+        return 0
+
+    removed = tombstones.delete(synchronize_session=False)
+    db.query(SyncState).filter(SyncState.id == 1, SyncState.purged_seq < newest).update(
+        {SyncState.purged_seq: newest}, synchronize_session=False
+    )
+    return removed
+
+
+def changes_since(db: Session, owner_id: int, since: int, limit: int, snapshot: bool = False) -> Dict:
+    """
+    The owner's changes after `since`, oldest first, at most `limit` entities
+
+    Returns the current rows of changed entities (grouped by kind), ids of
+    deleted ones, the cursor for the next call and whether the client must
+    drop its replica first (`reset`). While `snapshot` is set the client is
+    paging through a full sync, which doesn't need purged tombstones.
+    """
+    purged_seq = db.query(SyncState.purged_seq).filter(SyncState.id == 1).scalar() or 0
+    reset = not snapshot and 0 < since < purged_seq
+    if reset:
+        since = 0
+    snapshot = snapshot or since == 0
+
+    changes = (
+        db.query(SyncChange.entity, SyncChange.entity_id, SyncChange.seq, SyncChange.deleted)
+        .filter(SyncChange.owner_id == owner_id, SyncChange.seq > since)
+        .order_by(SyncChange.seq)
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    changed: Dict[str, List[int]] = {entity: [] for entity in ENTITY_MODELS}
+    deleted: Dict[str, List[int]] = {entity: [] for entity in ENTITY_MODELS}
+    for entity, entity_id, _, is_deleted in changes:
+        (deleted if is_deleted else changed)[entity].append(entity_id)
+
+    # One query per kind; a row deleted since the change was read is skipped
+    # (its tombstone has a later seq and comes with the next call)
+    rows = {
+        entity: (
+            db.query(model).filter(model.id.in_(changed[entity]), model.owner_id == owner_id).order_by(model.id).all()
+            if changed[entity] else []
+        )
+        for entity, model in ENTITY_MODELS.items()
+    }
+
+    return {
+        "next_since": changes[-1].seq if changes else since,
+        "has_more": has_more,
+        "reset": reset,
+        "snapshot": snapshot,
+        "rows": rows,
+        "deleted": deleted,
+    }
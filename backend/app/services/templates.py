@@ -0,0 +1,95 @@
+"""
+Recurring task templates.
+
+A confirmed task can be saved as a template (its work goals, without
+breaks). Instantiating a template bulk-copies those goals into a new task
+and runs the scheduler for the new start time, with no LLM call.
+
+Breakdown requests are first matched against the user's templates: when
+the input is nearly the same as a template's source text (Jaccard
+similarity of their words >= TEMPLATE_MATCH_THRESHOLD), the template's
+plan is used instead of asking Gemini for the same routine again.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.task import MicroGoal, Task
+from app.models.template import TaskTemplate
+from app.services.heuristic_breakdown import STOPWORDS, WORD_RE
+
+
+def template_keywords(text: str) -> List[str]:
+    """Normalized words used for near-duplicate matching (durations and punctuation ignored)"""
+    return sorted({word for word in WORD_RE.findall(text.lower()) if word not in STOPWORDS and len(word) > 2})
+
+
+def similarity(a: List[str], b: List[str]) -> float:
+    a, b = set(a), set(b)
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def create_template(db: Session, task: Task, name: Optional[str] = None) -> TaskTemplate:
+    """Save a task's work goals as a template (caller commits)"""
+    goals = (
+        db.query(MicroGoal.title, MicroGoal.description, MicroGoal.estimated_minutes)
+        .filter(MicroGoal.task_id == task.id, MicroGoal.is_break == False)
+        .order_by(MicroGoal.order)
+        .all()
+    )
+    template = TaskTemplate(
+        owner_id=task.owner_id,
+        name=name or task.user_input.strip().splitlines()[0][:200],
+        source_text=task.user_input,
+        keywords=template_keywords(task.user_input),
+        micro_goals=[
+            {"title": title, "description": description, "estimated_minutes": estimated_minutes}
+            for title, description, estimated_minutes in goals
+        ],
+        use_count=0
+    )
+    db.add(template)
+    db.flush()
+    return template
+
+
+def load_template_keywords(db: Session, owner_id: int) -> List[Tuple[int, List[str]]]:
+    """(id, keywords) of all the user's templates, to match several inputs with one query"""
+    return db.query(TaskTemplate.id, TaskTemplate.keywords).filter(TaskTemplate.owner_id == owner_id).all()
+
+
+def find_matching_template(
+    db: Session, owner_id: int, tasks_text: str, candidates: Optional[List[Tuple[int, List[str]]]] = None
+) -> Optional[Tuple[int, float]]:
+    """
+    Id and score of the user's template most similar to tasks_text, if it clears the threshold
+
+    Pass candidates from `load_template_keywords` when matching many inputs.
+    """
+    keywords = template_keywords(tasks_text)
+    if not keywords:
+        return None
+
+    best = None
+    if candidates is None:
+        candidates = load_template_keywords(db, owner_id)
+    for template_id, template_keywords_ in candidates:
+        score = similarity(keywords, template_keywords_ or [])
+        if score >= settings.TEMPLATE_MATCH_THRESHOLD and (best is None or score > best[1]):
+            best = (template_id, score)
+    return best
+
+
+def use_template(db: Session, template_id: int, owner_id: int) -> Optional[List[Dict]]:
+    """The template's micro-goals for scheduling, recording the use (caller commits)"""
+    template = db.query(TaskTemplate).filter(TaskTemplate.id == template_id, TaskTemplate.owner_id == owner_id).first()
+    if template is None:
+        return None
+
+    template.use_count = (template.use_count or 0) + 1
+    template.last_used_at = datetime.utcnow()
+    return [dict(goal) for goal in template.micro_goals]
@@ -0,0 +1,380 @@
+"""
+Write-behind store for live timer state.
+
+The timer UI sends a heartbeat (PATCH /micro-goals/{id}/time) every second
+while a goal runs, and each one used to load, update and commit the goal
+row. The live state (`is_active`, `is_paused`, `time_spent_seconds`, start
+and end times) only has to be durable at checkpoints, so it is kept here:
+
+- timer endpoints read and change a goal's state in memory; heartbeats
+  don't touch the database at all
+- start/pause/resume/complete still insert their ExecutionEvent right
+  away. The events are the durable log of every transition.
+- dirty goals are written every TIMER_FLUSH_INTERVAL_SECONDS in one
+  transaction (an executemany UPDATE plus one task version bump), on
+  complete (together with its event) and on shutdown
+- each flush also records the newest event it covers (TimerCheckpoint);
+  at startup `recover` replays each user's latest later event onto the
+  goal rows, which repairs the active/paused flags and time spent after a
+  crash, then loads the active goals back in
+
+A crash loses at most one interval of heartbeats. Heartbeats carry the
+absolute time spent, so the next one from a running client restores it.
+Endpoints that read timer state from the rows (task list and task,
+progress, sync) first write the user's dirty timers with `flush_owner`.
+With TIMER_FLUSH_INTERVAL_SECONDS=0 every change is written through
+immediately.
+
+The store is per process, so the API must run as a single worker: a second
+process would serve and write its own copy of the same timers. The process
+holds a lease on the checkpoint row (renewed by `timer_flush_loop`, released
+on shutdown); another process that finds it held waits for it to expire
+and refuses to start if it is still being renewed.
+"""
+import asyncio
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import bindparam, func, or_, select, update
+from sqlalchemy.orm import Session, selectinload
+
+from app.core.cache import mark_tasks_changed
+from app.core.config import settings
+from app.core.database import session_scope
+from app.models.task import ExecutionEvent, MicroGoal, Task
+from app.models.timer import TimerCheckpoint
+from app.schemas.task import MicroGoalSchema
+
+# MicroGoal columns owned by the store while a goal is live
+STATE_FIELDS = ("completed", "is_active", "is_paused", "actual_start_time", "actual_end_time", "time_spent_seconds")
+
+
+class LiveTimer:
+    """A micro-goal as served by the timer endpoints, and whether it still has to be written"""
+
+    def __init__(self, owner_id: int, task_id: int, goal: MicroGoalSchema):
+        self.owner_id = owner_id
+        self.task_id = task_id
+        self.goal = goal
+        self.dirty = False
+
+
+class TimerStore:
+    def __init__(self):
+        self._timers: Dict[int, LiveTimer] = {}
+        self._by_owner: Dict[int, set] = {}
+        self._lock = threading.Lock()  # run_retention flushes from its worker thread
+        self._flush_lock = threading.Lock()  # One write at a time, so the checkpoint never runs ahead of the rows
+        self._last_event_id = 0  # Newest event whose transition is applied in memory
+        self._checkpoint_id = 0  # Newest event reflected in the rows
+        self.instance_id = uuid.uuid4().hex  # Lease holder id written to the checkpoint row
+
+    def __len__(self) -> int:
+        return len(self._timers)
+
+    def get(self, goal_id: int, owner_id: int) -> Optional[LiveTimer]:
+        timer = self._timers.get(goal_id)
+        return timer if timer is not None and timer.owner_id == owner_id else None
+
+    def track(self, goal: MicroGoal) -> LiveTimer:
+        """Start serving a goal loaded from the database (its events are loaded for the snapshot)"""
+        timer = LiveTimer(goal.owner_id, goal.task_id, MicroGoalSchema.model_validate(goal))
+        with self._lock:
+            self._timers[goal.id] = timer
+            self._by_owner.setdefault(goal.owner_id, set()).add(goal.id)
+        return timer
+
+    def active(self, owner_id: int) -> List[LiveTimer]:
+        """The user's running or paused timers"""
+        with self._lock:
+            goal_ids = self._by_owner.get(owner_id, ())
+            return [self._timers[goal_id] for goal_id in goal_ids if self._timers[goal_id].goal.is_active]
+
+    def record_event(self, event_id: int):
+        """A transition's event was committed and its state applied here"""
+        with self._lock:
+            self._last_event_id = max(self._last_event_id, event_id)
+
+    def mark_dirty(self, *timers: LiveTimer):
+        for timer in timers:
+            timer.dirty = True
+        if settings.TIMER_FLUSH_INTERVAL_SECONDS <= 0:
+            self.flush()
+
+    def forget(self, goal_id: int):
+        with self._lock:
+            timer = self._timers.pop(goal_id, None)
+            if timer is not None:
+                self._discard_owner_index(timer.owner_id, goal_id)
+
+    def forget_task(self, task_id: int):
+        """Drop a task's goals (they are being deleted or replaced); unwritten state is discarded"""
+        with self._lock:
+            for goal_id in [goal_id for goal_id, timer in self._timers.items() if timer.task_id == task_id]:
+                self._discard_owner_index(self._timers.pop(goal_id).owner_id, goal_id)
+
+    def _discard_owner_index(self, owner_id: int, goal_id: int):
+        goal_ids = self._by_owner.get(owner_id)
+        if goal_ids is not None:
+            goal_ids.discard(goal_id)
+            if not goal_ids:
+                del self._by_owner[owner_id]
+
+    @staticmethod
+    def write(db: Session, timers: Iterable[LiveTimer]):
+        """Write the timers' state with one executemany and bump their tasks' versions (caller commits)"""
+        timers = list(timers)
+        if not timers:
+            return
+        db.execute(
+            update(MicroGoal.__table__).where(MicroGoal.__table__.c.id == bindparam("goal_id")),
+            [dict({field: getattr(timer.goal, field) for field in STATE_FIELDS}, goal_id=timer.goal.id) for timer in timers]
+        )
+        task_ids_by_owner: Dict[int, set] = {}
+        for timer in timers:
+            task_ids_by_owner.setdefault(timer.owner_id, set()).add(timer.task_id)
+        all_task_ids = set().union(*task_ids_by_owner.values())
+        db.query(Task).filter(Task.id.in_(all_task_ids)).update(
+            {Task.version: Task.version + 1}, synchronize_session=False
+        )
+        for owner_id, task_ids in task_ids_by_owner.items():
+            mark_tasks_changed(db, owner_id, task_ids)
+
+    @staticmethod
+    def _save_checkpoint(db: Session, event_id: int):
+        """Upsert the checkpoint row (a database created by run_retention.py has none yet)"""
+        updated = db.query(TimerCheckpoint).filter(TimerCheckpoint.id == 1).update(
+            {TimerCheckpoint.event_id: event_id, TimerCheckpoint.updated_at: datetime.utcnow()},
+            synchronize_session=False
+        )
+        if not updated:
+            db.add(TimerCheckpoint(id=1, event_id=event_id))
+
+    def flush(self) -> int:
+        """Write every dirty timer in one transaction and drop the inactive ones; returns how many were written"""
+        with self._flush_lock:
+            with self._lock:
+                timers = [timer for timer in self._timers.values() if timer.dirty]
+                for timer in timers:
+                    timer.dirty = False
+                event_id = self._last_event_id
+                checkpoint_id = self._checkpoint_id
+
+            if timers or event_id > checkpoint_id:
+                try:
+                    with session_scope() as db:
+                        self.write(db, timers)
+                        self._save_checkpoint(db, event_id)
+                except Exception as e:
+                    for timer in timers:
+                        timer.dirty = True
+                    print(f"ERROR flushing {len(timers)} timers: {type(e).__name__}: {str(e)}")
+                    return 0
+                with self._lock:
+                    self._checkpoint_id = max(self._checkpoint_id, event_id)
+
+        # Stopped goals only stay until their last state is written
+        with self._lock:
+            for goal_id in [goal_id for goal_id, timer in self._timers.items() if not timer.dirty and not timer.goal.is_active]:
+                self._discard_owner_index(self._timers.pop(goal_id).owner_id, goal_id)
+        return len(timers)
+
+    def flush_owner(self, owner_id: int) -> int:
+        """
+        Write one user's dirty timers before a read that takes timer state
+        from the rows; no database work when nothing is dirty
+        """
+        with self._lock:
+            if not any(self._timers[goal_id].dirty for goal_id in self._by_owner.get(owner_id, ())):
+                return 0
+
+        with self._flush_lock:
+            with self._lock:
+                timers = [self._timers[goal_id] for goal_id in self._by_owner.get(owner_id, ()) if self._timers[goal_id].dirty]
+                for timer in timers:
+                    timer.dirty = False
+            if not timers:
+                return 0
+            try:
+                with session_scope() as db:
+                    self.write(db, timers)
+            except Exception as e:
+                for timer in timers:
+                    timer.dirty = True
+                print(f"ERROR flushing {len(timers)} timers of user {owner_id}: {type(e).__name__}: {str(e)}")
+                return 0
+        return len(timers)
+
+    @staticmethod
+    def ensure_checkpoint():
+        """Create the checkpoint row if missing (rows written before the store existed: nothing to replay)"""
+        with session_scope() as db:
+            if db.get(TimerCheckpoint, 1) is None:
+                newest_event_id = db.query(func.max(ExecutionEvent.id)).scalar() or 0
+                db.add(TimerCheckpoint(id=1, event_id=newest_event_id))
+
+    def try_acquire_lease(self) -> bool:
+        """Take the lease if it is free, ours or expired"""
+        lease = timedelta(seconds=settings.TIMER_LEASE_SECONDS)
+        with session_scope() as db:
+            now = datetime.utcnow()
+            claimed = db.query(TimerCheckpoint).filter(
+                TimerCheckpoint.id == 1,
+                or_(
+                    TimerCheckpoint.instance_id.is_(None),
+                    TimerCheckpoint.instance_id == self.instance_id,
+                    TimerCheckpoint.heartbeat_at.is_(None),
+                    TimerCheckpoint.heartbeat_at < now - lease,
+                )
+            ).update(
+                {TimerCheckpoint.instance_id: self.instance_id, TimerCheckpoint.heartbeat_at: now},
+                synchronize_session=False
+            )
+        return bool(claimed)
+
+    async def start(self):
+        """
+        Take the lease on the live timers, waiting for one left by a stopped
+        process to expire, then recover. Database work runs off the event loop.
+
+        Raises:
+            RuntimeError: another API process keeps renewing the lease (more than one worker)
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.ensure_checkpoint)
+
+        deadline = time.monotonic() + 2 * settings.TIMER_LEASE_SECONDS
+        waiting = False
+        while not await loop.run_in_executor(None, self.try_acquire_lease):
+            if time.monotonic() >= deadline:
+                raise RuntimeError(
+                    "Another API process holds the live timer lease. Live timers are kept in "
+                    "memory, so run the API as a single worker."
+                )
+            if not waiting:
+                print(f"WARNING: Live timers are leased by another process, waiting up to {2 * settings.TIMER_LEASE_SECONDS:.0f}s")
+                waiting = True
+            await asyncio.sleep(1.0)
+
+        await loop.run_in_executor(None, self.recover)
+
+    def renew_lease(self):
+        with session_scope() as db:
+            renewed = db.query(TimerCheckpoint).filter(
+                TimerCheckpoint.id == 1, TimerCheckpoint.instance_id == self.instance_id
+            ).update({TimerCheckpoint.heartbeat_at: datetime.utcnow()}, synchronize_session=False)
+        if not renewed:
+            print("ERROR: Lost the live timer lease to another process; run the API as a single worker")
+
+    def release_lease(self):
+        with session_scope() as db:
+            db.query(TimerCheckpoint).filter(
+                TimerCheckpoint.id == 1, TimerCheckpoint.instance_id == self.instance_id
+            ).update({TimerCheckpoint.instance_id: None, TimerCheckpoint.heartbeat_at: None}, synchronize_session=False)
+
+    def recover(self):
+        """
+        Replay each user's latest execution event after the checkpoint onto
+        the goal rows, then load the active goals
+
+        After a crash the rows can be behind the events, which were written
+        right away: the goal of the latest start/resume/pause is the user's
+        active one (paused after a pause, started at its first start event)
+        with at least the time recorded in the event, and every other goal
+        of theirs is inactive. Called by `start` once the lease is held.
+        """
+        self.ensure_checkpoint()
+        with session_scope() as db:
+            newest_event_id = db.query(func.max(ExecutionEvent.id)).scalar() or 0
+            checkpoint = db.get(TimerCheckpoint, 1)
+
+            latest_ids = (
+                select(func.max(ExecutionEvent.id))
+                .where(ExecutionEvent.id > checkpoint.event_id)
+                .group_by(ExecutionEvent.owner_id)
+            )
+            latest = db.query(ExecutionEvent).filter(ExecutionEvent.id.in_(latest_ids)).all()
+
+            active_by_owner: Dict[int, List[MicroGoal]] = {}
+            for goal in db.query(MicroGoal).filter(MicroGoal.is_active == True):
+                active_by_owner.setdefault(goal.owner_id, []).append(goal)
+
+            changed: Dict[int, set] = {}
+            for event in latest:
+                running_id = event.micro_goal_id if event.action in ("start", "resume", "pause") else None
+                for goal in active_by_owner.get(event.owner_id, []):
+                    if goal.id != running_id:
+                        goal.is_active = False
+                        changed.setdefault(goal.owner_id, set()).add(goal.task_id)
+                if running_id is None:
+                    continue
+
+                goal = db.get(MicroGoal, running_id)
+                if goal is None or goal.completed:
+                    continue
+                paused = event.action == "pause"
+                if (
+                    not goal.is_active
+                    or bool(goal.is_paused) != paused
+                    or (goal.time_spent_seconds or 0) < event.time_spent_at_event
+                    or goal.actual_start_time is None
+                ):
+                    goal.is_active = True
+                    goal.is_paused = paused
+                    goal.time_spent_seconds = max(goal.time_spent_seconds or 0, event.time_spent_at_event)
+                    if goal.actual_start_time is None:
+                        goal.actual_start_time = db.query(func.min(ExecutionEvent.timestamp)).filter(
+                            ExecutionEvent.micro_goal_id == goal.id, ExecutionEvent.action == "start"
+                        ).scalar() or event.timestamp
+                    changed.setdefault(goal.owner_id, set()).add(goal.task_id)
+
+            if changed:
+                print(f"WARNING: Recovered timer state of {sum(map(len, changed.values()))} tasks from execution events")
+                all_task_ids = set().union(*changed.values())
+                db.query(Task).filter(Task.id.in_(all_task_ids)).update(
+                    {Task.version: Task.version + 1}, synchronize_session=False
+                )
+                for owner_id, task_ids in changed.items():
+                    mark_tasks_changed(db, owner_id, task_ids)
+
+            checkpoint.event_id = newest_event_id
+            checkpoint.updated_at = datetime.utcnow()
+            db.flush()  # The session doesn't autoflush; the query below has to see the recovered goals
+            with self._lock:
+                self._last_event_id = self._checkpoint_id = newest_event_id
+
+            active = (
+                db.query(MicroGoal)
+                .options(selectinload(MicroGoal.execution_events))
+                .filter(MicroGoal.is_active == True)
+                .all()
+            )
+            for goal in active:
+                self.track(goal)
+
+
+async def timer_flush_loop():
+    """Write dirty timers every TIMER_FLUSH_INTERVAL_SECONDS and keep renewing the lease, off the event loop"""
+    loop = asyncio.get_running_loop()
+    interval = settings.TIMER_FLUSH_INTERVAL_SECONDS
+    renew_every = settings.TIMER_LEASE_SECONDS / 3
+    tick = min(interval, renew_every) if interval > 0 else renew_every
+    next_flush = next_renewal = time.monotonic()
+    while True:
+        await asyncio.sleep(tick)
+        now = time.monotonic()
+        try:
+            if interval > 0 and now >= next_flush + interval:
+                await loop.run_in_executor(None, timer_store.flush)
+                next_flush = now
+            if now >= next_renewal + renew_every:
+                await loop.run_in_executor(None, timer_store.renew_lease)
+                next_renewal = now
+        except Exception as e:
+            print(f"ERROR in timer flush: {type(e).__name__}: {str(e)}")
+
+
+timer_store = TimerStore()
@@ -0,0 +1,80 @@
+"""
+Benchmark calendar placement for a heavily booked user.
+
+Builds a random calendar of busy intervals (overlapping ones included) over
+the horizon and places a long list of micro-goals into it with
+`place_on_calendar`, then checks that nothing placed overlaps busy time or
+another placed item.
+
+Usage:
+    python benchmarks/calendar_benchmark.py [goals] [busy_intervals] [days]
+"""
+import os
+import random
+import sys
+import time
+from datetime import datetime, time as dt_time, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.calendar import IntervalIndex, place_on_calendar
+
+
+def build_busy(count: int, days: int, start: datetime, generator: random.Random):
+    return [
+        (begin, begin + timedelta(minutes=generator.randrange(5, 30, 5)))
+        for begin in (
+            start + timedelta(days=generator.randrange(days), minutes=generator.randrange(0, 24 * 60, 5))
+            for _ in range(count)
+        )
+    ]
+
+
+def check(schedule, busy: IntervalIndex) -> int:
+    """Number of placed rows; raises if any of them overlaps busy time or the previous row"""
+    previous_end = None
+    placed = 0
+    for row in schedule:
+        if row["scheduled_date"] is None:
+            continue
+        begin = datetime.combine(row["scheduled_date"], row["starting_time"])
+        end = datetime.combine(row["scheduled_date"], row["end_time"])
+        if not busy.is_free(begin, end) or (previous_end is not None and begin < previous_end):
+            raise AssertionError(f"{row['title']} at {begin} overlaps")
+        previous_end = end
+        placed += 1
+    return placed
+
+
+def main():
+    goal_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    busy_count = int(sys.argv[2]) if len(sys.argv) > 2 else 5600
+    days = int(sys.argv[3]) if len(sys.argv) > 3 else 28
+
+    generator = random.Random(42)
+    start = datetime(2024, 1, 1)
+    intervals = build_busy(busy_count, days, start, generator)
+    goals = [
+        {"title": f"Micro-goal {index}", "estimated_minutes": generator.choice((5, 10, 15, 25, 45))}
+        for index in range(goal_count)
+    ]
+    print(f"{goal_count} goals, {busy_count} busy intervals, {days} days\n")
+
+    best_index = best_place = float("inf")
+    for _ in range(5):
+        began = time.perf_counter()
+        busy = IntervalIndex(intervals)
+        indexed = time.perf_counter()
+        schedule = place_on_calendar(goals, busy, start.replace(hour=9), dt_time(18, 0), days)
+        best_index = min(best_index, indexed - began)
+        best_place = min(best_place, time.perf_counter() - indexed)
+
+    placed = check(schedule, busy)
+    work = sum(1 for row in schedule if not row["is_break"] and row["scheduled_date"] is not None)
+    print(f"{'IntervalIndex (best of 5)':<30} {best_index * 1000:8.1f} ms  {len(busy)} merged intervals")
+    print(f"{'place_on_calendar (best of 5)':<30} {best_place * 1000:8.1f} ms  {placed} rows placed")
+    print(f"\n{work} goals scheduled, {goal_count - work} left unscheduled, no overlaps")
+
+
+if __name__ == "__main__":
+    main()
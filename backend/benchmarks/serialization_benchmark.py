@@ -0,0 +1,116 @@
+"""
+Benchmark serialization and compression of large task lists.
+
+Builds TaskResponse payloads for a history-heavy user and compares the JSON
+encoders we can use for responses, plus the bytes on the wire with gzip and
+(if installed) brotli.
+
+Usage:
+    python benchmarks/serialization_benchmark.py [tasks] [goals_per_task] [events_per_goal]
+"""
+import gzip
+import json
+import os
+import sys
+import time
+from datetime import datetime, time as dt_time, timedelta
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.schemas.task import ExecutionEventSchema, MicroGoalSchema, TaskResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def build_tasks(task_count: int, goals_per_task: int, events_per_goal: int) -> List[TaskResponse]:
+    now = datetime(2024, 1, 1, 9, 0)
+    tasks = []
+    for task_index in range(task_count):
+        goals = []
+        for goal_index in range(goals_per_task):
+            events = [
+                ExecutionEventSchema(
+                    id=goal_index * events_per_goal + event_index,
+                    action=("start", "pause", "resume", "complete")[event_index % 4],
+                    timestamp=now + timedelta(minutes=event_index),
+                    time_spent_at_event=event_index * 60,
+                )
+                for event_index in range(events_per_goal)
+            ]
+            goals.append(MicroGoalSchema(
+                id=task_index * goals_per_task + goal_index,
+                title=f"Micro-goal {goal_index} of task {task_index}",
+                description="Outline the report structure so drafting goes quickly",
+                estimated_minutes=15,
+                order=goal_index,
+                completed=True,
+                starting_time=dt_time(9, 0),
+                end_time=dt_time(9, 15),
+                actual_start_time=now,
+                actual_end_time=now + timedelta(minutes=17),
+                time_spent_seconds=1020,
+                execution_history=[{"action": e.action, "timestamp": e.timestamp.isoformat()} for e in events],
+                execution_events=events,
+            ))
+        tasks.append(TaskResponse(
+            id=task_index,
+            user_input="Write report, respond to emails, prepare presentation",
+            created_at=now,
+            confirmed=True,
+            starting_time=dt_time(9, 0),
+            micro_goals=goals,
+        ))
+    return tasks
+
+
+def timed(label: str, func, runs: int = 5) -> bytes:
+    best = float("inf")
+    result = b""
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<42} {best * 1000:8.1f} ms  {len(result) / 1024:9.1f} KiB")
+    return result
+
+
+def main():
+    task_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    goals_per_task = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+    events_per_goal = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+
+    tasks = build_tasks(task_count, goals_per_task, events_per_goal)
+    adapter = TypeAdapter(List[TaskResponse])
+    print(f"{task_count} tasks x {goals_per_task} goals x {events_per_goal} events\n")
+
+    print("Encoding (best of 5)")
+    body = timed("jsonable_encoder + json.dumps", lambda: json.dumps(jsonable_encoder(tasks)).encode())
+    if orjson is not None:
+        timed("jsonable_encoder + orjson.dumps", lambda: orjson.dumps(jsonable_encoder(tasks)))
+        timed("model_dump(mode=json) + orjson.dumps", lambda: orjson.dumps(adapter.dump_python(tasks, mode="json")))
+    timed("pydantic-core dump_json", lambda: adapter.dump_json(tasks))
+
+    print("\nCompression (best of 5)")
+    for level in (1, 5, 9):
+        timed(f"gzip level {level}", lambda: gzip.compress(body, compresslevel=level))
+    if brotli is not None:
+        for quality in (4, 5, 11):
+            timed(f"brotli quality {quality}", lambda: brotli.compress(body, quality=quality), runs=1 if quality > 9 else 5)
+    else:
+        print("brotli not installed, skipping")
+
+
+if __name__ == "__main__":
+    main()
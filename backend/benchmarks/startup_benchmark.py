@@ -0,0 +1,52 @@
+"""
+Benchmark cold-start time of the backend.
+
+Each run imports the application in a fresh interpreter (like a new uvicorn
+worker would) and reports how long the import took.
+
+Usage:
+    python benchmarks/startup_benchmark.py [runs]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Run from the backend directory so `app` is importable
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = {
+    "app.main": "import app.main",
+    "app.models": "import app.models",
+    "app.services.llm_service": "import app.services.llm_service",
+}
+
+
+def time_import(statement: str) -> float:
+    """Return wall-clock seconds for a fresh interpreter to run the import"""
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-c", statement],
+        cwd=BACKEND_DIR,
+        check=True,
+    )
+    return time.perf_counter() - start
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+
+    # Baseline: bare interpreter startup, subtracted from the results below
+    baseline = statistics.median(time_import("pass") for _ in range(runs))
+    print(f"Interpreter baseline: {baseline * 1000:.1f} ms (median of {runs})")
+
+    for name, statement in TARGETS.items():
+        samples = [time_import(statement) for _ in range(runs)]
+        median = statistics.median(samples) - baseline
+        worst = max(samples) - baseline
+        print(f"{name:<28} median {median * 1000:7.1f} ms   max {worst * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
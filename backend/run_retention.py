@@ -0,0 +1,29 @@
+"""
+Script to run one retention pass - compacts old execution events, archives old
+tasks to RETENTION_ARCHIVE_DATABASE_URL and runs ANALYZE. With --vacuum (or
+RETENTION_VACUUM=true) a SQLite database is also VACUUMed when rows were
+removed; that locks it until done, so run it while the API is quiet.
+"""
+import os
+import sys
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+from app.core.database import init_db
+from app.services.retention import run_retention
+from app.services.search import init_search_index
+from app.services.sync import init_sync_log
+
+if __name__ == "__main__":
+    # Same schema setup as the API's startup, so the search and sync triggers exist
+    init_db()
+    init_search_index()
+    init_sync_log()
+    print(f"Compacting events older than {settings.RETENTION_EVENT_DAYS} days, "
+          f"archiving tasks older than {settings.RETENTION_TASK_DAYS} days...")
+    stats = run_retention(vacuum=settings.RETENTION_VACUUM or "--vacuum" in sys.argv[1:])
+    print("Retention complete!")
+    for name, count in stats.items():
+        print(f"  - {name}: {count}")
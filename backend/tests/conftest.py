@@ -0,0 +1,115 @@
+"""
+Shared fixtures. The app reads its settings on import, so the environment
+(a throwaway database, no background work that would race the assertions
+or add to the query counts) is set up here before any app module is imported.
+
+Also the query budget plugin: `query_counter` counts the SQL statements and
+rows of each request, `--query-budget-scales` picks the dataset sizes for
+tests/test_query_budgets.py, and the measurements are printed as a table
+at the end of the run.
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_workdir = tempfile.mkdtemp(prefix="tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_workdir, 'tasks.db')}"
+os.environ["RETENTION_ARCHIVE_DATABASE_URL"] = f"sqlite:///{os.path.join(_workdir, 'archive.db')}"
+os.environ["CACHE_BACKEND"] = "none"
+os.environ["RETENTION_ENABLED"] = "false"
+os.environ["ADMISSION_ENABLED"] = "false"  # The breakdown rate limit would reject repeated requests
+os.environ["JOB_WORKERS"] = "0"  # Queued jobs stay queued
+os.environ["DRAFT_DEBOUNCE_MS"] = "0"
+os.environ["DRAFT_RESULT_TTL_SECONDS"] = "0"  # Every draft does its template lookup
+os.environ["TIMER_FLUSH_INTERVAL_SECONDS"] = "3600"  # No background timer flushes
+os.environ["TIMER_LEASE_SECONDS"] = "86400"  # or lease renewals during a request
+os.environ["LLM_PROVIDERS"] = "fake"
+os.environ.setdefault("GEMINI_API_KEY", "test")
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+DEFAULT_QUERY_BUDGET_SCALES = "10,1000,100000"
+
+# (method, route path) -> (QueryBudget or None, {scale: (statements, rows)}), for the summary table
+_query_budget_report = {}
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--query-budget-scales",
+        default=DEFAULT_QUERY_BUDGET_SCALES,
+        help="Micro-goal counts to seed for the query budget tests, e.g. 10,1000",
+    )
+
+
+class QueryCounter:
+    """SQL statements executed and rows fetched since the last reset"""
+
+    def __init__(self):
+        self.statements = 0
+        self.rows = 0
+
+    def reset(self):
+        self.statements = 0
+        self.rows = 0
+
+    def count_statement(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements += 1
+
+    def count_rows(self, dbapi_connection, connection_record):
+        # sqlite3 calls row_factory once per fetched row
+        def row_factory(cursor, row):
+            self.rows += 1
+            return row
+        dbapi_connection.row_factory = row_factory
+
+
+@pytest.fixture(scope="session")
+def client():
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+    shutil.rmtree(_workdir, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def query_counter():
+    from app.core.database import engine
+
+    counter = QueryCounter()
+    event.listen(engine, "before_cursor_execute", counter.count_statement)
+    event.listen(engine, "connect", counter.count_rows)
+    engine.dispose()  # Reconnect so every pooled connection counts rows
+    yield counter
+    event.remove(engine, "before_cursor_execute", counter.count_statement)
+    event.remove(engine, "connect", counter.count_rows)
+    engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def query_budget_report():
+    """Where the query budget tests leave their measurements for the summary table"""
+    return _query_budget_report
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not _query_budget_report:
+        return
+    scales = sorted({scale for _, measured in _query_budget_report.values() for scale in measured})
+    header = "".join(f"{f'{scale} goals':>18}" for scale in scales)
+    terminalreporter.section("query budgets")
+    terminalreporter.write_line(f"{'endpoint':<56}{'budget':>12}{header}")
+    for key in sorted(_query_budget_report, key=lambda item: (item[1], item[0])):
+        budget, measured = _query_budget_report[key]
+        budget_text = f"{budget.statements}q/{budget.rows if budget.rows is not None else '-'}r" if budget else "none"
+        cells = "".join(
+            f"{f'{measured[scale][0]}q/{measured[scale][1]}r' if scale in measured else 'not run':>18}"
+            for scale in scales
+        )
+        terminalreporter.write_line(f"{f'{key[0]} {key[1]}':<56}{budget_text:>12}{cells}")
@@ -0,0 +1,139 @@
+"""Admission control: lane isolation, load shedding with Retry-After and the per-user LLM rate limits"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import admission as admission_module
+from app.core.admission import AdmissionMiddleware, rate_limit_bucket, route_lane
+from app.core.config import settings
+
+BREAKDOWN = "/api/tasks/breakdown"
+PROGRESS = "/api/tasks/tasks/1/progress"
+TIMER = "/api/tasks/micro-goals/1/start"
+
+
+@pytest.fixture
+def admission(monkeypatch):
+    """
+    Stub API behind the middleware, one LLM slot; `started` is set once a
+    request holds it, and it keeps it until `release` is set
+    """
+    monkeypatch.setattr(admission_module, "admission_stats", {})  # Keep /health reporting the app's lanes
+    monkeypatch.setattr(settings, "ADMISSION_ENABLED", True)
+    monkeypatch.setattr(settings, "ADMISSION_LLM_CONCURRENCY", 1)
+    monkeypatch.setattr(settings, "ADMISSION_LLM_QUEUE_DEPTH", 0)
+    monkeypatch.setattr(settings, "ADMISSION_QUEUE_TIMEOUT_SECONDS", 10.0)
+    monkeypatch.setattr(settings, "ADMISSION_LLM_RATE_PER_MINUTE", 60.0)
+    monkeypatch.setattr(settings, "ADMISSION_LLM_BURST", 100)
+    started = threading.Event()
+    release = threading.Event()
+
+    def build():
+        app = FastAPI()
+
+        @app.post(BREAKDOWN)
+        async def slow_breakdown():
+            started.set()
+            while not release.is_set():
+                await asyncio.sleep(0.01)
+            return {"ok": True}
+
+        @app.get(PROGRESS)
+        async def progress():
+            return {"ok": True}
+
+        @app.post(TIMER)
+        async def start():
+            return {"ok": True}
+
+        app.add_middleware(AdmissionMiddleware)
+        return TestClient(app)
+
+    yield build, started, release
+    release.set()
+
+
+def _while_llm_slot_is_held(admission, request):
+    """Run request() while a breakdown holds the only LLM slot"""
+    build, started, release = admission
+    client = build()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        holder = executor.submit(client.post, BREAKDOWN)
+        assert started.wait(10), "the first request never got the slot"
+        response = request(client)
+        release.set()
+        assert holder.result(timeout=10).status_code == 200
+    return response
+
+
+def test_full_queue_is_shed_with_retry_after(admission):
+    response = _while_llm_slot_is_held(admission, lambda client: client.post(BREAKDOWN))
+
+    assert response.status_code == 503
+    assert "queue full" in response.json()["detail"]
+    assert int(response.headers["retry-after"]) >= 1
+
+
+def test_queue_timeout_is_shed_with_retry_after(admission, monkeypatch):
+    monkeypatch.setattr(settings, "ADMISSION_LLM_QUEUE_DEPTH", 1)
+    monkeypatch.setattr(settings, "ADMISSION_QUEUE_TIMEOUT_SECONDS", 0.05)
+
+    response = _while_llm_slot_is_held(admission, lambda client: client.get(PROGRESS))
+
+    assert response.status_code == 503
+    assert "queue timeout" in response.json()["detail"]
+    assert int(response.headers["retry-after"]) >= 1
+
+
+def test_other_lanes_are_served_while_the_llm_lane_is_full(admission):
+    response = _while_llm_slot_is_held(admission, lambda client: client.post(TIMER))
+
+    assert response.status_code == 200
+
+
+def test_breakdowns_are_rate_limited_per_user(admission, monkeypatch):
+    monkeypatch.setattr(settings, "ADMISSION_LLM_BURST", 2)
+    build, _, release = admission
+    release.set()
+    client = build()
+
+    statuses = [client.post(BREAKDOWN).status_code for _ in range(3)]
+    limited = client.post(BREAKDOWN)
+
+    assert statuses == [200, 200, 429]
+    assert limited.status_code == 429
+    assert int(limited.headers["retry-after"]) >= 1
+    # Another user has their own bucket
+    assert client.post(BREAKDOWN, headers={"Authorization": "Bearer other"}).status_code == 200
+
+
+def test_progress_is_rate_limited_in_its_own_bucket(admission, monkeypatch):
+    monkeypatch.setattr(settings, "ADMISSION_LLM_BURST", 1)
+    build, _, release = admission
+    release.set()
+    client = build()
+
+    assert client.post(BREAKDOWN).status_code == 200
+    assert client.post(BREAKDOWN).status_code == 429
+    assert client.get(PROGRESS).status_code == 200
+    assert client.get(PROGRESS).status_code == 429
+    assert client.post(TIMER).status_code == 200
+
+
+@pytest.mark.parametrize("method, path, lane, bucket", [
+    ("POST", "/api/tasks/micro-goals/3/pause", "timer", None),
+    ("POST", "/api/tasks/breakdown", "llm", "breakdown"),
+    ("POST", "/api/tasks/breakdown/batch", "llm", "breakdown"),
+    ("POST", "/api/tasks/breakdown/drafts", "llm", None),
+    ("GET", "/api/tasks/tasks/3/progress", "llm", "progress"),
+    ("GET", "/api/tasks/3", "default", None),
+    ("GET", "/api/tasks/jobs/abc", None, None),
+    ("GET", "/health", None, None),
+])
+def test_routing(method, path, lane, bucket):
+    assert route_lane(method, path) == lane
+    assert rate_limit_bucket(method, path) == bucket
@@ -0,0 +1,80 @@
+"""/breakdown must not hold a pooled database connection while the LLM runs"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.core.database import engine
+from app.services.llm_service import llm_service
+
+PLAN = [
+    {"title": "Outline the report", "description": "Sections first", "estimated_minutes": 15},
+    {"title": "Write the introduction", "description": "One page", "estimated_minutes": 20},
+]
+
+
+@pytest.fixture
+def slow_llm(monkeypatch):
+    """
+    LLM stub that blocks until released; `started` is set once a request
+    is waiting on it
+    """
+    started = threading.Event()
+    release = threading.Event()
+
+    async def wait_for_release():
+        started.set()
+        while not release.is_set():
+            await asyncio.sleep(0.01)
+
+    async def breakdown_tasks(tasks_text):
+        await wait_for_release()
+        return [dict(goal) for goal in PLAN], "stub"
+
+    async def breakdown_tasks_batch(items):
+        await wait_for_release()
+        return {item["id"]: ([dict(goal) for goal in PLAN], "stub") for item in items}
+
+    monkeypatch.setattr(llm_service, "breakdown_tasks", breakdown_tasks)
+    monkeypatch.setattr(llm_service, "breakdown_tasks_batch", breakdown_tasks_batch)
+    yield started, release
+    release.set()
+
+
+def _checked_out_while_waiting(client, slow_llm, path, body):
+    """Send the request, read the pool while the LLM stub is waiting, then let it finish"""
+    started, release = slow_llm
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(client.post, path, json=body)
+        assert started.wait(10), "the request never reached the LLM"
+        checked_out = engine.pool.checkedout()
+        release.set()
+        response = future.result(timeout=10)
+    return checked_out, response
+
+
+def test_breakdown_releases_connections_while_llm_runs(client, slow_llm):
+    checked_out, response = _checked_out_while_waiting(
+        client, slow_llm, "/api/tasks/breakdown",
+        {"tasks_text": "write the quarterly report", "use_templates": False},
+    )
+
+    assert checked_out == 0
+    assert response.status_code == 200
+    assert response.json()["source"] == "llm"
+    assert [goal["title"] for goal in response.json()["micro_goals"] if not goal["is_break"]] == [
+        goal["title"] for goal in PLAN
+    ]
+
+
+def test_batch_breakdown_releases_connections_while_llm_runs(client, slow_llm):
+    checked_out, response = _checked_out_while_waiting(
+        client, slow_llm, "/api/tasks/breakdown/batch",
+        {"items": [{"id": "a", "tasks_text": "write the report"}, {"id": "b", "tasks_text": "plan the week"}]},
+    )
+
+    assert checked_out == 0
+    assert response.status_code == 200
+    assert [result["id"] for result in response.json()["results"]] == ["a", "b"]
+    assert all(result["task_id"] is not None for result in response.json()["results"])
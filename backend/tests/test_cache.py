@@ -0,0 +1,80 @@
+"""Response cache: LRU expiry and eviction, and invalidation only once a session commits"""
+import pytest
+
+from app.core import cache as cache_module
+from app.core.cache import Cache, LRUCache, mark_tasks_changed, progress_key, task_key, task_list_key
+from app.core.database import SessionLocal
+
+OWNER_ID = 7
+OTHER_OWNER_ID = 8
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    """A live LRU cache in place of the disabled one, filled for two owners"""
+    lru = LRUCache(max_entries=100)
+    monkeypatch.setattr(cache_module, "cache", lru)
+    for key in (
+        task_key(1), progress_key(1), task_key(2), progress_key(2),
+        task_list_key(OWNER_ID, False), task_list_key(OWNER_ID, True), task_list_key(OTHER_OWNER_ID, False),
+    ):
+        lru.set(key, "cached")
+    return lru
+
+
+def test_cache_backends_must_implement_the_interface():
+    with pytest.raises(TypeError):
+        Cache()
+
+
+def test_lru_evicts_the_least_recently_used():
+    lru = LRUCache(max_entries=2)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    lru.get("a")
+    lru.set("c", 3)
+
+    assert lru.get("a") == 1
+    assert lru.get("b") is None
+    assert lru.get("c") == 3
+
+
+def test_lru_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    lru = LRUCache(ttl=10)
+    lru.set("a", 1)
+
+    now[0] += 9
+    assert lru.get("a") == 1
+    now[0] += 2
+    assert lru.get("a") is None
+
+
+def test_commit_evicts_the_owners_lists_and_the_tasks_entries(cache):
+    db = SessionLocal()
+    try:
+        mark_tasks_changed(db, OWNER_ID, [1])
+        assert cache.get(task_key(1)) == "cached"  # Nothing is dropped before the commit
+
+        db.commit()
+    finally:
+        db.close()
+
+    for key in (task_key(1), progress_key(1), task_list_key(OWNER_ID, False), task_list_key(OWNER_ID, True)):
+        assert cache.get(key) is None
+    for key in (task_key(2), progress_key(2), task_list_key(OTHER_OWNER_ID, False)):
+        assert cache.get(key) == "cached"
+
+
+def test_rollback_leaves_the_cache_untouched(cache):
+    db = SessionLocal()
+    try:
+        mark_tasks_changed(db, OWNER_ID, [1])
+        db.rollback()
+        db.commit()  # A later commit on the same session doesn't carry the discarded invalidations
+    finally:
+        db.close()
+
+    for key in (task_key(1), progress_key(1), task_list_key(OWNER_ID, False), task_list_key(OWNER_ID, True)):
+        assert cache.get(key) == "cached"
@@ -0,0 +1,142 @@
+"""Calendar scheduling: the busy-interval index and first-fit placement across days"""
+import random
+from datetime import datetime, time, timedelta
+
+import pytest
+
+from app.core.config import settings
+from app.services.calendar import IntervalIndex, place_on_calendar
+
+
+def at(hour: int, minute: int = 0, day: int = 1) -> datetime:
+    return datetime(2024, 1, day, hour, minute)
+
+
+def goals(*minutes: int) -> list:
+    return [{"title": f"g{index}", "estimated_minutes": m} for index, m in enumerate(minutes)]
+
+
+def rows(schedule: list) -> list:
+    return [
+        (row["title"], row["scheduled_date"] and row["scheduled_date"].day, row["starting_time"], row["end_time"])
+        for row in schedule
+    ]
+
+
+@pytest.fixture(autouse=True)
+def working_day(monkeypatch):
+    monkeypatch.setattr(settings, "SCHEDULE_DAY_START", time(9, 0))
+    monkeypatch.setattr(settings, "SCHEDULE_DAY_END", time(18, 0))
+
+
+def test_overlapping_and_touching_intervals_are_merged():
+    index = IntervalIndex([
+        (at(13), at(14)),
+        (at(9), at(10)),
+        (at(9, 30), at(9, 45)),  # Inside the first
+        (at(10), at(11)),  # Touches it
+        (at(15), at(15)),  # Empty
+    ])
+
+    assert len(index) == 2
+    assert list(zip(index.starts, index.ends)) == [(at(9), at(11)), (at(13), at(14))]
+
+
+def test_overlap_queries():
+    index = IntervalIndex([(at(9), at(10)), (at(13), at(14))])
+
+    assert index.overlapping(at(9, 30), at(13, 30)) == [(at(9), at(10)), (at(13), at(14))]
+    assert index.overlapping(at(10), at(13)) == []
+    assert index.is_free(at(10), at(13))
+    assert not index.is_free(at(12), at(13, 1))
+
+
+def test_free_slots_are_the_gaps_within_the_window():
+    index = IntervalIndex([(at(8), at(9, 30)), (at(11), at(12)), (at(17), at(19))])
+
+    assert list(index.free_slots(at(9), at(18))) == [(at(9, 30), at(11)), (at(12), at(17))]
+    assert list(index.free_slots(at(11, 30), at(11, 45))) == []
+    assert list(IntervalIndex().free_slots(at(9), at(10))) == [(at(9), at(10))]
+
+
+def test_goals_go_around_busy_time():
+    busy = IntervalIndex([(at(9, 30), at(11))])
+
+    schedule = place_on_calendar(goals(20, 20), busy, at(9), time(12), 1)
+
+    assert rows(schedule) == [("g0", 1, time(9, 0), time(9, 20)), ("g1", 1, time(11, 0), time(11, 20))]
+    assert not any(row["exceeds_end_time"] for row in schedule)
+
+
+def test_goal_that_fits_nowhere_does_not_use_up_the_day():
+    schedule = place_on_calendar(goals(600, 30), IntervalIndex(), at(9), time(12), 1)
+
+    assert rows(schedule) == [("g0", None, None, None), ("g1", 1, time(9, 0), time(9, 30))]
+    assert schedule[0]["exceeds_end_time"]
+    assert not schedule[1]["exceeds_end_time"]
+
+
+def test_goals_roll_over_to_the_next_working_day():
+    busy = IntervalIndex([(at(9, day=2), at(10, day=2))])
+
+    schedule = place_on_calendar(goals(20, 20, 20), busy, at(11, 30), time(12), 3)
+
+    assert rows(schedule) == [
+        ("g0", 1, time(11, 30), time(11, 50)),
+        ("g1", 2, time(10, 0), time(10, 20)),
+        ("g2", 2, time(10, 20), time(10, 40)),
+    ]
+    assert [row["exceeds_end_time"] for row in schedule] == [False, True, True]
+
+
+def test_breaks_follow_each_pomodoro():
+    schedule = place_on_calendar(goals(25, 25, 25, 25), IntervalIndex(), at(9), time(18), 1)
+
+    assert [(row["title"], row["starting_time"]) for row in schedule] == [
+        ("g0", time(9, 0)),
+        ("Short Break", time(9, 25)),
+        ("g1", time(9, 30)),
+        ("Short Break", time(9, 55)),
+        ("g2", time(10, 0)),
+        ("Long Break", time(10, 25)),
+        ("g3", time(10, 40)),
+    ]
+    assert [row["order"] for row in schedule] == list(range(7))
+
+
+def test_break_is_dropped_when_the_next_goal_moves_to_another_day():
+    schedule = place_on_calendar(goals(25, 20), IntervalIndex(), at(11, 30), time(12), 2)
+
+    # The break fits 11:55-12:00 but g1 doesn't, so the night is the break
+    assert rows(schedule) == [("g0", 1, time(11, 30), time(11, 55)), ("g1", 2, time(9, 0), time(9, 20))]
+
+
+def test_break_that_only_fits_the_next_day_gives_its_time_back():
+    schedule = place_on_calendar(goals(30, 20), IntervalIndex(), at(11, 28), time(12), 2)
+
+    assert rows(schedule) == [("g0", 1, time(11, 28), time(11, 58)), ("g1", 2, time(9, 0), time(9, 20))]
+
+
+def test_large_schedule_never_overlaps_busy_time():
+    generator = random.Random(7)
+    busy_intervals = []
+    for day in range(1, 8):
+        for _ in range(6):
+            start = at(8, day=day) + timedelta(minutes=generator.randrange(0, 600, 5))
+            busy_intervals.append((start, start + timedelta(minutes=generator.randrange(5, 120, 5))))
+    busy = IntervalIndex(busy_intervals)
+    micro_goals = goals(*(generator.choice((10, 15, 25, 45, 90)) for _ in range(200)))
+
+    schedule = place_on_calendar(micro_goals, busy, at(9), time(18), 7)
+
+    placed = [
+        (datetime.combine(row["scheduled_date"], row["starting_time"]), datetime.combine(row["scheduled_date"], row["end_time"]))
+        for row in schedule if row["scheduled_date"] is not None
+    ]
+    assert placed
+    assert [row["title"] for row in schedule if not row["is_break"]] == [goal["title"] for goal in micro_goals]
+    for (start, end), (next_start, _) in zip(placed, placed[1:]):
+        assert start < end <= next_start
+    for start, end in placed:
+        assert busy.is_free(start, end)
+        assert time(9) <= start.time() and end.time() <= time(18)
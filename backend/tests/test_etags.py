@@ -0,0 +1,91 @@
+"""Conditional GETs of tasks (ETag / If-None-Match), task list pages and ids that are never handed out twice"""
+from app.core.auth import create_user
+
+
+def _new_task(client, headers=None) -> dict:
+    plan = client.post(
+        "/api/tasks/breakdown", json={"tasks_text": "answer emails, plan the week", "use_templates": False}, headers=headers
+    ).json()
+    return client.post(
+        "/api/tasks/confirm", json={"task_id": plan["task_id"], "micro_goals": plan["micro_goals"]}, headers=headers
+    ).json()
+
+
+def test_unchanged_task_is_not_modified(client):
+    task = _new_task(client)
+    first = client.get(f"/api/tasks/{task['id']}")
+
+    again = client.get(f"/api/tasks/{task['id']}", headers={"If-None-Match": first.headers["etag"]})
+
+    assert first.status_code == 200
+    assert again.status_code == 304
+    assert again.headers["etag"] == first.headers["etag"]
+    assert again.content == b""
+
+
+def test_changed_task_gets_a_new_etag(client):
+    task = _new_task(client)
+    etag = client.get(f"/api/tasks/{task['id']}").headers["etag"]
+    client.post("/api/tasks/confirm", json={"task_id": task["id"], "micro_goals": task["micro_goals"][:1]})
+
+    response = client.get(f"/api/tasks/{task['id']}", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert len(response.json()["micro_goals"]) == 1
+
+
+def test_unchanged_task_list_is_not_modified(client):
+    _new_task(client)
+    etag = client.get("/api/tasks/").headers["etag"]
+
+    assert client.get("/api/tasks/", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/api/tasks/", headers={"If-None-Match": f'"other", {etag}'}).status_code == 304
+    assert client.get("/api/tasks/", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_replacing_the_newest_task_changes_the_list_etag(client):
+    deleted = _new_task(client)
+    etag = client.get("/api/tasks/").headers["etag"]
+    client.delete(f"/api/tasks/{deleted['id']}")
+
+    created = _new_task(client)
+    response = client.get("/api/tasks/", headers={"If-None-Match": etag})
+
+    # Same count and versions: only a fresh id tells the lists apart
+    assert created["id"] > deleted["id"]
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_task_list_pages_follow_the_before_cursor(client):
+    _, token = create_user("pages")
+    user = {"Authorization": f"Bearer {token}"}
+    ids = [_new_task(client, user)["id"] for _ in range(5)]
+
+    first = client.get("/api/tasks/", params={"limit": 2}, headers=user).json()
+    second = client.get("/api/tasks/", params={"limit": 2, "before": first[-1]["id"]}, headers=user).json()
+    last = client.get("/api/tasks/", params={"limit": 2, "before": second[-1]["id"]}, headers=user).json()
+
+    assert [task["id"] for task in first + second + last] == ids[::-1]
+    assert len(last) == 1
+    assert len(client.get("/api/tasks/", headers=user).json()) == 5
+
+
+def test_older_pages_keep_their_etag_when_tasks_are_added(client):
+    _, token = create_user("page etags")
+    user = {"Authorization": f"Bearer {token}"}
+    ids = [_new_task(client, user)["id"] for _ in range(4)]
+    older = {"limit": 2, "before": ids[2]}
+    first_etag = client.get("/api/tasks/", params={"limit": 2}, headers=user).headers["etag"]
+    older_etag = client.get("/api/tasks/", params=older, headers=user).headers["etag"]
+
+    _new_task(client, user)
+
+    assert client.get("/api/tasks/", params={"limit": 2}, headers={**user, "If-None-Match": first_etag}).status_code == 200
+    assert client.get("/api/tasks/", params=older, headers={**user, "If-None-Match": older_etag}).status_code == 304
+    # A task leaving the page changes it
+    client.delete(f"/api/tasks/{ids[1]}", headers=user)
+    response = client.get("/api/tasks/", params=older, headers={**user, "If-None-Match": older_etag})
+    assert response.status_code == 200
+    assert [task["id"] for task in response.json()] == [ids[0]]
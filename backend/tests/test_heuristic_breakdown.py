@@ -0,0 +1,57 @@
+"""Offline breakdown: clause splitting, duration estimates and splitting timed items into parts"""
+from app.services.heuristic_breakdown import MAX_CHUNK_MINUTES, heuristic_breakdown
+
+
+def _plan(text: str, priors=None) -> list:
+    return [(goal["title"], goal["estimated_minutes"]) for goal in heuristic_breakdown(text, priors)]
+
+
+def test_commas_and_then_split_in_one_pass():
+    assert _plan("write report 1h, answer emails and then gym") == [
+        ("Write report (part 1/3)", 20),
+        ("Write report (part 2/3)", 20),
+        ("Write report (part 3/3)", 20),
+        ("Answer emails", 10),
+        ("Gym", 45),
+    ]
+
+
+def test_explicit_duration_applies_only_to_its_clause():
+    assert _plan("Call the bank. Review slides 10 min; then plan the week") == [
+        ("Call the bank", 15),
+        ("Review slides", 10),
+        ("Plan the week", 10),
+    ]
+
+
+def test_lines_and_bullets_are_separate_items():
+    assert [title for title, _ in _plan("- emails\n2) standup\n[ ] deploy the fix\n\n")] == [
+        "Emails", "Standup", "Deploy the fix",
+    ]
+
+
+def test_commas_inside_numbers_do_not_split():
+    assert [title for title, _ in _plan("read 1,000 words, then tidy")] == ["Read 1,000 words", "Tidy"]
+
+
+def test_keyword_estimate_is_not_split_into_parts():
+    goals = _plan("gym")
+
+    assert goals == [("Gym", 45)]
+    assert goals[0][1] > MAX_CHUNK_MINUTES
+
+
+def test_explicit_duration_is_split_into_even_parts():
+    assert [minutes for _, minutes in _plan("study for the exam (50 minutes)")] == [17, 17, 16]
+
+
+def test_user_history_beats_keyword_rules():
+    assert _plan("write blog post", priors={"blog": 12}) == [("Write blog post", 12)]
+
+
+def test_unknown_work_gets_the_default_and_short_durations_the_minimum():
+    assert _plan("sort stuff, water plants 2 min") == [("Sort stuff", 15), ("Water plants", 5)]
+
+
+def test_goals_are_numbered_in_order():
+    assert [goal["order"] for goal in heuristic_breakdown("emails 45m, gym")] == [0, 1, 2, 3]
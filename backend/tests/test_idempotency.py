@@ -0,0 +1,73 @@
+"""Idempotency-Key replay, conflicts and the lease on running requests"""
+import hashlib
+import uuid
+from datetime import datetime, timedelta
+
+from app.core.database import session_scope
+from app.models.idempotency import IdempotencyRecord
+
+PATH = "/api/tasks/busy-blocks"
+ANONYMOUS_SCOPE = hashlib.sha256(b"").hexdigest()[:16]  # No Authorization header
+
+
+def _block(title: str, hour: int = 9) -> dict:
+    return {"title": title, "start_at": f"2026-01-05T{hour:02d}:00:00", "end_at": f"2026-01-05T{hour:02d}:15:00"}
+
+
+def _record(key: str):
+    with session_scope() as db:
+        record = db.query(IdempotencyRecord).filter(IdempotencyRecord.key == f"POST {PATH} {ANONYMOUS_SCOPE} {key}").one()
+        db.expunge(record)
+        return record
+
+
+def _still_running(key: str, lease_left: timedelta):
+    """Turn a finished request's record back into one still running (or whose process died)"""
+    with session_scope() as db:
+        db.query(IdempotencyRecord).filter(IdempotencyRecord.key == f"POST {PATH} {ANONYMOUS_SCOPE} {key}").update(
+            {IdempotencyRecord.status: "in_progress", IdempotencyRecord.expires_at: datetime.utcnow() + lease_left},
+            synchronize_session=False
+        )
+
+
+def test_retry_replays_the_stored_response(client):
+    headers = {"Idempotency-Key": uuid.uuid4().hex}
+    first = client.post(PATH, json=_block("Standup"), headers=headers)
+    retry = client.post(PATH, json=_block("Standup"), headers=headers)
+
+    assert first.status_code == 201
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.json() == first.json()
+
+
+def test_same_key_with_a_different_body_is_rejected(client):
+    headers = {"Idempotency-Key": uuid.uuid4().hex}
+    client.post(PATH, json=_block("Standup", 10), headers=headers)
+    response = client.post(PATH, json=_block("Review", 10), headers=headers)
+
+    assert response.status_code == 422
+
+
+def test_retry_while_the_lease_is_held_gets_409(client):
+    key = uuid.uuid4().hex
+    client.post(PATH, json=_block("Standup", 11), headers={"Idempotency-Key": key})
+    _still_running(key, timedelta(seconds=60))
+    response = client.post(PATH, json=_block("Standup", 11), headers={"Idempotency-Key": key})
+
+    assert response.status_code == 409
+    assert response.headers["retry-after"] == "1"
+
+
+def test_retry_after_the_lease_expired_runs_again(client):
+    key = uuid.uuid4().hex
+    first = client.post(PATH, json=_block("Standup", 12), headers={"Idempotency-Key": key})
+    _still_running(key, timedelta(seconds=-1))
+    response = client.post(PATH, json=_block("Standup", 12), headers={"Idempotency-Key": key})
+
+    assert response.status_code == 201
+    assert "idempotent-replayed" not in response.headers
+    assert response.json()["id"] != first.json()["id"]
+    record = _record(key)
+    assert record.status == "completed"
+    # Completed responses are kept for the full TTL, not the lease
+    assert record.expires_at > datetime.utcnow() + timedelta(hours=1)
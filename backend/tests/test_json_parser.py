@@ -0,0 +1,72 @@
+"""Tolerant JSON extraction from LLM output"""
+import pytest
+
+from app.services.json_parser import extract_list, parse_llm_json
+
+GOALS = [{"title": "Outline", "estimated_minutes": 10}, {"title": "Draft", "estimated_minutes": 20}]
+
+
+def test_plain_json():
+    assert parse_llm_json('[{"title": "Outline", "estimated_minutes": 10}, {"title": "Draft", "estimated_minutes": 20}]') == GOALS
+
+
+@pytest.mark.parametrize("content", [
+    '```json\n[{"title": "Outline", "estimated_minutes": 10}, {"title": "Draft", "estimated_minutes": 20}]\n```',
+    '```\n[{"title": "Outline", "estimated_minutes": 10}, {"title": "Draft", "estimated_minutes": 20}]\n```\n',
+])
+def test_code_fences_are_stripped(content):
+    assert parse_llm_json(content) == GOALS
+
+
+def test_prose_before_and_after_the_payload_is_ignored():
+    content = (
+        'Here is your plan:\n[{"title": "Outline", "estimated_minutes": 10}, '
+        '{"title": "Draft", "estimated_minutes": 20}]\nGood luck [and] have fun!'
+    )
+
+    assert parse_llm_json(content) == GOALS
+
+
+def test_truncated_array_keeps_the_complete_elements():
+    content = '[{"title": "Outline", "estimated_minutes": 10}, {"title": "Draft", "estimated_minutes": 20}, {"title": "Rev'
+
+    assert parse_llm_json(content) == GOALS
+
+
+def test_truncated_wrapped_array_is_closed():
+    content = '{"micro_goals": [{"title": "Outline", "estimated_minutes": 10}, {"title": "Draft", "estimated_minutes": 20}, {"ti'
+
+    assert parse_llm_json(content) == {"micro_goals": GOALS}
+
+
+def test_truncated_string_array_keeps_complete_strings():
+    assert parse_llm_json('{"tips": ["Start small.", "Take a bre') == {"tips": ["Start small."]}
+
+
+def test_brackets_and_quotes_inside_strings_do_not_confuse_recovery():
+    content = '[{"title": "Fix \\"]\\" bug [urgent]", "estimated_minutes": 15}, {"title": "Ne'
+
+    assert parse_llm_json(content) == [{"title": 'Fix "]" bug [urgent]', "estimated_minutes": 15}]
+
+
+@pytest.mark.parametrize("content", [
+    "",
+    "Sorry, I can't help with that.",
+    '[{"title": "Outl',
+    "```json\n```",
+])
+def test_unrecoverable_content_raises_value_error(content):
+    with pytest.raises(ValueError):
+        parse_llm_json(content)
+
+
+@pytest.mark.parametrize("result, expected", [
+    (GOALS, GOALS),
+    ({"micro_goals": GOALS}, GOALS),
+    ({"tips": ["a", "b"]}, ["a", "b"]),
+    ({"plan": GOALS}, GOALS),
+    ({"error": "quota"}, []),
+    ("text", []),
+])
+def test_extract_list(result, expected):
+    assert extract_list(result) == expected
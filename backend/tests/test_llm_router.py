@@ -0,0 +1,132 @@
+"""Provider routing: latency ordering, failover, the fallback-only backend and error classification"""
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.services import llm_providers
+from app.services.llm_providers import LLMProvider, LLMResult, ProviderRouter, TooManyRequests
+from app.services.resilience import LLMUnavailableError, is_retryable
+
+
+class StubProvider(LLMProvider):
+    """Answers with its own name, or raises `error`"""
+
+    def __init__(self, name: str, error: Exception = None, fallback_only: bool = False):
+        self.name = name
+        self.error = error
+        self.fallback_only = fallback_only
+        self.calls = 0
+
+    async def generate(self, kind, prompt, generation_config, response_schema, inputs) -> LLMResult:
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return LLMResult(text="[]", finish_reason="stop", provider=self.name)
+
+
+@pytest.fixture(autouse=True)
+def router_settings(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_ROUTER_EXPLORE_RATE", 0.0)
+    monkeypatch.setattr(settings, "LLM_MAX_RETRIES", 0)
+    monkeypatch.setattr(settings, "LLM_RETRY_BASE_DELAY_SECONDS", 0.0)
+    monkeypatch.setattr(settings, "HEURISTIC_FALLBACK_ENABLED", True)
+
+
+def _router(monkeypatch, *providers: StubProvider) -> ProviderRouter:
+    for provider in providers:
+        monkeypatch.setitem(llm_providers.PROVIDERS, provider.name, lambda provider=provider: provider)
+    return ProviderRouter([provider.name for provider in providers], [])
+
+
+def _generate(router: ProviderRouter) -> LLMResult:
+    return asyncio.run(router.generate("breakdown", "prompt", {}))
+
+
+def test_provider_must_implement_generate():
+    with pytest.raises(TypeError):
+        LLMProvider()
+
+
+def test_fastest_backend_goes_first_and_unmeasured_ones_before_it(monkeypatch):
+    router = _router(monkeypatch, StubProvider("slow"), StubProvider("fast"), StubProvider("new"))
+    for name, seconds in (("slow", 2.0), ("fast", 0.5)):
+        for _ in range(3):
+            router.backends[name].caller("breakdown").latency.record(seconds)
+
+    assert [backend.name for backend in router.candidates("breakdown")] == ["new", "fast", "slow"]
+    # Latencies are per kind: nothing is measured for tips yet, so the configured order stands
+    assert [backend.name for backend in router.candidates("tips")] == ["slow", "fast", "new"]
+
+
+def test_unavailable_backend_fails_over_to_the_next(monkeypatch):
+    down = StubProvider("down", error=TooManyRequests("quota"))
+    up = StubProvider("up")
+    router = _router(monkeypatch, down, up)
+
+    assert _generate(router).provider == "up"
+    assert down.calls == 1
+    assert list(router.backends["down"].outcomes) == [False]
+    assert list(router.backends["up"].outcomes) == [True]
+
+
+def test_non_retryable_error_is_raised_without_failover(monkeypatch):
+    broken = StubProvider("broken", error=ValueError("blocked prompt"))
+    up = StubProvider("up")
+    router = _router(monkeypatch, broken, up)
+
+    with pytest.raises(ValueError):
+        _generate(router)
+    assert up.calls == 0
+
+
+def test_every_backend_unavailable_raises(monkeypatch):
+    router = _router(monkeypatch, StubProvider("a", error=TooManyRequests()), StubProvider("b", error=TooManyRequests()))
+
+    with pytest.raises(LLMUnavailableError):
+        _generate(router)
+
+
+def test_fallback_only_backend_is_tried_last(monkeypatch):
+    fallback = StubProvider("offline", fallback_only=True)
+    router = _router(monkeypatch, fallback, StubProvider("model"))
+
+    assert [backend.name for backend in router.candidates("breakdown")] == ["model", "offline"]
+    assert _generate(router).provider == "model"
+    assert fallback.calls == 0
+
+
+def test_fallback_only_backend_answers_when_the_others_are_down(monkeypatch):
+    fallback = StubProvider("offline", fallback_only=True)
+    router = _router(monkeypatch, StubProvider("model", error=TooManyRequests()), fallback)
+
+    assert _generate(router).provider == "offline"
+
+
+def test_fallback_only_backend_is_skipped_when_the_fallback_is_disabled(monkeypatch):
+    monkeypatch.setattr(settings, "HEURISTIC_FALLBACK_ENABLED", False)
+    fallback = StubProvider("offline", fallback_only=True)
+    router = _router(monkeypatch, StubProvider("model", error=TooManyRequests()), fallback)
+
+    assert [backend.name for backend in router.candidates("breakdown")] == ["model"]
+    with pytest.raises(LLMUnavailableError):
+        _generate(router)
+    assert fallback.calls == 0
+
+
+@pytest.mark.parametrize("error, retryable", [
+    (httpx.ConnectTimeout("connect"), True),
+    (httpx.PoolTimeout("pool"), True),
+    (httpx.ReadError("reset"), True),
+    (httpx.RemoteProtocolError("disconnected"), True),
+    (TooManyRequests("429"), True),
+    (asyncio.TimeoutError(), True),
+    (httpx.HTTPStatusError(
+        "400", request=httpx.Request("POST", "http://llm"), response=httpx.Response(400)
+    ), False),
+    (httpx.InvalidURL("bad"), False),
+    (ValueError("bad json"), False),
+])
+def test_is_retryable(error, retryable):
+    assert is_retryable(error) is retryable
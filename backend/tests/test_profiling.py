@@ -0,0 +1,109 @@
+"""On-demand profiling: samples of spawned tasks, phase timings and the serializer hook"""
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+from typing import List
+
+import pytest
+from fastapi import FastAPI, routing
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from app.core import profiling
+from app.core.config import settings
+from app.core.database import session_scope
+from app.models.profile import RequestProfile
+
+TOKEN = "profile-secret"
+
+
+class Item(BaseModel):
+    name: str
+
+
+def _busy_child_work(seconds: float) -> int:
+    deadline = time.perf_counter() + seconds
+    spins = 0
+    while time.perf_counter() < deadline:
+        spins += 1
+    return spins
+
+
+async def spawned_llm_call():
+    return _busy_child_work(0.2)
+
+
+@pytest.fixture
+def profiled_client(client, monkeypatch):
+    """A small app with profiling installed (the shared client only sets up the database)"""
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", TOKEN)
+    monkeypatch.setattr(settings, "PROFILING_SAMPLE_INTERVAL_MS", 1.0)
+    app = FastAPI()
+
+    @app.get("/items", response_model=List[Item])
+    async def items():
+        # Like cancel_on_disconnect: the work runs in a task of its own
+        await asyncio.ensure_future(spawned_llm_call())
+        return [Item(name="a"), Item(name="b")]
+
+    profiling.add_profiling(app)
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def _stored(profile_id: str) -> RequestProfile:
+    """The saved profile; it's written after the response has gone out"""
+    deadline = time.monotonic() + 10
+    while True:
+        with session_scope() as db:
+            profile = db.get(RequestProfile, profile_id)
+            if profile is not None:
+                db.expunge(profile)
+                return profile
+        assert time.monotonic() < deadline, "the profile was never stored"
+        time.sleep(0.01)
+
+
+def test_request_without_the_token_is_not_profiled(profiled_client):
+    response = profiled_client.get("/items")
+
+    assert response.status_code == 200
+    assert "x-profile-id" not in response.headers
+
+
+def test_spawned_task_is_sampled(profiled_client):
+    response = profiled_client.get("/items", headers={"X-Profile-Token": TOKEN})
+
+    profile = _stored(response.headers["x-profile-id"])
+    document = json.loads(profile.speedscope)
+    names = [frame["name"] for frame in document["shared"]["frames"]]
+    assert profile.status_code == 200
+    assert profile.sample_count > 0
+    assert "spawned_llm_call" in names
+    assert "_busy_child_work" in names
+
+
+def test_serialization_is_timed_once_per_request(profiled_client):
+    response = profiled_client.get(f"/items?profile={TOKEN}")
+
+    profile = _stored(response.headers["x-profile-id"])
+    assert response.json() == [{"name": "a"}, {"name": "b"}]
+    assert profile.phases["serialization"]["count"] == 1
+
+
+def test_serializer_hook_is_inert_outside_profiled_requests(profiled_client):
+    # Patched module-wide, so it must behave like the original for everyone else, and only be wrapped once
+    patched = routing.serialize_response
+    profiling._install_phase_hooks()
+    assert routing.serialize_response is patched
+    assert patched.__name__ == "timed_serialize_response"
+    assert profiled_client.get("/items").json() == [{"name": "a"}, {"name": "b"}]
+
+
+def test_frames_without_co_qualname_use_co_name():
+    recorder = profiling.ProfileRecorder("GET", "/", None, 0)
+    frame = SimpleNamespace(f_code=SimpleNamespace(co_name="handler", co_filename="app.py", co_firstlineno=3))
+
+    assert recorder._frame_index(frame) == 0
+    assert list(recorder.frames) == [("handler", "app.py", 3)]
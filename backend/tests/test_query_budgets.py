@@ -0,0 +1,205 @@
+"""
+Query budgets for every endpoint in app/api/tasks.py and app/api/sync.py.
+
+Seeds datasets of increasing size (10, 1k and 100k micro-goals; pick others
+with --query-budget-scales), replays each endpoint against them and counts
+the SQL statements executed and rows fetched per request. Each endpoint
+declares its budget with `@query_budget(...)`; a request over it fails,
+e.g. because an N+1 lazy load crept back into a serializer.
+
+The LLM is stubbed out and the response cache disabled (see conftest.py),
+so only the database work of each request is measured.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert, select
+
+from app.api import sync, tasks
+from app.core.auth import init_default_user
+from app.core.database import Base, engine, init_db
+from app.models.sync import SyncState
+from app.models.task import ExecutionEvent, MicroGoal, Task
+from app.services.llm_service import llm_service
+from app.services.search import init_search_index
+from app.services.sync import init_sync_log
+
+GOALS_PER_TASK = 10
+EVENTS_PER_GOAL = 2
+SEED_CHUNK = 5000
+ROUTERS = [("/api/tasks", tasks.router), ("/api/sync", sync.router)]
+PLAN = [
+    {"title": "Outline quarterly report", "description": "Sections and owners", "estimated_minutes": 15},
+    {"title": "Answer emails", "description": "Inbox to zero", "estimated_minutes": 10},
+]
+
+
+def endpoint_budgets():
+    budgets = {}
+    for prefix, router in ROUTERS:
+        for route in router.routes:
+            for method in route.methods:
+                budgets[(method, prefix + route.path)] = getattr(route.endpoint, "query_budget", None)
+    return budgets
+
+
+BUDGETS = endpoint_budgets()
+
+
+def pytest_generate_tests(metafunc):
+    if "scale" in metafunc.fixturenames:
+        scales = [int(value) for value in metafunc.config.getoption("--query-budget-scales").split(",")]
+        metafunc.parametrize("scale", scales, scope="module", ids=lambda scale: f"{scale} goals")
+
+
+@pytest.fixture(scope="module")
+def stub_llm():
+    async def breakdown_tasks(tasks_text):
+        return [dict(goal) for goal in PLAN], "stub"
+
+    async def breakdown_tasks_batch(items):
+        return {item["id"]: ([dict(goal) for goal in PLAN], "stub") for item in items}
+
+    async def generate_progress_tips(progress_data):
+        return ["Keep going"]
+
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(llm_service, "breakdown_tasks", breakdown_tasks)
+        patch.setattr(llm_service, "breakdown_tasks_batch", breakdown_tasks_batch)
+        patch.setattr(llm_service, "generate_progress_tips", generate_progress_tips)
+        yield
+
+
+def seed(goal_count: int) -> int:
+    """
+    Fresh database with goal_count micro-goals for the default user, plus one
+    unconfirmed task without goals for /confirm and DELETE; returns the user id
+    """
+    Base.metadata.drop_all(bind=engine)
+    init_db()
+    owner_id = init_default_user()
+    init_search_index()
+    init_sync_log()
+
+    task_count = max(1, goal_count // GOALS_PER_TASK)
+    start = datetime(2024, 1, 1, 9, 0)
+    with engine.begin() as conn:
+        for first in range(0, task_count, SEED_CHUNK):
+            conn.execute(insert(Task), [
+                {
+                    "id": task_id + 1, "owner_id": owner_id, "user_input": f"Day {task_id}: quarterly report, emails",
+                    "confirmed": True, "version": 1, "created_at": start + timedelta(days=task_id)
+                }
+                for task_id in range(first, min(first + SEED_CHUNK, task_count))
+            ])
+        conn.execute(insert(Task), [{
+            "id": task_count + 1, "owner_id": owner_id, "user_input": "Spare: quarterly report",
+            "confirmed": False, "version": 1, "created_at": start
+        }])
+        for first in range(0, goal_count, SEED_CHUNK):
+            conn.execute(insert(MicroGoal), [
+                {
+                    "id": goal_id + 1, "owner_id": owner_id, "task_id": goal_id // GOALS_PER_TASK + 1,
+                    "title": f"Goal {goal_id} report", "description": "Seeded", "estimated_minutes": 15,
+                    "order": goal_id % GOALS_PER_TASK, "completed": False, "is_break": False,
+                    "time_spent_seconds": 0, "created_at": start
+                }
+                for goal_id in range(first, min(first + SEED_CHUNK, goal_count))
+            ])
+            conn.execute(insert(ExecutionEvent), [
+                {
+                    "owner_id": owner_id, "micro_goal_id": goal_id + 1, "action": action,
+                    "timestamp": start, "time_spent_at_event": 0
+                }
+                for goal_id in range(first, min(first + SEED_CHUNK, goal_count))
+                for action in ("start", "pause")[:EVENTS_PER_GOAL]
+            ])
+    return owner_id
+
+
+def cases(task_id: int, goal_id: int, spare_task_id: int):
+    """(method, full route path, url, json body) for every endpoint, in an order that keeps the timer valid"""
+    confirm_goals = [
+        {"title": f"Goal {index}", "estimated_minutes": 15, "order": index} for index in range(GOALS_PER_TASK)
+    ]
+    return [
+        ("POST", "/api/tasks/busy-blocks", "/api/tasks/busy-blocks",
+         {"title": "Standup", "start_at": "2024-01-02T10:00:00", "end_at": "2024-01-02T10:30:00"}),
+        ("GET", "/api/tasks/busy-blocks", "/api/tasks/busy-blocks?start=2024-01-01T00:00:00", None),
+        ("POST", "/api/tasks/breakdown/drafts", "/api/tasks/breakdown/drafts",
+         {"session_id": "benchmark", "tasks_text": "Quarterly report, emails", "starting_time": "09:00:00"}),
+        ("POST", "/api/tasks/breakdown", "/api/tasks/breakdown", {
+            "tasks_text": "Quarterly report and emails", "use_templates": False,
+            "schedule_mode": "calendar", "starting_date": "2024-01-02", "starting_time": "09:00:00"
+        }),
+        ("POST", "/api/tasks/breakdown/jobs", "/api/tasks/breakdown/jobs", {"tasks_text": "Quarterly report"}),
+        ("GET", "/api/tasks/jobs/{job_id}", "/api/tasks/jobs/{job_id}", None),
+        ("POST", "/api/tasks/breakdown/batch", "/api/tasks/breakdown/batch",
+         {"items": [{"id": str(index), "tasks_text": f"Report {index}"} for index in range(5)]}),
+        ("GET", "/api/tasks/search", "/api/tasks/search?q=quarterly+report", None),
+        ("POST", "/api/tasks/templates", "/api/tasks/templates", {"task_id": task_id}),
+        ("GET", "/api/tasks/templates", "/api/tasks/templates", None),
+        ("POST", "/api/tasks/templates/{template_id}/instantiate", "/api/tasks/templates/{template_id}/instantiate",
+         {"starting_time": "09:00:00"}),
+        ("DELETE", "/api/tasks/templates/{template_id}", "/api/tasks/templates/{template_id}", None),
+        ("POST", "/api/tasks/confirm", "/api/tasks/confirm", {
+            "task_id": spare_task_id, "micro_goals": confirm_goals,
+            "schedule_mode": "calendar", "starting_date": "2024-01-02", "starting_time": "09:00:00"
+        }),
+        ("GET", "/api/tasks/", "/api/tasks/", None),
+        ("GET", "/api/tasks/{task_id}", f"/api/tasks/{task_id}", None),
+        ("POST", "/api/tasks/micro-goals/{goal_id}/start", f"/api/tasks/micro-goals/{goal_id}/start", None),
+        ("POST", "/api/tasks/micro-goals/{goal_id}/pause", f"/api/tasks/micro-goals/{goal_id}/pause", None),
+        ("POST", "/api/tasks/micro-goals/{goal_id}/resume", f"/api/tasks/micro-goals/{goal_id}/resume", None),
+        ("PATCH", "/api/tasks/micro-goals/{goal_id}/time", f"/api/tasks/micro-goals/{goal_id}/time?time_spent_seconds=60", None),
+        ("POST", "/api/tasks/micro-goals/{goal_id}/complete", f"/api/tasks/micro-goals/{goal_id}/complete", None),
+        ("GET", "/api/tasks/micro-goals/{goal_id}/execution-summary", f"/api/tasks/micro-goals/{goal_id}/execution-summary", None),
+        ("GET", "/api/tasks/tasks/{task_id}/progress", f"/api/tasks/tasks/{task_id}/progress", None),
+        ("DELETE", "/api/tasks/busy-blocks/{block_id}", "/api/tasks/busy-blocks/{block_id}", None),
+        ("DELETE", "/api/tasks/{task_id}", f"/api/tasks/{spare_task_id}", None),
+        # Everything the requests above changed, as a client polling since before them
+        ("GET", "/api/sync/", "/api/sync/?since={sync_since}", None),
+    ]
+
+
+@pytest.fixture(scope="module")
+def measured(client, query_counter, stub_llm, scale):
+    """Seed `scale` micro-goals and replay every case: (method, route path) -> (statements, rows, status)"""
+    seed(scale)
+    task_count = max(1, scale // GOALS_PER_TASK)
+    task_id, spare_task_id = task_count, task_count + 1
+    goal_id = (task_id - 1) * GOALS_PER_TASK + 1
+
+    with engine.connect() as conn:
+        ids = {"sync_since": conn.execute(select(SyncState.last_seq)).scalar()}
+    results = {}
+    for method, route_path, url, body in cases(task_id, goal_id, spare_task_id):
+        url = url.format(**ids)
+        query_counter.reset()
+        response = client.request(method, url, json=body)
+        results[(method, route_path)] = (query_counter.statements, query_counter.rows, response.status_code)
+
+        data = response.json() if response.headers.get("content-type", "").startswith("application/json") else {}
+        if route_path == "/api/tasks/breakdown/jobs":
+            ids["job_id"] = data.get("id")
+        if route_path == "/api/tasks/busy-blocks" and method == "POST":
+            ids["block_id"] = data.get("id")
+        if route_path == "/api/tasks/templates" and method == "POST":
+            ids["template_id"] = data.get("id")
+    return results
+
+
+@pytest.mark.parametrize(
+    "endpoint", sorted(BUDGETS, key=lambda key: (key[1], key[0])), ids=lambda key: f"{key[0]} {key[1]}"
+)
+def test_endpoint_within_query_budget(measured, scale, endpoint, query_budget_report):
+    budget = BUDGETS[endpoint]
+    assert budget is not None, "no @query_budget declared"
+    assert endpoint in measured, "no case replays this endpoint"
+
+    statements, rows, status = measured[endpoint]
+    query_budget_report.setdefault(endpoint, (budget, {}))[1][scale] = (statements, rows)
+    assert status < 400, f"HTTP {status}"
+    assert statements <= budget.statements, f"{statements} statements > budget {budget.statements}"
+    if budget.rows is not None:
+        assert rows <= budget.rows, f"{rows} rows > budget {budget.rows}"
@@ -0,0 +1,174 @@
+"""ResilientCaller and CircuitBreaker: hedging, retries, breaker states and the half-open trial slot"""
+import asyncio
+
+import pytest
+
+from app.services.llm_providers import TooManyRequests
+from app.services.resilience import CircuitBreaker, LLMUnavailableError, ResilientCaller
+
+
+class Upstream:
+    """Scripted upstream: each call pops its (delay, result-or-error) from `script`, repeating the last one"""
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.calls = 0
+
+    async def __call__(self):
+        delay, outcome = self.script[min(self.calls, len(self.script) - 1)]
+        self.calls += 1
+        await asyncio.sleep(delay)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+
+def _expire(breaker: CircuitBreaker):
+    """Let the open breaker's reset timeout pass"""
+    breaker.opened_at -= breaker.reset_timeout
+
+
+def _open_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30.0)
+    breaker.record_failure()
+    breaker.record_failure()
+    return breaker
+
+
+def _hedging_caller() -> ResilientCaller:
+    caller = ResilientCaller(timeout=5.0, max_retries=0, hedge=True, hedge_min_samples=1)
+    caller.latency.record(0.2)  # Hedge after 0.2s
+    return caller
+
+
+def test_answer_before_the_hedge_delay_is_used_without_hedging():
+    upstream = Upstream((0.01, "primary"), (0.0, "hedge"))
+
+    assert asyncio.run(_hedging_caller().call(upstream)) == "primary"
+    assert upstream.calls == 1
+
+
+def test_slow_primary_is_hedged():
+    upstream = Upstream((2.0, "primary"), (0.0, "hedge"))
+
+    assert asyncio.run(_hedging_caller().call(upstream)) == "hedge"
+    assert upstream.calls == 2
+
+
+def test_transient_errors_are_retried_up_to_max_retries():
+    upstream = Upstream((0.0, TooManyRequests("429")))
+    caller = ResilientCaller(max_retries=2, base_delay=0.0, breaker=CircuitBreaker(failure_threshold=10))
+
+    with pytest.raises(LLMUnavailableError):
+        asyncio.run(caller.call(upstream))
+    assert upstream.calls == 3
+
+
+def test_retry_that_succeeds_returns_its_result():
+    upstream = Upstream((0.0, TooManyRequests("429")), (0.0, "ok"))
+    caller = ResilientCaller(max_retries=2, base_delay=0.0)
+
+    assert asyncio.run(caller.call(upstream)) == "ok"
+    assert upstream.calls == 2
+    assert caller.breaker.failures == 0
+
+
+def test_timeouts_are_retried():
+    upstream = Upstream((1.0, "late"), (0.0, "ok"))
+    caller = ResilientCaller(timeout=0.05, max_retries=1, base_delay=0.0)
+
+    assert asyncio.run(caller.call(upstream)) == "ok"
+
+
+def test_non_retryable_errors_are_raised_at_once():
+    upstream = Upstream((0.0, ValueError("blocked prompt")))
+    caller = ResilientCaller(max_retries=2, base_delay=0.0)
+
+    with pytest.raises(ValueError):
+        asyncio.run(caller.call(upstream))
+    assert upstream.calls == 1
+    assert caller.breaker.failures == 0
+
+
+def test_backoff_is_capped_at_max_delay(monkeypatch):
+    caller = ResilientCaller(base_delay=0.5, max_delay=8.0)
+    monkeypatch.setattr("app.services.resilience.random.uniform", lambda low, high: high)
+
+    assert [caller._backoff(attempt) for attempt in range(6)] == [0.5, 1.0, 2.0, 4.0, 8.0, 8.0]
+
+
+def test_breaker_opens_after_the_failure_threshold():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30.0)
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    with pytest.raises(LLMUnavailableError) as error:
+        breaker.before_call()
+    assert 0 < error.value.retry_after <= 30.0
+
+
+def test_breaker_lets_one_trial_through_once_reset_and_closes_on_success():
+    breaker = _open_breaker()
+    _expire(breaker)
+
+    breaker.before_call()
+    assert breaker.state == "half_open"
+    with pytest.raises(LLMUnavailableError):
+        breaker.before_call()  # Only one trial at a time
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_call()
+
+
+def test_failed_trial_opens_the_breaker_again():
+    breaker = _open_breaker()
+    _expire(breaker)
+    breaker.before_call()
+
+    breaker.record_failure()
+
+    assert breaker.state == "open"
+    assert breaker.retry_after() > 0
+
+
+def test_open_breaker_fails_fast_without_calling_upstream():
+    upstream = Upstream((0.0, "ok"))
+    caller = ResilientCaller(breaker=_open_breaker())
+
+    with pytest.raises(LLMUnavailableError):
+        asyncio.run(caller.call(upstream))
+    assert upstream.calls == 0
+
+
+def test_cancelled_trial_frees_the_trial_slot():
+    breaker = _open_breaker()
+    _expire(breaker)
+    caller = ResilientCaller(breaker=breaker)
+
+    async def cancel_during_trial():
+        task = asyncio.ensure_future(caller.call(Upstream((10.0, "ok"))))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_during_trial())
+
+    assert breaker.state == "half_open"
+    breaker.before_call()  # The next caller gets the trial
+
+
+def test_non_retryable_error_frees_the_trial_slot():
+    breaker = _open_breaker()
+    _expire(breaker)
+    caller = ResilientCaller(breaker=breaker)
+
+    with pytest.raises(ValueError):
+        asyncio.run(caller.call(Upstream((0.0, ValueError("bad request")))))
+
+    assert breaker.state == "half_open"
+    assert asyncio.run(caller.call(Upstream((0.0, "ok")))) == "ok"
+    assert breaker.state == "closed"
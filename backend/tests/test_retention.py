@@ -0,0 +1,33 @@
+"""Retention pass: finished background jobs are deleted after JOB_RETENTION_HOURS"""
+import uuid
+from datetime import datetime, timedelta
+
+from app.core.config import settings
+from app.core.database import session_scope
+from app.models.job import Job
+from app.services.retention import run_retention
+
+
+def _job(status: str, finished_hours_ago=None) -> str:
+    now = datetime.utcnow()
+    job_id = str(uuid.uuid4())
+    with session_scope() as db:
+        db.add(Job(
+            id=job_id, kind="breakdown", status=status, payload={"tasks_text": "emails"},
+            created_at=now - timedelta(hours=(finished_hours_ago or 0) + 1),
+            finished_at=now - timedelta(hours=finished_hours_ago) if finished_hours_ago is not None else None,
+        ))
+    return job_id
+
+
+def test_retention_deletes_old_finished_jobs_only():
+    old = settings.JOB_RETENTION_HOURS + 1
+    expired = [_job("succeeded", old), _job("failed", old)]
+    kept = [_job("succeeded", 1), _job("failed", 1), _job("queued"), _job("running")]
+
+    stats = run_retention()
+
+    assert stats["jobs_deleted"] == 2
+    with session_scope() as db:
+        remaining = {job_id for (job_id,) in db.query(Job.id).filter(Job.id.in_(expired + kept))}
+    assert remaining == set(kept)
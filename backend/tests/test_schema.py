@@ -0,0 +1,70 @@
+"""Schema upgrades of existing databases: rebuilding tables with AUTOINCREMENT ids"""
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, text
+
+from app.core.database import sync_schema
+
+
+def _legacy_engine(tmp_path):
+    """A database whose `things` table predates AUTOINCREMENT, with a trigger logging its inserts"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE things (id INTEGER NOT NULL PRIMARY KEY, name VARCHAR(50))"))
+        conn.execute(text("CREATE INDEX ix_things_name ON things (name)"))
+        conn.execute(text("CREATE TABLE thing_log (thing_id INTEGER)"))
+        conn.execute(text(
+            "CREATE TRIGGER things_ai AFTER INSERT ON things BEGIN "
+            "INSERT INTO thing_log (thing_id) VALUES (NEW.id); END"
+        ))
+        conn.execute(text("INSERT INTO things (id, name) VALUES (1, 'a'), (2, 'b'), (3, 'c')"))
+    return engine
+
+
+def _metadata() -> MetaData:
+    metadata = MetaData()
+    Table(
+        "things", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("name", String(50), index=True),
+        sqlite_autoincrement=True,
+    )
+    return metadata
+
+
+def test_rebuild_keeps_rows_indexes_and_triggers(tmp_path):
+    engine = _legacy_engine(tmp_path)
+
+    sync_schema(engine, _metadata())
+
+    with engine.begin() as conn:
+        ddl = conn.execute(text("SELECT sql FROM sqlite_master WHERE name = 'things'")).scalar()
+        assert "AUTOINCREMENT" in ddl.upper()
+        assert conn.execute(text("SELECT id, name FROM things ORDER BY id")).all() == [(1, "a"), (2, "b"), (3, "c")]
+        assert conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'things'")).scalars().all() == ["ix_things_name"]
+        assert conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'trigger'")).scalars().all() == ["things_ai"]
+
+        conn.execute(text("INSERT INTO things (name) VALUES ('d')"))
+        assert conn.execute(text("SELECT thing_id FROM thing_log")).scalars().all() == [1, 2, 3, 4]
+
+
+def test_rebuilt_table_does_not_reuse_deleted_ids(tmp_path):
+    engine = _legacy_engine(tmp_path)
+    sync_schema(engine, _metadata())
+
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM things WHERE id = 3"))
+        new_id = conn.execute(text("INSERT INTO things (name) VALUES ('d') RETURNING id")).scalar()
+
+    assert new_id == 4
+
+
+def test_rebuild_runs_once(tmp_path):
+    engine = _legacy_engine(tmp_path)
+    sync_schema(engine, _metadata())
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO things (name) VALUES ('d')"))
+
+    sync_schema(engine, _metadata())
+
+    with engine.begin() as conn:
+        assert conn.execute(text("SELECT thing_id FROM thing_log")).scalars().all() == [1, 2, 3, 4]
+        assert conn.execute(text("SELECT count(*) FROM things")).scalar() == 4
@@ -0,0 +1,77 @@
+"""Full-text search: results stay within the owner's rows, input is matched literally, and pages report has_more"""
+import pytest
+
+from app.core.auth import create_user
+
+
+@pytest.fixture
+def user(client):
+    _, token = create_user("search")
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _new_task(client, headers, tasks_text: str) -> dict:
+    plan = client.post("/api/tasks/breakdown", json={"tasks_text": tasks_text, "use_templates": False}, headers=headers).json()
+    return client.post(
+        "/api/tasks/confirm", json={"task_id": plan["task_id"], "micro_goals": plan["micro_goals"]}, headers=headers
+    ).json()
+
+
+def _search(client, headers, q: str, **params) -> dict:
+    response = client.get("/api/tasks/search", params={"q": q, **params}, headers=headers)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_results_are_the_owners_only(client, user):
+    task = _new_task(client, user, "answer zanzibar emails, plan the week")
+    _, token = create_user("other")
+    other = {"Authorization": f"Bearer {token}"}
+
+    results = _search(client, user, "zanzibar")["results"]
+
+    assert {(row["kind"], row["task_id"]) for row in results} == {("task", task["id"]), ("micro_goal", task["id"])}
+    assert "<mark>zanzibar</mark>" in next(row["title"] for row in results if row["kind"] == "micro_goal")
+    assert _search(client, other, "zanzibar")["results"] == []
+
+
+def test_only_the_last_word_matches_as_a_prefix(client, user):
+    _new_task(client, user, "answer zanzibar emails, plan the week")
+
+    assert len(_search(client, user, "zanz")["results"]) == 2
+    assert len(_search(client, user, "emails zanz")["results"]) == 2
+    assert _search(client, user, "zanz emails")["results"] == []
+
+
+@pytest.mark.parametrize("q", [
+    "zanzibar AND NEAR(invoices",
+    'zanzibar" OR "invoices',
+    "body: zanzibar near and invoices*",
+    "-zanzibar ^invoices",
+])
+def test_query_syntax_is_matched_as_plain_words(client, user, q):
+    task = _new_task(client, user, "zanzibar and near invoices, or the body of them")
+
+    results = _search(client, user, q)["results"]
+
+    assert {row["task_id"] for row in results} == {task["id"]}
+
+
+@pytest.mark.parametrize("q", ["***", '"', "(:)"])
+def test_query_without_words_finds_nothing(client, user, q):
+    _new_task(client, user, "answer zanzibar emails")
+
+    assert _search(client, user, q) == {"query": q, "results": [], "limit": 20, "offset": 0, "has_more": False}
+
+
+def test_pages_report_has_more(client, user):
+    task_ids = {_new_task(client, user, f"zanzibar report {day}, plan the week")["id"] for day in range(3)}
+
+    first = _search(client, user, "zanzibar", limit=4)
+    second = _search(client, user, "zanzibar", limit=4, offset=4)
+
+    assert (len(first["results"]), first["has_more"]) == (4, True)
+    assert (len(second["results"]), second["has_more"]) == (2, False)
+    found = [(row["kind"], row["task_id"]) for row in first["results"] + second["results"]]
+    assert sorted(found) == sorted((kind, task_id) for task_id in task_ids for kind in ("task", "micro_goal"))
+    assert _search(client, user, "zanzibar", limit=6)["has_more"] is False
@@ -0,0 +1,117 @@
+"""Delta sync: cursor paging, tombstones for deletes and the reset after tombstones are purged"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.auth import create_user
+from app.core.database import session_scope
+from app.models.sync import SyncChange
+from app.services.sync import purge_tombstones
+
+
+@pytest.fixture
+def user(client):
+    """Headers of a fresh user, so the feed only holds what the test writes"""
+    _, token = create_user("sync")
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _new_task(client, headers) -> dict:
+    plan = client.post(
+        "/api/tasks/breakdown", json={"tasks_text": "answer emails, plan the week", "use_templates": False}, headers=headers
+    ).json()
+    return client.post(
+        "/api/tasks/confirm", json={"task_id": plan["task_id"], "micro_goals": plan["micro_goals"]}, headers=headers
+    ).json()
+
+
+def _sync(client, headers, since=0, **params) -> dict:
+    response = client.get("/api/sync/", params={"since": since, **params}, headers=headers)
+    assert response.status_code == 200
+    return response.json()
+
+
+def _cursor(client, headers) -> int:
+    """next_since once the feed is drained"""
+    page = _sync(client, headers)
+    while page["has_more"]:
+        page = _sync(client, headers, page["next_since"], snapshot=page["snapshot"])
+    return page["next_since"]
+
+
+def test_pages_follow_the_cursor_until_drained(client, user):
+    task = _new_task(client, user)
+    goal_ids = {goal["id"] for goal in task["micro_goals"]}
+
+    pages = [_sync(client, user, limit=2)]
+    while pages[-1]["has_more"]:
+        pages.append(_sync(client, user, pages[-1]["next_since"], snapshot=True, limit=2))
+
+    assert len(pages) > 1
+    assert all(page["snapshot"] and not page["reset"] for page in pages)
+    assert all(len(page["tasks"]) + len(page["micro_goals"]) + len(page["execution_events"]) <= 2 for page in pages)
+    cursors = [page["next_since"] for page in pages]
+    assert cursors == sorted(set(cursors))
+    assert [t["id"] for page in pages for t in page["tasks"]] == [task["id"]]
+    assert {g["id"] for page in pages for g in page["micro_goals"]} == goal_ids
+    # Drained: nothing new after the last cursor
+    last = _sync(client, user, cursors[-1])
+    assert (last["tasks"], last["micro_goals"], last["has_more"]) == ([], [], False)
+    assert last["next_since"] == cursors[-1]
+
+
+def test_only_changes_after_the_cursor_are_returned(client, user):
+    first = _new_task(client, user)
+    since = _cursor(client, user)
+    second = _new_task(client, user)
+
+    page = _sync(client, user, since)
+
+    assert not page["snapshot"]
+    assert [task["id"] for task in page["tasks"]] == [second["id"]]
+    assert first["id"] not in {goal["task_id"] for goal in page["micro_goals"]}
+
+
+def test_other_users_changes_are_not_in_the_feed(client, user):
+    _new_task(client, user)
+    _, token = create_user("other")
+    other = {"Authorization": f"Bearer {token}"}
+
+    page = _sync(client, other)
+
+    assert (page["tasks"], page["micro_goals"], page["execution_events"]) == ([], [], [])
+
+
+def test_deletes_leave_tombstones(client, user):
+    task = _new_task(client, user)
+    since = _cursor(client, user)
+    client.delete(f"/api/tasks/{task['id']}", headers=user)
+
+    page = _sync(client, user, since)
+
+    assert page["tasks"] == []
+    assert page["deleted"]["tasks"] == [task["id"]]
+    assert sorted(page["deleted"]["micro_goals"]) == sorted(goal["id"] for goal in task["micro_goals"])
+
+
+def test_cursor_older_than_purged_tombstones_is_reset(client, user):
+    kept = _new_task(client, user)
+    deleted = _new_task(client, user)
+    stale = _cursor(client, user)
+    client.delete(f"/api/tasks/{deleted['id']}", headers=user)
+    fresh = _cursor(client, user)
+
+    with session_scope() as db:
+        db.query(SyncChange).filter(SyncChange.deleted == True).update(
+            {SyncChange.changed_at: datetime.utcnow() - timedelta(days=1)}, synchronize_session=False
+        )
+        assert purge_tombstones(db, datetime.utcnow()) > 0
+
+    # The delete it missed is gone from the log: start over from a snapshot instead
+    reset = _sync(client, user, stale)
+    assert reset["reset"] and reset["snapshot"]
+    assert [task["id"] for task in reset["tasks"]] == [kept["id"]]
+    assert reset["deleted"]["tasks"] == []
+    # A client that saw the delete carries on with deltas
+    current = _sync(client, user, fresh)
+    assert not current["reset"] and not current["snapshot"]
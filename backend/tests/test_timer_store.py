@@ -0,0 +1,187 @@
+"""Write-behind timer store: crash recovery, checkpoints, batched flushes and the complete write-through"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, func
+
+from app.core.database import engine, session_scope
+from app.models.task import ExecutionEvent, MicroGoal
+from app.models.timer import TimerCheckpoint
+from app.services.timer_store import TimerStore, timer_store
+
+
+def _goal_ids(client, count: int) -> list:
+    """Ids of a fresh task's first `count` non-break micro-goals"""
+    plan = client.post("/api/tasks/breakdown", json={
+        "tasks_text": "write the quarterly report, answer emails, plan the week, review the budget",
+        "use_templates": False,
+    }).json()
+    response = client.post("/api/tasks/confirm", json={"task_id": plan["task_id"], "micro_goals": plan["micro_goals"]})
+    assert response.status_code == 200
+    goal_ids = [goal["id"] for goal in response.json()["micro_goals"] if not goal["is_break"]]
+    assert len(goal_ids) >= count
+    return goal_ids[:count]
+
+
+def _row(goal_id: int) -> MicroGoal:
+    with session_scope() as db:
+        goal = db.get(MicroGoal, goal_id)
+        db.expunge(goal)
+        return goal
+
+
+def _newest_event_id() -> int:
+    with session_scope() as db:
+        return db.query(func.max(ExecutionEvent.id)).scalar()
+
+
+def _checkpoint_event_id() -> int:
+    with session_scope() as db:
+        return db.get(TimerCheckpoint, 1).event_id
+
+
+@pytest.fixture
+def micro_goal_updates():
+    """Statements that UPDATE micro_goals, with how many parameter sets each carried"""
+    updates = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("UPDATE MICRO_GOALS"):
+            updates.append(len(parameters) if executemany else 1)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield updates
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def test_recover_replays_events_after_the_checkpoint(client):
+    goal_id, = _goal_ids(client, 1)
+    TimerStore.ensure_checkpoint()  # The query budget tests recreate the tables
+    checkpoint_before = _checkpoint_event_id()
+    client.post(f"/api/tasks/micro-goals/{goal_id}/start")
+    client.patch(f"/api/tasks/micro-goals/{goal_id}/time", params={"time_spent_seconds": 90})
+    client.post(f"/api/tasks/micro-goals/{goal_id}/pause")
+
+    # Crash: the live state was never written and the checkpoint is behind the events
+    assert _row(goal_id).is_active is False
+    with session_scope() as db:
+        db.query(TimerCheckpoint).update({TimerCheckpoint.event_id: checkpoint_before}, synchronize_session=False)
+        start_time = db.query(func.min(ExecutionEvent.timestamp)).filter(
+            ExecutionEvent.micro_goal_id == goal_id, ExecutionEvent.action == "start"
+        ).scalar()
+
+    restarted = TimerStore()
+    restarted.recover()
+
+    row = _row(goal_id)
+    assert row.is_active is True
+    assert row.is_paused is True
+    assert row.time_spent_seconds == 90
+    assert row.actual_start_time == start_time
+    assert restarted.get(goal_id, row.owner_id) is not None
+    assert _checkpoint_event_id() == _newest_event_id()
+    timer_store.forget(goal_id)
+
+
+def test_start_takes_over_an_expired_lease(client):
+    # The running app's lease, as left by a process that died a day ago
+    with session_scope() as db:
+        db.query(TimerCheckpoint).update(
+            {TimerCheckpoint.heartbeat_at: datetime.utcnow() - timedelta(days=2)}, synchronize_session=False
+        )
+
+    restarted = TimerStore()
+    asyncio.run(asyncio.wait_for(restarted.start(), timeout=10))
+
+    with session_scope() as db:
+        assert db.get(TimerCheckpoint, 1).instance_id == restarted.instance_id
+    # The running app can't renew a lease it lost
+    assert not timer_store.try_acquire_lease()
+    restarted.release_lease()
+    assert timer_store.try_acquire_lease()
+
+
+def test_flush_advances_the_checkpoint(client):
+    goal_id, = _goal_ids(client, 1)
+    client.post(f"/api/tasks/micro-goals/{goal_id}/start")
+    assert _checkpoint_event_id() < _newest_event_id()
+
+    timer_store.flush()
+
+    assert _checkpoint_event_id() == _newest_event_id()
+    assert _row(goal_id).is_active is True
+
+
+def test_flush_writes_dirty_timers_in_one_statement(client, micro_goal_updates):
+    first, second = _goal_ids(client, 2)
+    client.post(f"/api/tasks/micro-goals/{first}/start")
+    timer_store.flush()  # Also writes goals an earlier test left running, now stopped
+    micro_goal_updates.clear()
+
+    client.patch(f"/api/tasks/micro-goals/{first}/time", params={"time_spent_seconds": 30})
+    client.post(f"/api/tasks/micro-goals/{second}/start")  # Stops the first one
+    assert micro_goal_updates == []  # Nothing written yet
+
+    written = timer_store.flush()
+
+    assert written == 2
+    assert micro_goal_updates == [2]
+    assert _row(first).is_active is False
+    assert _row(first).time_spent_seconds == 30
+    assert _row(second).is_active is True
+    # Stopped goals leave the store once written
+    assert timer_store.get(first, _row(first).owner_id) is None
+
+
+def test_complete_writes_through(client):
+    goal_id, = _goal_ids(client, 1)
+    client.post(f"/api/tasks/micro-goals/{goal_id}/start")
+
+    response = client.post(f"/api/tasks/micro-goals/{goal_id}/complete")
+
+    assert response.status_code == 200
+    row = _row(goal_id)
+    assert row.completed is True
+    assert row.is_active is False
+    assert row.actual_end_time is not None
+    assert timer_store.get(goal_id, row.owner_id) is None
+    assert client.post(f"/api/tasks/micro-goals/{goal_id}/complete").status_code == 400
+
+
+def test_failed_complete_keeps_the_live_state(client, monkeypatch):
+    goal_id, = _goal_ids(client, 1)
+    client.post(f"/api/tasks/micro-goals/{goal_id}/start")
+    owner_id = _row(goal_id).owner_id
+
+    def fail(db, timers):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(TimerStore, "write", staticmethod(fail))
+    with pytest.raises(RuntimeError):
+        client.post(f"/api/tasks/micro-goals/{goal_id}/complete")
+    monkeypatch.undo()
+
+    timer = timer_store.get(goal_id, owner_id)
+    assert timer is not None
+    assert timer.dirty is True
+    assert timer.goal.completed is False
+    assert timer.goal.is_active is True
+    assert _row(goal_id).completed is False
+    with session_scope() as db:
+        assert db.query(ExecutionEvent).filter(
+            ExecutionEvent.micro_goal_id == goal_id, ExecutionEvent.action == "complete"
+        ).count() == 0
+
+
+def test_event_ids_are_not_reused_after_the_newest_are_deleted(client):
+    goal_id, = _goal_ids(client, 1)
+    client.post(f"/api/tasks/micro-goals/{goal_id}/start")
+    newest = _newest_event_id()
+    with session_scope() as db:
+        # Retention compacting every event, e.g. after 90 idle days
+        db.query(ExecutionEvent).filter(ExecutionEvent.id == newest).delete(synchronize_session=False)
+
+    client.post(f"/api/tasks/micro-goals/{goal_id}/pause")
+
+    assert _newest_event_id() > newest
@@ -9,11 +9,49 @@ export const apiClient = axios.create({
   },
 });
 
+// Tag mutations with an Idempotency-Key so retries of the same request
+// (same config object) are replayed by the server instead of repeated
+apiClient.interceptors.request.use((config) => {
+  const method = config.method?.toUpperCase();
+  if (method && ['POST', 'PUT', 'PATCH', 'DELETE'].includes(method) && !config.headers['Idempotency-Key']) {
+    config.headers['Idempotency-Key'] = crypto.randomUUID();
+  }
+  return config;
+});
+
+// Send the user's API token (from POST /api/users) when one is stored;
+// without it the server acts as the local default user
+apiClient.interceptors.request.use((config) => {
+  const token = localStorage.getItem('apiToken');
+  if (token && !config.headers['Authorization']) {
+    config.headers['Authorization'] = `Bearer ${token}`;
+  }
+  return config;
+});
+
+// When the server sheds load (503) or rate limits (429) with a short
+// Retry-After, retry once after waiting; the config keeps its Idempotency-Key
+const MAX_RETRY_AFTER_SECONDS = 5;
+
 // Add response interceptor for error handling
 apiClient.interceptors.response.use(
   (response) => response,
-  (error) => {
-    console.error('API Error:', error.response?.data || error.message);
+  async (error) => {
+    const status = error.response?.status;
+    const retryAfter = Number(error.response?.headers?.['retry-after']);
+    const config = error.config;
+    if (
+      config && !config._admissionRetried && (status === 503 || status === 429) &&
+      retryAfter > 0 && retryAfter <= MAX_RETRY_AFTER_SECONDS
+    ) {
+      config._admissionRetried = true;
+      await new Promise((resolve) => setTimeout(resolve, retryAfter * 1000));
+      return apiClient(config);
+    }
+    // Aborted on purpose (e.g. a draft breakdown superseded while typing)
+    if (!axios.isCancel(error)) {
+      console.error('API Error:', error.response?.data || error.message);
+    }
     return Promise.reject(error);
   }
 );
@@ -0,0 +1,92 @@
+import { apiClient } from './client';
+import type { SyncResponse, SyncTask, SyncMicroGoal, SyncExecutionEvent, TaskResponse } from '../types';
+
+export const syncApi = {
+  /**
+   * Tasks, micro-goals and execution events changed after a cursor
+   */
+  getChanges: async (since: number, snapshot = false): Promise<SyncResponse> => {
+    const response = await apiClient.get<SyncResponse>('/sync/', {
+      params: { since, snapshot }
+    });
+    return response.data;
+  },
+};
+
+/**
+ * Local copy of the user's tasks kept current with the delta sync feed, so
+ * refreshing the task list only transfers what changed since the last call
+ */
+class TaskReplica {
+  private since = 0;
+  private tasks = new Map<number, SyncTask>();
+  private goals = new Map<number, SyncMicroGoal>();
+  private events = new Map<number, SyncExecutionEvent>();
+  private pending: Promise<TaskResponse[]> | null = null;
+
+  /**
+   * Apply the changes since the last call and return the tasks like GET /tasks/
+   */
+  refresh(): Promise<TaskResponse[]> {
+    // Concurrent refreshes share one pull so changes aren't applied twice
+    if (!this.pending) {
+      this.pending = this.pull().finally(() => {
+        this.pending = null;
+      });
+    }
+    return this.pending;
+  }
+
+  clear() {
+    this.since = 0;
+    this.tasks.clear();
+    this.goals.clear();
+    this.events.clear();
+  }
+
+  private async pull(): Promise<TaskResponse[]> {
+    let snapshot = false;
+    let hasMore = true;
+    while (hasMore) {
+      const changes = await syncApi.getChanges(this.since, snapshot);
+      if (changes.reset) {
+        this.clear();
+      }
+      this.apply(changes);
+      this.since = changes.next_since;
+      snapshot = changes.snapshot;
+      hasMore = changes.has_more;
+    }
+    return this.toTaskList();
+  }
+
+  private apply(changes: SyncResponse) {
+    changes.tasks.forEach((task) => this.tasks.set(task.id, task));
+    changes.micro_goals.forEach((goal) => this.goals.set(goal.id, goal));
+    changes.execution_events.forEach((event) => this.events.set(event.id, event));
+    changes.deleted.tasks.forEach((id) => this.tasks.delete(id));
+    changes.deleted.micro_goals.forEach((id) => this.goals.delete(id));
+    changes.deleted.execution_events.forEach((id) => this.events.delete(id));
+  }
+
+  private toTaskList(): TaskResponse[] {
+    const eventsByGoal = new Map<number, SyncExecutionEvent[]>();
+    [...this.events.values()].sort((a, b) => a.id - b.id).forEach((event) => {
+      eventsByGoal.set(event.micro_goal_id, [...(eventsByGoal.get(event.micro_goal_id) ?? []), event]);
+    });
+
+    const goalsByTask = new Map<number, TaskResponse['micro_goals']>();
+    [...this.goals.values()].sort((a, b) => a.id - b.id).forEach((goal) => {
+      const goals = goalsByTask.get(goal.task_id) ?? [];
+      goals.push({ ...goal, execution_events: eventsByGoal.get(goal.id) ?? [] });
+      goalsByTask.set(goal.task_id, goals);
+    });
+
+    // Newest first, like GET /tasks/
+    return [...this.tasks.values()]
+      .sort((a, b) => b.created_at.localeCompare(a.created_at))
+      .map((task) => ({ ...task, micro_goals: goalsByTask.get(task.id) ?? [] }));
+  }
+}
+
+export const taskReplica = new TaskReplica();
@@ -1,5 +1,7 @@
 import { apiClient } from './client';
-import type { TaskInput, TaskBreakdownResponse, TaskConfirm, TaskResponse, MicroGoal, ExecutionSummary, ProgressDataResponse } from '../types';
+import type { TaskInput, TaskBreakdownResponse, DraftBreakdownInput, DraftBreakdownResponse, TaskConfirm, TaskResponse, MicroGoal, ExecutionSummary, ProgressDataResponse, JobResponse, TaskTemplate, SearchResponse, BusyBlock } from '../types';
+
+const TASK_PAGE_SIZE = 50;
 
 export const tasksApi = {
   /**
@@ -10,6 +12,33 @@ export const tasksApi = {
     return response.data;
   },
 
+  /**
+   * Speculative breakdown while the user types; abort with `signal` when the text changes.
+   * Submitting the same text to `breakdown` afterwards reuses the draft's plan.
+   */
+  breakdownDraft: async (draftInput: DraftBreakdownInput, signal?: AbortSignal): Promise<DraftBreakdownResponse> => {
+    const response = await apiClient.post<DraftBreakdownResponse>('/tasks/breakdown/drafts', draftInput, { signal });
+    return response.data;
+  },
+
+  /**
+   * Queue a breakdown in the background and get a job id back immediately
+   */
+  breakdownJob: async (taskInput: TaskInput): Promise<JobResponse> => {
+    const response = await apiClient.post<JobResponse>('/tasks/breakdown/jobs', taskInput);
+    return response.data;
+  },
+
+  /**
+   * Get a background job, optionally long-polling up to `wait` seconds for it to finish
+   */
+  getJob: async (jobId: string, wait = 0): Promise<JobResponse> => {
+    const response = await apiClient.get<JobResponse>(`/tasks/jobs/${jobId}`, {
+      params: { wait }
+    });
+    return response.data;
+  },
+
   /**
    * Confirm and save edited micro-goals
    */
@@ -19,15 +48,29 @@ export const tasksApi = {
   },
 
   /**
-   * Get all tasks
+   * Get one page of tasks, newest first; pass the last task's id as `before` for the next page
    */
-  getAll: async (confirmedOnly = false): Promise<TaskResponse[]> => {
+  getPage: async (confirmedOnly = false, limit = TASK_PAGE_SIZE, before?: number): Promise<TaskResponse[]> => {
     const response = await apiClient.get<TaskResponse[]>('/tasks/', {
-      params: { confirmed_only: confirmedOnly }
+      params: { confirmed_only: confirmedOnly, limit, before }
     });
     return response.data;
   },
 
+  /**
+   * Get all tasks, page by page
+   */
+  getAll: async (confirmedOnly = false): Promise<TaskResponse[]> => {
+    const tasks: TaskResponse[] = [];
+    for (;;) {
+      const page = await tasksApi.getPage(confirmedOnly, TASK_PAGE_SIZE, tasks.at(-1)?.id);
+      tasks.push(...page);
+      if (page.length < TASK_PAGE_SIZE) {
+        return tasks;
+      }
+    }
+  },
+
   /**
    * Get a specific task
    */
@@ -102,4 +145,75 @@ export const tasksApi = {
     const response = await apiClient.get<ProgressDataResponse>(`/tasks/tasks/${taskId}/progress`);
     return response.data;
   },
+
+  /**
+   * Full-text search over the user's tasks and micro-goals
+   */
+  search: async (query: string, limit = 20, offset = 0): Promise<SearchResponse> => {
+    const response = await apiClient.get<SearchResponse>('/tasks/search', {
+      params: { q: query, limit, offset }
+    });
+    return response.data;
+  },
+
+  /**
+   * Save a confirmed task as a recurring template
+   */
+  saveTemplate: async (taskId: number, name?: string): Promise<TaskTemplate> => {
+    const response = await apiClient.post<TaskTemplate>('/tasks/templates', { task_id: taskId, name });
+    return response.data;
+  },
+
+  /**
+   * Get the user's templates
+   */
+  getTemplates: async (): Promise<TaskTemplate[]> => {
+    const response = await apiClient.get<TaskTemplate[]>('/tasks/templates');
+    return response.data;
+  },
+
+  /**
+   * Delete a template
+   */
+  deleteTemplate: async (templateId: number): Promise<void> => {
+    await apiClient.delete(`/tasks/templates/${templateId}`);
+  },
+
+  /**
+   * Create a new day's plan from a template without an LLM call
+   */
+  instantiateTemplate: async (templateId: number, startingTime?: string, endTime?: string): Promise<TaskBreakdownResponse> => {
+    const response = await apiClient.post<TaskBreakdownResponse>(`/tasks/templates/${templateId}/instantiate`, {
+      starting_time: startingTime,
+      end_time: endTime,
+    });
+    return response.data;
+  },
+
+  /**
+   * Add a fixed commitment for calendar scheduling to work around
+   */
+  createBusyBlock: async (title: string, startAt: string, endAt: string): Promise<BusyBlock> => {
+    const response = await apiClient.post<BusyBlock>('/tasks/busy-blocks', {
+      title,
+      start_at: startAt,
+      end_at: endAt,
+    });
+    return response.data;
+  },
+
+  /**
+   * Get busy blocks overlapping a window (default: the scheduling horizon from today)
+   */
+  getBusyBlocks: async (start?: string, end?: string): Promise<BusyBlock[]> => {
+    const response = await apiClient.get<BusyBlock[]>('/tasks/busy-blocks', { params: { start, end } });
+    return response.data;
+  },
+
+  /**
+   * Delete a busy block
+   */
+  deleteBusyBlock: async (blockId: number): Promise<void> => {
+    await apiClient.delete(`/tasks/busy-blocks/${blockId}`);
+  },
 };
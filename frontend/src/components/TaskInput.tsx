@@ -1,4 +1,5 @@
 import { useState } from 'react';
+import { useDraftBreakdown } from '../hooks/useDraftBreakdown';
 
 interface TaskInputProps {
   onSubmit: (tasksText: string, startingTime?: string, endTime?: string) => void;
@@ -11,6 +12,15 @@ export const TaskInput: React.FC<TaskInputProps> = ({ onSubmit, isLoading }) =>
   const [endTime, setEndTime] = useState('');
   const [timeError, setTimeError] = useState('');
 
+  // Preview while typing; submitting the same text reuses the draft's plan
+  const draft = useDraftBreakdown(
+    tasksText,
+    startingTime ? `${startingTime}:00` : undefined,
+    endTime ? `${endTime}:00` : undefined,
+    !isLoading && !timeError
+  );
+  const draftGoals = draft?.micro_goals.filter((goal) => !goal.is_break) ?? [];
+
   const validateTimes = (start: string, end: string): boolean => {
     if (!start || !end) {
       setTimeError('');
@@ -69,6 +79,12 @@ export const TaskInput: React.FC<TaskInputProps> = ({ onSubmit, isLoading }) =>
           onChange={(e) => setTasksText(e.target.value)}
           disabled={isLoading}
         />
+        {draft && (
+          <p className="mt-1 text-xs text-gray-500">
+            Preview: {draftGoals.length} micro-goals, about {draft.total_estimated_minutes} minutes
+            {draftGoals[0] && <> &mdash; first up: {draftGoals[0].title}</>}
+          </p>
+        )}
       </div>
 
       <div className="grid grid-cols-1 md:grid-cols-2 gap-4 mb-4">
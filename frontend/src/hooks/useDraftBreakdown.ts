@@ -0,0 +1,53 @@
+import { useEffect, useRef, useState } from 'react';
+import axios from 'axios';
+import { tasksApi } from '../api/tasks';
+import type { DraftBreakdownResponse } from '../types';
+
+// Wait for a pause in typing before asking for a draft (the server debounces too)
+const DRAFT_DELAY_MS = 800;
+const MIN_DRAFT_LENGTH = 10;
+
+/**
+ * Preview breakdown of the text being typed. Each change aborts the previous
+ * draft request, which also cancels its LLM call on the server; drafts the
+ * server superseded (409) are ignored. Pass enabled=false while submitting.
+ */
+export const useDraftBreakdown = (
+  tasksText: string,
+  startingTime?: string,
+  endTime?: string,
+  enabled = true
+) => {
+  const sessionId = useRef(crypto.randomUUID());
+  const [draft, setDraft] = useState<DraftBreakdownResponse | null>(null);
+
+  useEffect(() => {
+    if (!enabled || tasksText.trim().length < MIN_DRAFT_LENGTH) {
+      setDraft(null);
+      return;
+    }
+
+    const controller = new AbortController();
+    const timer = setTimeout(() => {
+      tasksApi
+        .breakdownDraft(
+          { session_id: sessionId.current, tasks_text: tasksText, starting_time: startingTime, end_time: endTime },
+          controller.signal
+        )
+        .then(setDraft)
+        .catch((error) => {
+          if (axios.isCancel(error) || error.response?.status === 409) {
+            return;
+          }
+          setDraft(null);
+        });
+    }, DRAFT_DELAY_MS);
+
+    return () => {
+      clearTimeout(timer);
+      controller.abort();
+    };
+  }, [tasksText, startingTime, endTime, enabled]);
+
+  return draft;
+};
@@ -1,5 +1,6 @@
 import { useMutation, useQuery, useQueryClient } from '@tanstack/react-query';
 import { tasksApi } from '../api/tasks';
+import { taskReplica } from '../api/sync';
 import type { TaskInput, TaskConfirm } from '../types';
 
 export const useTasks = () => {
@@ -22,10 +23,10 @@ export const useTasks = () => {
     },
   });
 
-  // Get all tasks
+  // Get all tasks (refetches after invalidation only pull what changed)
   const tasksQuery = useQuery({
     queryKey: ['tasks'],
-    queryFn: () => tasksApi.getAll(false),
+    queryFn: () => taskReplica.refresh(),
   });
 
   // Delete task
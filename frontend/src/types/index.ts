@@ -27,6 +27,7 @@ export interface MicroGoal {
   completed: boolean;
   starting_time?: string;  // Time in HH:MM:SS format
   end_time?: string;       // Time in HH:MM:SS format
+  scheduled_date?: string;  // YYYY-MM-DD, set by calendar scheduling
   exceeds_end_time?: boolean;  // Flag if this task goes beyond desired end time
   is_break?: boolean;  // Flag if this is a Pomodoro break
   break_type?: 'short' | 'long';  // Type of break
@@ -47,12 +48,66 @@ export interface TaskInput {
   tasks_text: string;
   starting_time?: string;  // Time in HH:MM:SS format
   end_time?: string;       // Time in HH:MM:SS format
+  use_templates?: boolean;  // Reuse a matching saved template instead of calling the LLM (default true)
+  schedule_mode?: ScheduleMode;
+  starting_date?: string;  // YYYY-MM-DD, first day for calendar scheduling (default today)
+}
+
+// 'calendar' fits goals around busy blocks and other scheduled goals, spilling over to later days
+export type ScheduleMode = 'contiguous' | 'calendar';
+
+export interface BusyBlock {
+  id: number;
+  title: string;
+  start_at: string;  // Local ISO datetime
+  end_at: string;
 }
 
 export interface TaskBreakdownResponse {
   task_id: number;
   micro_goals: MicroGoal[];
   total_estimated_minutes: number;
+  source?: 'llm' | 'heuristic' | 'template';  // 'heuristic' when generated offline because the LLM was unavailable
+  template_id?: number;  // Set when a saved template matched the input
+}
+
+// Speculative breakdown of text still being typed; nothing is saved
+export interface DraftBreakdownInput {
+  session_id: string;  // Id of the input box; a newer draft supersedes older ones (409)
+  tasks_text: string;
+  starting_time?: string;
+  end_time?: string;
+  use_templates?: boolean;
+}
+
+export interface DraftBreakdownResponse {
+  session_id: string;
+  micro_goals: MicroGoal[];
+  total_estimated_minutes: number;
+  source?: 'llm' | 'heuristic' | 'template';
+  template_id?: number;
+}
+
+export interface TaskTemplate {
+  id: number;
+  name: string;
+  source_text: string;
+  micro_goals: Array<{title: string; description?: string; estimated_minutes: number}>;
+  use_count: number;
+  created_at: string;
+  last_used_at?: string;
+}
+
+export interface JobResponse {
+  id: string;
+  kind: string;
+  status: 'queued' | 'running' | 'succeeded' | 'failed';
+  task_id?: number;
+  result?: TaskBreakdownResponse;  // Set once a breakdown job has succeeded
+  error?: string;
+  created_at: string;
+  started_at?: string;
+  finished_at?: string;
 }
 
 export interface TaskResponse {
@@ -67,6 +122,10 @@ export interface TaskResponse {
 export interface TaskConfirm {
   task_id: number;
   micro_goals: MicroGoal[];
+  schedule_mode?: ScheduleMode;  // 'calendar' re-places the work goals around the calendar
+  starting_date?: string;
+  starting_time?: string;
+  end_time?: string;
 }
 
 export interface ProgressDataResponse {
@@ -80,3 +139,57 @@ export interface ProgressDataResponse {
   upcoming_tasks_count: number;
   tips: string[];
 }
+
+export interface SearchResult {
+  kind: 'task' | 'micro_goal';
+  task_id: number;
+  micro_goal_id?: number;
+  title?: string;  // Highlighted with <mark></mark>
+  snippet: string;  // Highlighted with <mark></mark>
+  rank: number;
+  task_created_at?: string;
+}
+
+export interface SearchResponse {
+  query: string;
+  results: SearchResult[];
+  limit: number;
+  offset: number;
+  has_more: boolean;
+}
+
+// Delta sync (GET /api/sync/): rows changed after a cursor, without nesting
+export interface SyncTask {
+  id: number;
+  user_input: string;
+  created_at: string;
+  updated_at?: string;
+  confirmed: boolean;
+  starting_time?: string;
+  version: number;
+}
+
+export interface SyncMicroGoal extends Omit<MicroGoal, 'execution_events'> {
+  id: number;
+  task_id: number;
+}
+
+export interface SyncExecutionEvent extends ExecutionEvent {
+  id: number;
+  micro_goal_id: number;
+}
+
+export interface SyncResponse {
+  next_since: number;  // Cursor for the next call
+  has_more: boolean;   // Call again right away with next_since
+  reset: boolean;      // Cursor too old: drop the local copy before applying
+  snapshot: boolean;   // Paging through a full sync; pass it back with the next call
+  tasks: SyncTask[];
+  micro_goals: SyncMicroGoal[];
+  execution_events: SyncExecutionEvent[];
+  deleted: {
+    tasks: number[];
+    micro_goals: number[];
+    execution_events: number[];
+  };
+}